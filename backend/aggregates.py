@@ -0,0 +1,59 @@
+from typing import Optional
+
+from backend.storage import ConversationData
+
+# Agregados emocionais da conversa, atualizados em O(1) a cada mensagem do usuário
+#
+# - average_intensity: média móvel exponencial (EMA) da intensidade
+# - emotion_counts: contagem de mensagens por estado emocional
+# - primary_emotion: estado mais frequente (empate: mantém o atual)
+# - sentiment_score: EMA do sentimento (-1 negativo, 0 neutro, +1 positivo)
+# - sentiment: rótulo do sentiment_score
+# - sentiment_trajectory: últimos TRAJECTORY_LENGTH sentimentos, do mais antigo ao mais recente
+#
+# Nada é recalculado a partir do histórico completo de mensagens.
+
+EMA_ALPHA = 0.3
+TRAJECTORY_LENGTH = 20
+SENTIMENT_SCORES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+SENTIMENT_THRESHOLD = 0.2
+
+def _ema(previous: Optional[float], value: float) -> float:
+    if previous is None:
+        return value
+    return round(previous + EMA_ALPHA * (value - previous), 6)
+
+def sentiment_label(score: float) -> str:
+    if score > SENTIMENT_THRESHOLD:
+        return "positive"
+    if score < -SENTIMENT_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+def record_emotion(
+    conversation: ConversationData,
+    emotional_state: str,
+    sentiment: str,
+    intensity: float
+) -> None:
+    """Incorpora a análise de uma mensagem do usuário aos agregados da conversa"""
+    counts = dict(conversation.emotion_counts or {})
+    first = not counts
+
+    counts[emotional_state] = counts.get(emotional_state, 0) + 1
+    conversation.emotion_counts = counts
+
+    current = conversation.primary_emotion
+    if first or current not in counts or counts[emotional_state] > counts[current]:
+        conversation.primary_emotion = emotional_state
+
+    # O valor padrão da coluna (0.5) não é uma observação: a primeira mensagem define a média
+    conversation.average_intensity = _ema(None if first else conversation.average_intensity, intensity)
+
+    score = SENTIMENT_SCORES.get(sentiment, 0.0)
+    conversation.sentiment_score = _ema(None if first else conversation.sentiment_score, score)
+    conversation.sentiment = sentiment_label(conversation.sentiment_score)
+
+    trajectory = list(conversation.sentiment_trajectory or [])
+    trajectory.append(sentiment)
+    conversation.sentiment_trajectory = trajectory[-TRAJECTORY_LENGTH:]
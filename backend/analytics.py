@@ -0,0 +1,246 @@
+# Rollups de analytics emocional (tabelas pré-agregadas por dia)
+#
+#   emotion_daily_rollups: mensagens do usuário por dia × estado × sentimento,
+#                          com a soma das intensidades (média = soma / contagem)
+#   safety_daily_rollups:  mensagens do usuário por dia × nível de segurança
+#                          (safe/warning) + alertas de crise (critical), que
+#                          não viram mensagens e só ficam no audit log
+#
+# As transações do ConversationStore SQL acumulam os incrementos e os gravam
+# com UPSERT logo antes do commit (as linhas mais disputadas ficam travadas só
+# durante o commit, nunca durante a chamada ao LLM). Os endpoints leem apenas
+# os rollups: o custo depende do número de dias, não do número de mensagens.
+#
+# Reconstrução completa (ou a partir de uma data), por exemplo após editar
+# dados em massa:
+#   python -m backend.analytics rebuild [--since 2024-01-01]
+#
+# Dias que podem ter mensagens de conversas arquivadas (backend/retention.py)
+# nunca são recalculados: as mensagens não estão mais em messages e o rollup é
+# o único registro delas. A reconstrução começa no dia seguinte à última
+# atividade das conversas arquivadas.
+import argparse
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from backend.emotional_safety import SafetyLevel
+from backend.models import ArchivedConversation, AuditLog, EmotionDailyRollup, Message, SafetyDailyRollup
+
+CRISIS_EVENT_TYPE = "safety_alert"
+
+def _safety_key(safety_level: Optional[str]) -> str:
+    """Níveis gravados com grafias diferentes (mensagens vs audit log) → valor do enum"""
+    return (safety_level or SafetyLevel.SAFE.value).lower()
+
+class RollupBuffer:
+    """Incrementos de uma transação, gravados de uma vez antes do commit"""
+
+    def __init__(self):
+        self.emotions: dict[tuple, list] = {}
+        self.safety: dict[tuple, int] = {}
+
+    def add_message(self, created_at: datetime, emotional_state: Optional[str], sentiment: Optional[str],
+                    intensity: Optional[float], safety_level: Optional[str], weight: int = 1) -> None:
+        """Conta uma mensagem do usuário já analisada (weight=-1 desconta, p.ex. na reanálise)"""
+        if emotional_state is None:
+            return
+        day = created_at.date()
+        totals = self.emotions.setdefault((day, emotional_state, sentiment or ""), [0, 0.0])
+        totals[0] += weight
+        totals[1] += weight * (intensity or 0.0)
+        self.add_safety_event(day, safety_level, weight)
+
+    def add_safety_event(self, day: date, safety_level: Optional[str], weight: int = 1) -> None:
+        key = (day, _safety_key(safety_level))
+        self.safety[key] = self.safety.get(key, 0) + weight
+
+    def flush(self, db: Session) -> None:
+        """UPSERT dos incrementos (SQLite e Postgres: INSERT ... ON CONFLICT DO UPDATE)"""
+        if self.emotions:
+            upsert_counters(db, EmotionDailyRollup, [
+                {"day": day, "emotional_state": state, "sentiment": sentiment,
+                 "message_count": count, "intensity_sum": intensity_sum}
+                for (day, state, sentiment), (count, intensity_sum) in self.emotions.items()
+            ], ("day", "emotional_state", "sentiment"), ("message_count", "intensity_sum"))
+        if self.safety:
+            upsert_counters(db, SafetyDailyRollup, [
+                {"day": day, "safety_level": level, "event_count": count}
+                for (day, level), count in self.safety.items()
+            ], ("day", "safety_level"), ("event_count",))
+        self.emotions = {}
+        self.safety = {}
+
+def upsert_counters(db: Session, model, rows: list[dict], keys: tuple, counters: tuple) -> None:
+    """INSERT ... ON CONFLICT DO UPDATE SET contador = contador + excluded.contador"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    statement = dialect_insert(model)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={counter: getattr(model, counter) + getattr(statement.excluded, counter) for counter in counters}
+    )
+    # Ordem fixa das chaves: transações simultâneas travam as linhas na mesma ordem
+    for row in sorted(rows, key=lambda row: tuple(str(row[key]) for key in keys)):
+        db.execute(statement, row)
+
+# Reconstrução
+
+def rebuild_start(db: Session, since: Optional[date] = None) -> Optional[date]:
+    """Primeiro dia recalculável: `since`, mas sempre depois dos dias com conversas arquivadas"""
+    archived_through = db.query(func.max(ArchivedConversation.updated_at)).scalar()
+    if archived_through is None:
+        return since
+    if isinstance(archived_through, str):
+        archived_through = datetime.fromisoformat(archived_through)
+    first_live_day = archived_through.date() + timedelta(days=1)
+    return first_live_day if since is None or since < first_live_day else since
+
+def rebuild_rollups(db: Session, since: Optional[date] = None) -> dict:
+    """Recalcula os rollups a partir de messages e audit_logs (opcionalmente desde uma data)
+
+    Os dias com conversas arquivadas são mantidos como estão (ver rebuild_start)."""
+    requested = since
+    since = rebuild_start(db, since)
+    message_day = func.date(Message.created_at)
+    alert_day = func.date(AuditLog.created_at)
+
+    emotion_delete = delete(EmotionDailyRollup)
+    safety_delete = delete(SafetyDailyRollup)
+    emotion_filter = [Message.role == "user", Message.emotional_state.isnot(None)]
+    alert_filter = [AuditLog.event_type == CRISIS_EVENT_TYPE]
+    if since is not None:
+        emotion_delete = emotion_delete.where(EmotionDailyRollup.day >= since)
+        safety_delete = safety_delete.where(SafetyDailyRollup.day >= since)
+        emotion_filter.append(Message.created_at >= datetime.combine(since, datetime.min.time()))
+        alert_filter.append(AuditLog.created_at >= datetime.combine(since, datetime.min.time()))
+
+    db.execute(emotion_delete)
+    db.execute(safety_delete)
+
+    emotions = db.execute(insert(EmotionDailyRollup).from_select(
+        ["day", "emotional_state", "sentiment", "message_count", "intensity_sum"],
+        select(
+            message_day,
+            Message.emotional_state,
+            func.coalesce(Message.sentiment, ""),
+            func.count(),
+            func.coalesce(func.sum(Message.emotion_intensity), 0.0)
+        ).where(*emotion_filter).group_by(message_day, Message.emotional_state, func.coalesce(Message.sentiment, ""))
+    ))
+
+    # Mensagens (safe/warning) e alertas de crise somados por dia × nível
+    message_levels = select(
+        message_day.label("day"),
+        func.lower(func.coalesce(Message.safety_level, SafetyLevel.SAFE.value)).label("safety_level"),
+        func.count().label("event_count")
+    ).where(*emotion_filter).group_by(message_day, func.lower(func.coalesce(Message.safety_level, SafetyLevel.SAFE.value)))
+    alert_levels = select(
+        alert_day.label("day"),
+        literal(SafetyLevel.CRITICAL.value).label("safety_level"),
+        func.count().label("event_count")
+    ).where(*alert_filter).group_by(alert_day)
+    levels = message_levels.union_all(alert_levels).subquery()
+
+    safety = db.execute(insert(SafetyDailyRollup).from_select(
+        ["day", "safety_level", "event_count"],
+        select(levels.c.day, levels.c.safety_level, func.sum(levels.c.event_count))
+        .group_by(levels.c.day, levels.c.safety_level)
+    ))
+    db.commit()
+    stats = {"emotion_rows": emotions.rowcount, "safety_rows": safety.rowcount}
+    if since != requested:
+        stats["kept_archived_days_before"] = since.isoformat()
+    return stats
+
+# Consultas (somente rollups)
+
+def _days(query, column, start: date, end: date):
+    return query.filter(column >= start, column <= end)
+
+def emotion_distribution(db: Session, start: date, end: date) -> list[dict]:
+    """Distribuição diária de estados emocionais e sentimentos"""
+    rows = _days(db.query(
+        EmotionDailyRollup.day,
+        EmotionDailyRollup.emotional_state,
+        EmotionDailyRollup.sentiment,
+        EmotionDailyRollup.message_count
+    ), EmotionDailyRollup.day, start, end).order_by(EmotionDailyRollup.day).all()
+
+    days: dict[date, dict] = {}
+    for day, state, sentiment, count in rows:
+        entry = days.setdefault(day, {"day": day, "total": 0, "emotions": {}, "sentiments": {}})
+        entry["total"] += count
+        entry["emotions"][state] = entry["emotions"].get(state, 0) + count
+        entry["sentiments"][sentiment] = entry["sentiments"].get(sentiment, 0) + count
+
+    for entry in days.values():
+        entry["distribution"] = {
+            state: round(count / entry["total"], 4) for state, count in entry["emotions"].items()
+        }
+    return list(days.values())
+
+def safety_rates(db: Session, start: date, end: date) -> list[dict]:
+    """Eventos por nível de segurança e taxa de alertas de crise por dia"""
+    rows = _days(db.query(
+        SafetyDailyRollup.day,
+        SafetyDailyRollup.safety_level,
+        SafetyDailyRollup.event_count
+    ), SafetyDailyRollup.day, start, end).order_by(SafetyDailyRollup.day).all()
+
+    days: dict[date, dict] = {}
+    for day, level, count in rows:
+        entry = days.setdefault(day, {"day": day, "levels": {}})
+        entry["levels"][level] = count
+
+    for entry in days.values():
+        total = sum(entry["levels"].values())
+        entry["total"] = total
+        entry["crisis_rate"] = round(entry["levels"].get(SafetyLevel.CRITICAL.value, 0) / total, 6) if total else 0.0
+    return list(days.values())
+
+def intensity_trend(db: Session, start: date, end: date, emotional_state: Optional[str] = None) -> list[dict]:
+    """Intensidade média por dia (opcionalmente de um estado emocional)"""
+    query = db.query(
+        EmotionDailyRollup.day,
+        func.sum(EmotionDailyRollup.message_count),
+        func.sum(EmotionDailyRollup.intensity_sum)
+    )
+    if emotional_state is not None:
+        query = query.filter(EmotionDailyRollup.emotional_state == emotional_state)
+    rows = _days(query, EmotionDailyRollup.day, start, end).group_by(
+        EmotionDailyRollup.day
+    ).order_by(EmotionDailyRollup.day).all()
+
+    return [
+        {"day": day, "messages": count, "average_intensity": round(total / count, 4) if count else None}
+        for day, count, total in rows
+    ]
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Rollups de analytics emocional")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild = subcommands.add_parser("rebuild", help="Recalcula os rollups a partir do histórico")
+    rebuild.add_argument("--since", type=date.fromisoformat, help="Recalcular só a partir desta data")
+    args = parser.parse_args(argv)
+
+    from backend.database import SessionLocal
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        stats = rebuild_rollups(db, args.since)
+    finally:
+        db.close()
+    print(f"{stats} em {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
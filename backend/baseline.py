@@ -0,0 +1,419 @@
+# Linha de base emocional por usuário (User.emotional_baseline / emotional_triggers)
+#
+# Cada usuário tem um resumo de tamanho constante e "mesclável":
+#   - contagens por estado emocional e por sentimento (conjuntos fixos de chaves)
+#   - média e variância da intensidade (Welford)
+#   - gatilhos: top-k de palavras-chave em mensagens negativas ou intensas,
+#     mantido com o algoritmo Space-Saving (k contadores, erro limitado)
+#
+# O resumo gravado é feito de contadores aditivos (user_baseline_counters):
+# contagens, soma e soma dos quadrados da intensidade, contagem e erro de cada
+# gatilho. Mesclar um delta é um UPSERT com "valor = valor + ?", atômico no
+# SQLite e no Postgres, então vários workers podem alimentar o mesmo usuário
+# sem perder contagens. User.emotional_baseline / emotional_triggers são
+# recalculados a partir dos contadores na mesma transação.
+#
+# Modo contínuo: o ChatService publica cada mensagem analisada; uma thread de
+# fundo acumula deltas por usuário e os grava a cada intervalo. Desligado por
+# padrão (ENABLE_BASELINE_AGGREGATION) até as mensagens terem usuário atribuído.
+#
+# Modo backfill (histórico completo, em blocos, com um pool de processos; também
+# popula os contadores de usuários com linha de base anterior a eles):
+#   python -m backend.baseline --workers 4 --chunk-size 5000
+import argparse
+import json
+import logging
+import math
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import String, Text, delete, func, type_coerce, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.analytics import upsert_counters
+from backend.models import Conversation, Message, User, UserBaselineCounter
+from backend.pagination import encode_cursor, keyset_after
+
+logger = logging.getLogger(__name__)
+
+TRIGGER_CAPACITY = 20
+TRIGGER_INTENSITY = 0.6
+DEFAULT_CHUNK_SIZE = 5000
+
+class SpaceSaving:
+    """Top-k aproximado em memória constante (Metwally et al., Space-Saving)"""
+    __slots__ = ("capacity", "counts", "errors")
+
+    def __init__(self, capacity: int = TRIGGER_CAPACITY):
+        self.capacity = capacity
+        self.counts: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+
+    def add(self, item: str, count: int = 1, error: int = 0) -> None:
+        if item in self.counts:
+            self.counts[item] += count
+            self.errors[item] += error
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = error
+            return
+
+        # Substitui o menor contador; o valor dele vira o erro máximo do novo item
+        smallest = min(self.counts, key=self.counts.__getitem__)
+        floor = self.counts.pop(smallest)
+        self.errors.pop(smallest)
+        self.counts[item] = floor + count
+        self.errors[item] = floor + error
+
+    def merge(self, other: "SpaceSaving") -> None:
+        for item, count in other.counts.items():
+            self.add(item, count, other.errors[item])
+
+    def top(self) -> list[dict]:
+        ranked = sorted(self.counts.items(), key=lambda pair: (-pair[1], pair[0]))
+        return [{"keyword": item, "count": count, "error": self.errors[item]} for item, count in ranked]
+
+class UserBaseline:
+    """Resumo emocional de um usuário (tamanho constante, mesclável)"""
+    __slots__ = ("message_count", "emotion_counts", "sentiment_counts",
+                 "intensity_count", "intensity_mean", "intensity_m2", "triggers")
+
+    def __init__(self):
+        self.message_count = 0
+        self.emotion_counts: dict[str, int] = {}
+        self.sentiment_counts: dict[str, int] = {}
+        self.intensity_count = 0
+        self.intensity_mean = 0.0
+        self.intensity_m2 = 0.0
+        self.triggers = SpaceSaving()
+
+    def add(self, emotional_state: Optional[str], sentiment: Optional[str],
+            intensity: Optional[float], keywords: Optional[list]) -> None:
+        """Incorpora uma mensagem analisada (O(k) no pior caso dos gatilhos)"""
+        self.message_count += 1
+        if emotional_state:
+            self.emotion_counts[emotional_state] = self.emotion_counts.get(emotional_state, 0) + 1
+        if sentiment:
+            self.sentiment_counts[sentiment] = self.sentiment_counts.get(sentiment, 0) + 1
+
+        if intensity is not None:
+            self.intensity_count += 1
+            delta = intensity - self.intensity_mean
+            self.intensity_mean += delta / self.intensity_count
+            self.intensity_m2 += delta * (intensity - self.intensity_mean)
+
+        if keywords and (sentiment == "negative" or (intensity or 0) >= TRIGGER_INTENSITY):
+            for keyword in set(keywords):
+                self.triggers.add(keyword)
+
+    def merge(self, other: "UserBaseline") -> None:
+        """Combina dois resumos (Chan et al. para a variância)"""
+        self.message_count += other.message_count
+        for state, count in other.emotion_counts.items():
+            self.emotion_counts[state] = self.emotion_counts.get(state, 0) + count
+        for sentiment, count in other.sentiment_counts.items():
+            self.sentiment_counts[sentiment] = self.sentiment_counts.get(sentiment, 0) + count
+
+        total = self.intensity_count + other.intensity_count
+        if other.intensity_count:
+            delta = other.intensity_mean - self.intensity_mean
+            self.intensity_m2 += other.intensity_m2 + delta * delta * self.intensity_count * other.intensity_count / total
+            self.intensity_mean += delta * other.intensity_count / total
+            self.intensity_count = total
+
+        self.triggers.merge(other.triggers)
+
+    # Formato gravado em User.emotional_baseline / emotional_triggers
+
+    def baseline_json(self) -> dict:
+        total = sum(self.emotion_counts.values())
+        variance = self.intensity_m2 / self.intensity_count if self.intensity_count else 0.0
+        return {
+            "message_count": self.message_count,
+            "primary_emotion": max(self.emotion_counts, key=self.emotion_counts.get) if self.emotion_counts else None,
+            "emotion_distribution": {
+                state: round(count / total, 4) for state, count in sorted(self.emotion_counts.items())
+            } if total else {},
+            "emotion_counts": self.emotion_counts,
+            "sentiment_counts": self.sentiment_counts,
+            "intensity": {
+                "count": self.intensity_count,
+                "mean": self.intensity_mean,
+                "stddev": round(math.sqrt(variance), 6),
+                "m2": self.intensity_m2
+            },
+            "updated_at": datetime.utcnow().isoformat()
+        }
+
+    def triggers_json(self) -> list[dict]:
+        return self.triggers.top()
+
+    # Formato gravado em user_baseline_counters: (kind, key) -> valor somável
+
+    def counters(self) -> dict[tuple, float]:
+        intensity_sum = self.intensity_mean * self.intensity_count
+        values = {
+            ("messages", ""): self.message_count,
+            ("intensity", "count"): self.intensity_count,
+            ("intensity", "sum"): intensity_sum,
+            ("intensity", "sum_sq"): self.intensity_m2 + intensity_sum * self.intensity_mean,
+        }
+        for state, count in self.emotion_counts.items():
+            values[("emotion", state)] = count
+        for sentiment, count in self.sentiment_counts.items():
+            values[("sentiment", sentiment)] = count
+        for keyword, count in self.triggers.counts.items():
+            values[("trigger", keyword)] = count
+            values[("trigger_error", keyword)] = self.triggers.errors[keyword]
+        return values
+
+    @classmethod
+    def from_counters(cls, rows: Iterable[tuple]) -> "UserBaseline":
+        """Resumo a partir das linhas (kind, key, value); os gatilhos ficam com os k maiores"""
+        state = cls()
+        intensity = {}
+        triggers = {}
+        errors = {}
+        for kind, key, value in rows:
+            if kind == "messages":
+                state.message_count = int(value)
+            elif kind == "emotion":
+                state.emotion_counts[key] = int(value)
+            elif kind == "sentiment":
+                state.sentiment_counts[key] = int(value)
+            elif kind == "intensity":
+                intensity[key] = value
+            elif kind == "trigger":
+                triggers[key] = int(value)
+            elif kind == "trigger_error":
+                errors[key] = int(value)
+
+        state.intensity_count = int(intensity.get("count", 0))
+        if state.intensity_count:
+            intensity_sum = intensity.get("sum", 0.0)
+            state.intensity_mean = intensity_sum / state.intensity_count
+            state.intensity_m2 = max(intensity.get("sum_sq", 0.0) - intensity_sum * state.intensity_mean, 0.0)
+
+        ranked = sorted(triggers.items(), key=lambda pair: (-pair[1], pair[0]))[:state.triggers.capacity]
+        for keyword, count in ranked:
+            state.triggers.add(keyword, count, errors.get(keyword, 0))
+        return state
+
+def save_baselines(db: Session, baselines: dict[str, UserBaseline], merge: bool = True,
+                   batch_size: int = 500) -> int:
+    """Grava os resumos nos usuários (merge=True soma ao que já está no banco)"""
+    saved = 0
+    for position, (user_id, delta) in enumerate(baselines.items(), start=1):
+        if db.query(User.id).filter(User.id == user_id).first() is None:
+            continue
+        if not merge:
+            db.execute(delete(UserBaselineCounter).where(UserBaselineCounter.user_id == user_id))
+
+        # Todo delta incrementa as linhas "messages" e "intensity", travadas até o
+        # commit (no SQLite, o arquivo inteiro): de dois workers no mesmo usuário,
+        # o último a confirmar relê os incrementos de ambos
+        upsert_counters(db, UserBaselineCounter, [
+            {"user_id": user_id, "kind": kind, "key": key, "value": value}
+            for (kind, key), value in delta.counters().items()
+        ], ("user_id", "kind", "key"), ("value",))
+
+        state = UserBaseline.from_counters(db.query(
+            UserBaselineCounter.kind, UserBaselineCounter.key, UserBaselineCounter.value
+        ).filter(UserBaselineCounter.user_id == user_id).all())
+        db.execute(update(User).where(User.id == user_id).values(
+            emotional_baseline=state.baseline_json(),
+            emotional_triggers=state.triggers_json()
+        ))
+        saved += 1
+        if position % batch_size == 0:
+            db.commit()  # Transações curtas: os locks de linha não se acumulam
+    db.commit()
+    return saved
+
+# Modo contínuo
+
+class BaselineAggregator:
+    """Consome mensagens analisadas e grava deltas por usuário periodicamente"""
+
+    def __init__(self, session_factory: sessionmaker, flush_interval_seconds: float = 30,
+                 max_pending_users: int = 10000):
+        self.session_factory = session_factory
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending_users = max_pending_users
+
+        self._queue: "queue.SimpleQueue[Optional[tuple]]" = queue.SimpleQueue()
+        self._pending: dict[str, UserBaseline] = {}
+        self._thread: Optional[threading.Thread] = None
+
+        self.consumed = 0
+        self.flushed_users = 0
+
+    def publish(self, user_id: Optional[str], emotional_state: Optional[str], sentiment: Optional[str],
+                intensity: Optional[float], keywords: Optional[list]) -> None:
+        """Chamado pelo pipeline de mensagens; não bloqueia (só enfileira)"""
+        if user_id is not None:
+            self._queue.put((user_id, emotional_state, sentiment, intensity, keywords))
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        db = self.session_factory()
+        try:
+            # Uma única transação: em caso de erro nada foi gravado e os deltas voltam inteiros
+            self.flushed_users += save_baselines(db, pending, batch_size=len(pending))
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro ao gravar linhas de base: {e}")
+            # Devolve os deltas para a próxima tentativa
+            for user_id, delta in pending.items():
+                self._pending.setdefault(user_id, UserBaseline()).merge(delta)
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.flush_interval_seconds
+        while True:
+            try:
+                event = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                event = ()
+
+            if event is None:
+                self._flush()
+                return
+            if event:
+                user_id, *analysis = event
+                self._pending.setdefault(user_id, UserBaseline()).add(*analysis)
+                self.consumed += 1
+
+            if time.monotonic() >= deadline or len(self._pending) >= self.max_pending_users:
+                self._flush()
+                deadline = time.monotonic() + self.flush_interval_seconds
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="baseline-aggregator", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Grava os deltas pendentes e encerra a thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "consumed": self.consumed,
+            "pending_users": len(self._pending),
+            "flushed_users": self.flushed_users
+        }
+
+# Modo backfill
+
+# Colunas lidas no backfill. Palavras-chave e timestamp chegam como texto bruto:
+# o json.loads roda nos processos do pool, e só o timestamp do cursor é convertido
+ANALYZED_MESSAGE_COLUMNS = (
+    func.coalesce(Message.user_id, Conversation.user_id).label("user_id"),
+    Message.emotional_state,
+    Message.sentiment,
+    Message.emotion_intensity,
+    type_coerce(Message.emotion_keywords, Text).label("emotion_keywords"),
+)
+
+def iter_analyzed_chunks(db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[list[tuple]]:
+    """Mensagens analisadas do usuário em blocos keyset (memória constante)"""
+    query = db.query(
+        *ANALYZED_MESSAGE_COLUMNS,
+        type_coerce(Message.created_at, String).label("created_at"),
+        Message.id
+    ).join(
+        Conversation, Conversation.id == Message.conversation_id
+    ).filter(
+        Message.role == "user",
+        Message.emotional_state.isnot(None),
+        func.coalesce(Message.user_id, Conversation.user_id).isnot(None)
+    )
+
+    cursor = None
+    while True:
+        page = query
+        if cursor:
+            page = page.filter(keyset_after(Message.created_at, Message.id, cursor))
+        rows = page.order_by(Message.created_at, Message.id).limit(chunk_size).all()
+        if rows:
+            yield [tuple(row[:5]) for row in rows]
+        if len(rows) < chunk_size:
+            return
+        last_timestamp = rows[-1].created_at
+        if isinstance(last_timestamp, str):
+            last_timestamp = datetime.fromisoformat(last_timestamp)
+        cursor = encode_cursor(last_timestamp, rows[-1].id)
+
+def aggregate_chunk(rows: list[tuple]) -> dict[str, UserBaseline]:
+    """Executado nos processos do pool: resumos parciais de um bloco"""
+    baselines: dict[str, UserBaseline] = {}
+    for user_id, emotional_state, sentiment, intensity, keywords in rows:
+        if isinstance(keywords, str):
+            keywords = json.loads(keywords)
+        baselines.setdefault(user_id, UserBaseline()).add(emotional_state, sentiment, intensity, keywords)
+    return baselines
+
+def _merge_into(totals: dict[str, UserBaseline], partial: dict[str, UserBaseline]) -> None:
+    for user_id, baseline in partial.items():
+        if user_id in totals:
+            totals[user_id].merge(baseline)
+        else:
+            totals[user_id] = baseline
+
+def backfill(chunks: Iterable[list[tuple]], workers: int = 1) -> dict[str, UserBaseline]:
+    """Agrega o histórico; com workers > 1 os blocos são processados em paralelo"""
+    totals: dict[str, UserBaseline] = {}
+    if workers <= 1:
+        for chunk in chunks:
+            _merge_into(totals, aggregate_chunk(chunk))
+        return totals
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # No máximo 2 blocos por processo em voo: a leitura não corre à frente do pool
+        in_flight = []
+        for chunk in chunks:
+            in_flight.append(executor.submit(aggregate_chunk, chunk))
+            if len(in_flight) >= workers * 2:
+                _merge_into(totals, in_flight.pop(0).result())
+        for future in in_flight:
+            _merge_into(totals, future.result())
+    return totals
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Recalcula a linha de base emocional dos usuários")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from backend.database import SessionLocal
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        totals = backfill(iter_analyzed_chunks(db, args.chunk_size), workers=args.workers)
+        saved = save_baselines(db, totals, merge=False)
+    finally:
+        db.close()
+
+    messages = sum(baseline.message_count for baseline in totals.values())
+    print(
+        f"{messages} mensagens, {saved} usuários atualizados em {time.perf_counter() - started:.2f}s",
+        file=sys.stderr
+    )
+
+if __name__ == "__main__":
+    main()
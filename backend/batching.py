@@ -0,0 +1,170 @@
+# Micro-lotes no event loop: chamadas concorrentes viram uma chamada em lote
+#
+# Cada requisição entra com submit(item) e espera o próprio resultado. Os itens
+# que chegam dentro de uma janela curta (max_wait_ms, contada a partir do
+# primeiro item pendente) ou até max_batch itens são passados juntos a
+# function(itens) -> resultados (mesma ordem), em um pool de threads próprio
+# (workers > 0) ou no próprio event loop (workers = 0). Uma troca de thread por
+# lote em vez de uma por requisição; com NumPy, o lote inteiro roda fora do GIL.
+#
+# Limites de latência: max_wait_ms limita a espera na fila e timeout_ms o tempo
+# total de cada requisição (asyncio.TimeoutError; quem chama decide o
+# fallback). Itens que desistiram antes do lote partir não entram nele.
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Generic, Optional, TypeVar
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+# Requisições recentes usadas nos percentis de latência
+LATENCY_WINDOW = 1024
+
+class MicroBatcher(Generic[Item, Result]):
+    """Agrupa chamadas concorrentes de `function` em lotes"""
+
+    def __init__(self, function: Callable[[list[Item]], list[Result]], max_batch: int = 32,
+                 max_wait_ms: float = 2, timeout_ms: Optional[float] = None, workers: int = 1,
+                 name: str = "batch"):
+        self.function = function
+        self.max_batch = max(1, max_batch)
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.timeout_seconds = timeout_ms / 1000 if timeout_ms else None
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) if workers > 0 else None
+
+        # (item, future, instante de chegada); só tocados no event loop
+        self._pending: list[tuple[Item, asyncio.Future, float]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        self.requests = 0
+        self.batches = 0
+        self.items = 0
+        self.full_batches = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.queue_seconds = 0.0
+        self.busy_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+
+    async def submit(self, item: Item) -> Result:
+        """Resultado de `item`, calculado no próximo lote"""
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        if self.started_at is None:
+            self.started_at = submitted
+        self.requests += 1
+
+        future = loop.create_future()
+        self._pending.append((item, future, submitted))
+        if len(self._pending) >= self.max_batch:
+            self.full_batches += 1
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_seconds, self._flush)
+
+        try:
+            if self.timeout_seconds is None:
+                return await future
+            return await asyncio.wait_for(future, self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self._latencies.append(time.perf_counter() - submitted)
+
+    def _flush(self) -> None:
+        """Envia os itens pendentes (que ainda esperam resultado) como um lote"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch = [entry for entry in self._pending if not entry[1].done()]
+        self._pending = []
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        self.batches += 1
+        self.items += len(batch)
+        self.queue_seconds += sum(now - submitted for _, _, submitted in batch)
+        items = [item for item, _, _ in batch]
+
+        if self._executor is None:
+            try:
+                results = self._run(items)
+            except Exception as e:
+                self._resolve(batch, None, e)
+            else:
+                self._resolve(batch, results, None)
+            return
+
+        done = asyncio.get_running_loop().run_in_executor(self._executor, self._run, items)
+        done.add_done_callback(lambda finished: self._finished(batch, finished))
+
+    def _finished(self, batch: list[tuple[Item, asyncio.Future, float]], finished: asyncio.Future) -> None:
+        if finished.cancelled():
+            self._resolve(batch, None, asyncio.CancelledError())
+        elif finished.exception() is not None:
+            self._resolve(batch, None, finished.exception())
+        else:
+            self._resolve(batch, finished.result(), None)
+
+    def _run(self, items: list[Item]) -> list[Result]:
+        started = time.perf_counter()
+        try:
+            results = self.function(items)
+        finally:
+            self.busy_seconds += time.perf_counter() - started
+        if len(results) != len(items):
+            raise RuntimeError(f"{self.name}: {len(results)} resultados para {len(items)} itens")
+        return results
+
+    def _resolve(self, batch: list[tuple[Item, asyncio.Future, float]], results: Optional[list[Result]],
+                 error: Optional[BaseException]) -> None:
+        if error is not None:
+            self.errors += 1
+        for index, (_, future, _) in enumerate(batch):
+            # Quem estourou o limite de latência já seguiu sem o resultado
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(results[index])
+            else:
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        """Tamanho dos lotes, latência (recente) e vazão"""
+        latencies = sorted(self._latencies)
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 3)
+
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+            "timeout_ms": self.timeout_seconds * 1000 if self.timeout_seconds else None,
+            "requests": self.requests,
+            "batches": self.batches,
+            "full_batches": self.full_batches,
+            "average_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+            "average_queue_ms": round(self.queue_seconds * 1000 / self.items, 3) if self.items else None,
+            "average_batch_ms": round(self.busy_seconds * 1000 / self.batches, 3) if self.batches else None,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+            "latency_max_ms": percentile(1.0),
+            # Vazão observada desde a primeira requisição e a capacidade (itens por segundo de lote)
+            "items_per_second": round(self.items / elapsed, 1) if elapsed else None,
+            "capacity_items_per_second": round(self.items / self.busy_seconds, 1) if self.busy_seconds else None,
+            "timeouts": self.timeouts,
+            "errors": self.errors
+        }
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
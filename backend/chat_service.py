@@ -0,0 +1,253 @@
+import asyncio
+from typing import Awaitable, Callable, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.aggregates import record_emotion
+from backend.batching import MicroBatcher
+from backend.emotion_analyzer import EmotionAnalysis, EmotionAnalyzer, EmotionBackend, KeywordEmotionBackend
+from backend.emotional_safety import SafetyAnalysis, SafetyLevel, safety_guard
+from backend.lexicon import CompiledLexicon, lexicon_for
+from backend.storage import ConversationArchivedError, ConversationData, ConversationStore, MessageData, StoreTransaction
+
+# Pipeline de mensagens compartilhado por main.py e simple_main.py
+#
+# Ordem: contexto (conversa + histórico, que traz o idioma do usuário) ->
+# segurança -> emoção -> resposta. A gravação da mensagem do usuário acontece
+# enquanto a resposta é gerada; tudo é confirmado em um único commit no final.
+#
+# A sobreposição com o LLM depende do store: no Postgres o INSERT da mensagem
+# (flush) roda durante a chamada; no SQLite só a preparação (conversa, objetos,
+# agregados) se sobrepõe e a escrita fica para o commit, porque um flush
+# seguraria o lock de escrita do arquivo durante toda a chamada ao LLM (com um
+# LLM de 200 ms e 20 requisições concorrentes, latência máxima 481 ms -> 1271 ms).
+# O store em memória só aplica as escritas no commit.
+
+# (user_message, emotion_analysis, conversation_history) -> texto da resposta
+Responder = Callable[..., Awaitable[str]]
+
+# (user_id, emotional_state, sentiment, intensity, keywords), chamado após o commit
+AnalysisListener = Callable[[Optional[str], str, str, float, list], None]
+
+# Mensagens de contexto enviadas ao gerador de respostas (incluindo a atual)
+HISTORY_WINDOW = 10
+
+# (conteúdo, léxico, analisador de emoção por palavras-chave ou None)
+AnalysisItem = Tuple[str, CompiledLexicon, Optional[EmotionAnalyzer]]
+
+def analyze_batch(items: list[AnalysisItem]) -> list[Tuple[SafetyAnalysis, Optional[EmotionAnalysis]]]:
+    """Segurança e emoção de várias mensagens em uma chamada (sem emoção nas crises)
+
+    As duas análises da mesma mensagem ficam lado a lado: a segunda reaproveita
+    a busca no léxico da primeira (cache de um texto no CompiledLexicon)."""
+    results = []
+    for content, lexicon, analyzer in items:
+        safety = safety_guard.analyze(content, lexicon=lexicon)
+        emotion = None
+        if analyzer is not None and safety.level != SafetyLevel.CRITICAL:
+            emotion = analyzer.analyze(content, lexicon=lexicon)
+        results.append((safety, emotion))
+    return results
+
+class ChatService:
+    """Serviço de conversa sobre um ConversationStore"""
+
+    def __init__(self, store: ConversationStore, responder: Responder, enable_audit_logs: bool = True,
+                 on_analysis: Optional[AnalysisListener] = None, emotion_backend: Optional[EmotionBackend] = None,
+                 analysis_batcher: Optional[MicroBatcher] = None):
+        self.store = store
+        self.responder = responder
+        self.enable_audit_logs = enable_audit_logs
+        self.on_analysis = on_analysis
+        self.emotion_backend = emotion_backend or KeywordEmotionBackend()
+        # Lotes de analyze_batch com as requisições concorrentes (None: análise direta)
+        self.analysis_batcher = analysis_batcher
+
+    async def _analyze(self, content: str, lexicon: CompiledLexicon) -> Tuple[SafetyAnalysis, Optional[EmotionAnalysis]]:
+        """Segurança e, com o backend de palavras-chave, emoção; em lote quando configurado"""
+        if self.analysis_batcher is None:
+            return safety_guard.analyze(content, lexicon=lexicon), None
+
+        analyzer = self.emotion_backend.analyzer if isinstance(self.emotion_backend, KeywordEmotionBackend) else None
+        try:
+            return await self.analysis_batcher.submit((content, lexicon, analyzer))
+        except asyncio.TimeoutError:
+            # Limite de latência estourado: a mensagem é analisada aqui mesmo
+            return analyze_batch([(content, lexicon, analyzer)])[0]
+
+    async def _run(self, function, *args):
+        """Executa operações do store no threadpool quando elas fazem I/O"""
+        if self.store.blocking:
+            return await run_in_threadpool(function, *args)
+        return function(*args)
+
+    async def send_message(self, content: str, conversation_id: Optional[str] = None,
+                           language: Optional[str] = None) -> dict:
+        """Processa a mensagem do usuário e devolve o payload da resposta"""
+        tx = self.store.begin()
+        try:
+            # Buscar conversa e histórico (único dado armazenado que a resposta precisa)
+            conversation, history = await self._run(self._load_context, tx, conversation_id)
+
+            # Léxico do idioma do usuário (ou do detectado no texto), o mesmo nas
+            # duas análises mesmo que uma recarga o troque no meio
+            lexicon = lexicon_for(language or (conversation.language if conversation else None), content)
+
+            # Análise de segurança (e emocional, quando feita no mesmo lote)
+            safety_analysis, emotion_analysis = await self._analyze(content, lexicon)
+
+            if safety_analysis.level == SafetyLevel.CRITICAL:
+                tx.close()
+                if self.enable_audit_logs:
+                    await self._run(self._record_safety_alert, content)
+
+                return {
+                    "safety_alert": True,
+                    "message": safety_analysis.redirect_message,
+                    "level": safety_analysis.level.value
+                }
+
+            # Análise emocional
+            if emotion_analysis is None:
+                emotion_analysis = await self.emotion_backend.analyze(content, lexicon=lexicon)
+
+            history.append({"role": "user", "content": content})
+
+            # Gerar a resposta e gravar a mensagem do usuário em paralelo
+            responder_task = asyncio.create_task(self.responder(
+                user_message=content,
+                emotion_analysis=emotion_analysis,
+                conversation_history=history
+            ))
+            try:
+                conversation, user_message = await self._run(
+                    self._stage_user_message, tx, conversation, content, emotion_analysis, safety_analysis
+                )
+            except Exception:
+                responder_task.cancel()
+                raise
+
+            ai_response = await responder_task
+
+            # Salvar resposta do assistente e confirmar a transação
+            assistant_message = await self._run(
+                self._commit_assistant_message, tx, conversation, ai_response, emotion_analysis
+            )
+        finally:
+            tx.close()
+
+        if self.on_analysis is not None:
+            self.on_analysis(
+                conversation.user_id,
+                emotion_analysis.emotional_state.value,
+                emotion_analysis.sentiment.value,
+                emotion_analysis.intensity,
+                emotion_analysis.keywords
+            )
+
+        return {
+            "conversation_id": conversation.id,
+            "user_message": {
+                "id": user_message.id,
+                "role": "user",
+                "content": content,
+                "emotional_state": emotion_analysis.emotional_state.value,
+                "emotion_intensity": emotion_analysis.intensity,
+                "created_at": user_message.created_at
+            },
+            "assistant_message": {
+                "id": assistant_message.id,
+                "role": "assistant",
+                "content": ai_response,
+                "created_at": assistant_message.created_at
+            },
+            "emotion_analysis": {
+                "state": emotion_analysis.emotional_state.value,
+                "sentiment": emotion_analysis.sentiment.value,
+                "confidence": emotion_analysis.confidence,
+                "intensity": emotion_analysis.intensity,
+                "keywords": emotion_analysis.keywords
+            }
+        }
+
+    # Etapas de armazenamento (executadas no threadpool em backends com I/O)
+
+    def _record_safety_alert(self, content: str) -> None:
+        """Log de auditoria para alertas de crise"""
+        tx = self.store.begin()
+        try:
+            tx.add_audit_log(
+                event_type="safety_alert",
+                event_data={
+                    "type": "crisis_detected",
+                    "message": content[:100]
+                },
+                safety_level="CRITICAL"
+            )
+            tx.commit()
+        finally:
+            tx.close()
+
+    def _load_context(self, tx: StoreTransaction, conversation_id: Optional[str]):
+        """Busca a conversa e as mensagens anteriores usadas como contexto"""
+        if not conversation_id:
+            return None, []
+
+        conversation = tx.get_conversation(conversation_id)
+        if conversation is None:
+            # Arquivada: continuar em uma conversa nova perderia o histórico sem aviso
+            if tx.is_archived(conversation_id):
+                raise ConversationArchivedError(conversation_id)
+            return None, []
+
+        return conversation, tx.recent_messages(conversation.id, HISTORY_WINDOW - 1)
+
+    def _stage_user_message(
+        self,
+        tx: StoreTransaction,
+        conversation: Optional[ConversationData],
+        content: str,
+        emotion_analysis: EmotionAnalysis,
+        safety_analysis: SafetyAnalysis
+    ):
+        """Cria a conversa (se necessário) e grava a mensagem do usuário sem commit"""
+        if conversation is None:
+            conversation = tx.create_conversation(
+                title=f"Conversation - {emotion_analysis.emotional_state.value}",
+                primary_emotion=emotion_analysis.emotional_state.value,
+                sentiment=emotion_analysis.sentiment.value
+            )
+
+        user_message = tx.add_message(MessageData(
+            conversation_id=conversation.id,
+            content=content,
+            role="user",
+            emotional_state=emotion_analysis.emotional_state.value,
+            sentiment=emotion_analysis.sentiment.value,
+            emotion_confidence=emotion_analysis.confidence,
+            emotion_intensity=emotion_analysis.intensity,
+            emotion_keywords=emotion_analysis.keywords,
+            safety_level=safety_analysis.level.value if safety_analysis.level != SafetyLevel.SAFE else None,
+            lexicon_version=emotion_analysis.lexicon_version
+        ))
+
+        return conversation, user_message
+
+    def _commit_assistant_message(self, tx: StoreTransaction, conversation: ConversationData, content: str,
+                                  emotion_analysis: EmotionAnalysis) -> MessageData:
+        """Grava a resposta do assistente, atualiza a conversa e confirma a transação"""
+        assistant_message = tx.add_message(MessageData(
+            conversation_id=conversation.id,
+            content=content,
+            role="assistant"
+        ))
+
+        # Agregados em O(1), aplicados pelo store sobre os valores atuais da conversa
+        tx.touch_conversation(conversation, added_messages=2, aggregate_update=lambda current: record_emotion(
+            current,
+            emotion_analysis.emotional_state.value,
+            emotion_analysis.sentiment.value,
+            emotion_analysis.intensity
+        ))
+        tx.commit()
+        return assistant_message
@@ -8,6 +8,23 @@ class Settings(BaseSettings):
     database_url: str = "sqlite:////tmp/empathic_ai.db"
     redis_url: str = "redis://localhost:6379/0"
     
+    # Pool de conexões (Postgres e SQLite em arquivo)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800  # Renova conexões antes de timeouts do servidor/proxy
+    db_pool_pre_ping: bool = True  # Descarta conexões mortas após failover
+    db_statement_timeout_ms: int = 30000  # Postgres; 0 desativa
+    
+    # Perfil de desempenho do SQLite (PRAGMAs aplicados em cada conexão)
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"  # Seguro com WAL; FULL para fsync a cada commit
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_temp_store: str = "MEMORY"
+    sqlite_read_pool_size: int = 8  # Pool separado, somente leitura (0 desativa)
+    
     # LLM
     openai_api_key: Optional[str] = None
     anthropic_api_key: Optional[str] = None
@@ -30,6 +47,55 @@ class Settings(BaseSettings):
     rate_limit_requests: int = 100
     rate_limit_period: int = 3600
     
+    # Storage do simple_main: "memory" (por processo) ou uma URL SQL compartilhada
+    # entre workers, ex.: "sqlite:////tmp/disc_you_shared.db" (modo WAL)
+    simple_store_url: str = "memory"
+    
+    # In-memory store (simple_main)
+    memory_store_max_conversations: int = 10000
+    memory_store_max_messages: int = 200
+    memory_store_ttl_seconds: Optional[int] = 86400
+    memory_store_max_bytes: Optional[int] = 256 * 1024 * 1024
+    memory_snapshot_dir: Optional[str] = None  # None desativa snapshots
+    memory_snapshot_interval_seconds: int = 300
+    
+    # Léxicos pré-compilados (python -m backend.lexicon build); None: backend/lexicon.bin
+    lexicon_artifact_path: Optional[str] = None
+    # Léxicos externos versionados (JSON), recarregados a quente; None: listas do código
+    lexicon_file: Optional[str] = None
+    lexicon_reload_interval_seconds: int = 10
+    # Léxicos de outros idiomas (<idioma>.json) além de backend/lexicons; compilados sob demanda
+    lexicon_dir: Optional[str] = None
+    lexicon_max_languages: int = 4
+    
+    # Análise emocional: "keywords" (léxicos) ou "embedding" (backend/emotion_classifier.py)
+    emotion_backend: str = "keywords"
+    emotion_model_path: Optional[str] = None  # python -m backend.emotion_classifier train --output ...
+    emotion_classifier_budget_ms: float = 50  # Acima disso a mensagem usa as palavras-chave
+    emotion_classifier_max_batch: int = 32
+    emotion_classifier_max_wait_ms: float = 2
+    emotion_classifier_workers: int = 1
+    # Micro-lotes da análise de segurança/palavras-chave entre requisições concorrentes
+    analysis_batching: bool = False
+    analysis_batch_max_size: int = 32
+    analysis_batch_max_wait_ms: float = 2
+    analysis_batch_timeout_ms: Optional[float] = 50  # Acima disso a mensagem é analisada sem lote
+    analysis_batch_workers: int = 0  # 0: lote roda no próprio event loop (análise em Python puro disputa o GIL)
+    
+    # Linha de base emocional por usuário (backend/baseline.py)
+    # Desligado até as mensagens terem usuário atribuído (sem isso não há o que agregar)
+    enable_baseline_aggregation: bool = False
+    baseline_flush_interval_seconds: int = 30
+    
+    # Retenção: conversas e logs de auditoria antigos vão para arquivos gzip
+    # particionados por data (backend/retention.py)
+    retention_archive_dir: Optional[str] = None  # None desativa a varredura em segundo plano
+    retention_conversation_days: Optional[int] = 180  # Sem atividade há N dias; None mantém
+    retention_audit_log_days: Optional[int] = 365
+    retention_sweep_interval_seconds: int = 3600
+    retention_batch_size: int = 500
+    retention_batch_pause_seconds: float = 0.1  # Pausa entre lotes (tráfego online)
+    
     # Monitoring
     log_level: str = "INFO"
     enable_audit_logs: bool = True
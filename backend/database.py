@@ -0,0 +1,205 @@
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from backend.config import settings
+from backend.models import Base
+from backend.search import install_search_index
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mede a espera por conexões (esgotamento do pool)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def metrics(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "wait_ms_avg": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0
+        }
+
+def _sqlite_pragmas(read_only: bool) -> list[str]:
+    """PRAGMAs do perfil de desempenho configurado em Settings"""
+    pragmas = [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        # Valor negativo: tamanho do cache em KiB, e não em páginas
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA temp_store={settings.sqlite_temp_store}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+def _engine_options(database_url: str, pool_size: Optional[int]) -> dict:
+    """Parâmetros de pool e conexão configurados em Settings"""
+    sqlite = database_url.startswith("sqlite")
+    options = {"connect_args": {"check_same_thread": False} if sqlite else {}}
+
+    if sqlite and database_url.rstrip("/") in ("sqlite:", "sqlite:/:memory:", "sqlite:///:memory:"):
+        return options  # :memory: usa um pool de conexão única
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size or settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    if database_url.startswith("postgresql") and settings.db_statement_timeout_ms > 0:
+        # Consultas presas não seguram a conexão do pool indefinidamente
+        options["connect_args"]["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+    return options
+
+def _add_missing_columns(engine) -> None:
+    """create_all não altera tabelas existentes: adiciona colunas novas (anuláveis) dos modelos"""
+    inspector = inspect(engine)
+    # Postgres aceita IF NOT EXISTS (workers simultâneos); no SQLite a corrida cai no retry do create_all
+    if_not_exists = "IF NOT EXISTS " if engine.dialect.name == "postgresql" else ""
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable and not column.primary_key:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {if_not_exists}"{column.name}" {column_type}'))
+            # Índices novos dos modelos (create_all também não os cria em tabelas existentes)
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+def install_schema(engine) -> None:
+    """Cria/atualiza tabelas, colunas, índices e a busca textual (idempotente)"""
+    # Vários workers podem criar o schema ao mesmo tempo ("table already exists"):
+    # cada nova tentativa só cria o que ainda falta
+    for attempt in range(5):
+        try:
+            Base.metadata.create_all(bind=engine)
+            _add_missing_columns(engine)
+            install_search_index(engine)
+            return
+        except OperationalError:
+            if attempt == 4:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+def create_db_engine(database_url: str, read_only: bool = False, pool_size: Optional[int] = None,
+                     create_schema: bool = True):
+    """Cria um engine com os ajustes do dialeto (SQLite ou Postgres)"""
+    engine = create_engine(database_url, **_engine_options(database_url, pool_size))
+    
+    if engine.dialect.name == "sqlite":
+        file_database = engine.url.database not in (None, "", ":memory:")
+        
+        @event.listens_for(engine, "connect")
+        def _configure_sqlite(dbapi_connection, connection_record):
+            """foreign_keys para o ON DELETE CASCADE; perfil de desempenho em arquivos"""
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            if file_database:
+                # WAL: leitores não bloqueiam o escritor (vários workers no mesmo arquivo)
+                for pragma in _sqlite_pragmas(read_only):
+                    cursor.execute(pragma)
+            cursor.close()
+    
+    if create_schema and not read_only:
+        install_schema(engine)
+    return engine
+
+# Engine e sessões compartilhados pela API e pelos comandos de linha. O engine
+# não conecta ao ser criado; o schema é verificado na primeira sessão, e não no
+# import (cold start em serverless: nenhuma ida ao banco antes da 1ª requisição)
+engine = create_db_engine(settings.database_url, create_schema=False)
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def ensure_schema() -> None:
+    """Instala o schema uma única vez por processo, no primeiro uso do banco"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            install_schema(engine)
+            _schema_ready = True
+
+class _SchemaSessionmaker(sessionmaker):
+    """sessionmaker que garante o schema antes de abrir a primeira sessão"""
+
+    def __call__(self, **local_kw):
+        ensure_schema()
+        return super().__call__(**local_kw)
+
+SessionLocal = _SchemaSessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _create_read_engine():
+    """Pool separado para leituras em SQLite (em WAL, não disputa com o escritor)"""
+    if engine.dialect.name != "sqlite" or settings.sqlite_read_pool_size <= 0:
+        return engine
+    if engine.url.database in (None, "", ":memory:"):
+        return engine  # Cada conexão :memory: é um banco diferente
+    return create_db_engine(settings.database_url, read_only=True, pool_size=settings.sqlite_read_pool_size)
+
+read_engine = _create_read_engine()
+ReadSessionLocal = _SchemaSessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+def get_db():
+    """Dependency para obter sessão do banco"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def pool_metrics() -> dict:
+    """Métricas dos pools de escrita e de leitura"""
+    pools = {"write": engine.pool}
+    if read_engine is not engine:
+        pools["read"] = read_engine.pool
+    return {
+        name: pool.metrics() if isinstance(pool, InstrumentedQueuePool) else {"status": pool.status()}
+        for name, pool in pools.items()
+    }
+
+def get_read_db():
+    """Dependency para endpoints somente leitura (pool de leitura)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,7 +1,8 @@
 from enum import Enum
 from dataclasses import dataclass
-from typing import Dict, Tuple
-import re
+from typing import Dict, Optional, Protocol, Tuple
+
+from backend.lexicon import CompiledLexicon, compiled_lexicon
 
 # Análise de sentimento usando padrões
 class Sentiment(str, Enum):
@@ -29,6 +30,7 @@ class EmotionAnalysis:
     confidence: float  # 0.0 a 1.0
     keywords: list[str]
     intensity: float  # 0.0 a 1.0 (força da emoção)
+    lexicon_version: Optional[str] = None  # fingerprint do léxico que pontuou o texto
 
 class EmotionAnalyzer:
     """Analisador de emoções e sentimentos"""
@@ -88,39 +90,58 @@ class EmotionAnalyzer:
     # Negadores
     NEGATORS = ['não', 'nunca', 'jamais', 'nada']
     
-    def analyze(self, text: str) -> EmotionAnalysis:
-        """Analisa emoção e sentimento do texto"""
+    def analyze(self, text: str, lexicon: Optional[CompiledLexicon] = None) -> EmotionAnalysis:
+        """Analisa emoção e sentimento do texto (com o léxico informado ou o em uso)"""
         text_lower = text.lower()
         
+        # Uma passada pelo texto (autômato do léxico) encontra todas as palavras-chave
+        lexicon = lexicon or compiled_lexicon()
+        found = lexicon.find(text_lower)
+        
         # Detectar emoção primária
-        emotional_state, confidence, keywords = self._detect_emotion(text_lower)
+        emotional_state, confidence, keywords = self._detect_emotion(lexicon, found)
         
         # Detectar sentimento geral
         sentiment = self._detect_sentiment(text_lower, emotional_state)
         
         # Calcular intensidade
-        intensity = self._calculate_intensity(text_lower, keywords)
+        intensity = self._calculate_intensity(text_lower, keywords, lexicon.intensifier_count(found))
         
         return EmotionAnalysis(
             sentiment=sentiment,
             emotional_state=emotional_state,
             confidence=confidence,
             keywords=keywords,
-            intensity=intensity
+            intensity=intensity,
+            lexicon_version=lexicon.fingerprint
         )
     
-    def _detect_emotion(self, text: str) -> Tuple[EmotionalState, float, list[str]]:
-        """Detecta a emoção primária do texto"""
-        emotion_scores: Dict[EmotionalState, float] = {}
-        found_keywords: Dict[EmotionalState, list[str]] = {state: [] for state in EmotionalState}
-        
-        for emotion, keywords in self.EMOTION_KEYWORDS.items():
-            score = 0.0
-            for keyword in keywords:
-                if keyword in text:
-                    score += 1.0
-                    found_keywords[emotion].append(keyword)
-            emotion_scores[emotion] = score
+    def analysis_for(self, text: str, emotional_state: EmotionalState, confidence: float,
+                     lexicon: Optional[CompiledLexicon] = None) -> EmotionAnalysis:
+        """Completa a análise (sentimento, palavras-chave, intensidade) de um estado decidido fora do léxico"""
+        text_lower = text.lower()
+        lexicon = lexicon or compiled_lexicon()
+        found = lexicon.find(text_lower)
+        keywords = lexicon.emotion_hits(found).get(emotional_state.value, [])
+        
+        return EmotionAnalysis(
+            sentiment=self._detect_sentiment(text_lower, emotional_state),
+            emotional_state=emotional_state,
+            confidence=confidence,
+            keywords=keywords,
+            intensity=self._calculate_intensity(text_lower, keywords, lexicon.intensifier_count(found)),
+            lexicon_version=lexicon.fingerprint
+        )
+    
+    def _detect_emotion(self, lexicon, found: frozenset) -> Tuple[EmotionalState, float, list[str]]:
+        """Detecta a emoção primária a partir das palavras-chave encontradas"""
+        hits = lexicon.emotion_hits(found)
+        found_keywords: Dict[EmotionalState, list[str]] = {
+            emotion: hits.get(emotion.value, []) for emotion in self.EMOTION_KEYWORDS
+        }
+        emotion_scores: Dict[EmotionalState, float] = {
+            emotion: float(len(keywords)) for emotion, keywords in found_keywords.items()
+        }
         
         # Encontrar emoção com maior score
         if max(emotion_scores.values()) == 0:
@@ -148,7 +169,7 @@ class EmotionAnalyzer:
         else:
             return Sentiment.NEUTRAL
     
-    def _calculate_intensity(self, text: str, keywords: list[str]) -> float:
+    def _calculate_intensity(self, text: str, keywords: list[str], intensifier_count: int) -> float:
         """Calcula a intensidade da emoção (0.0 a 1.0)"""
         intensity = 0.0
         
@@ -156,7 +177,6 @@ class EmotionAnalyzer:
         intensity += min(len(keywords) * 0.2, 0.5)
         
         # Intensificadores
-        intensifier_count = sum(1 for intensifier in self.INTENSIFIERS if intensifier in text)
         intensity += min(intensifier_count * 0.15, 0.3)
         
         # Pontuação (exclamações, reticências)
@@ -171,3 +191,39 @@ class EmotionAnalyzer:
 
 # Instância global
 emotion_analyzer = EmotionAnalyzer()
+
+# Backends da análise emocional no pipeline de mensagens
+
+class EmotionBackend(Protocol):
+    """Análise emocional assíncrona (permite lotes e pools fora do event loop)"""
+
+    async def analyze(self, text: str, lexicon: Optional[CompiledLexicon] = None) -> EmotionAnalysis: ...
+
+    def stats(self) -> dict: ...
+
+    def close(self) -> None: ...
+
+class KeywordEmotionBackend:
+    """Palavras-chave (padrão): síncrono, dezenas de microssegundos por mensagem"""
+
+    def __init__(self, analyzer: EmotionAnalyzer = emotion_analyzer):
+        self.analyzer = analyzer
+
+    async def analyze(self, text: str, lexicon: Optional[CompiledLexicon] = None) -> EmotionAnalysis:
+        return self.analyzer.analyze(text, lexicon=lexicon)
+
+    def stats(self) -> dict:
+        return {"backend": "keywords"}
+
+    def close(self) -> None:
+        pass
+
+def create_emotion_backend(name: str = "keywords") -> EmotionBackend:
+    """Cria o backend pelo nome: "keywords" ou "embedding" (classificador em NumPy)"""
+    if name == "keywords":
+        return KeywordEmotionBackend()
+    if name == "embedding":
+        # Importação tardia: o NumPy só é carregado com o classificador ativo
+        from backend.emotion_classifier import EmbeddingEmotionBackend
+        return EmbeddingEmotionBackend.from_settings()
+    raise ValueError(f"Backend de emoção desconhecido: {name}")
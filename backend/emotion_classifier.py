@@ -0,0 +1,393 @@
+# Classificador de emoções por embeddings (CPU, NumPy)
+#
+# Alternativa ao EmotionAnalyzer por palavras-chave, atrás da mesma
+# EmotionAnalysis (EMOTION_BACKEND=embedding). O texto vira um embedding por
+# feature hashing (palavras, pares de palavras e trigramas de caracteres, com
+# sinal, em `dim` dimensões) e uma camada linear (regressão ridge, resolvida
+# em forma fechada) dá a pontuação de cada estado emocional. Sentimento,
+# palavras-chave e intensidade continuam vindo do léxico do idioma. O treino
+# usa as palavras-chave de todos os idiomas e, opcionalmente, um JSONL
+# {"text", "label"} e as mensagens já rotuladas do banco (sem exemplos
+# rotulados o modelo só reconhece variações das palavras-chave):
+#
+#   python -m backend.emotion_classifier train --output models/emotion.npz [--examples ex.jsonl] [--from-db]
+#   python -m backend.emotion_classifier eval models/emotion.npz [--limit 5000]
+#
+# No pipeline, mensagens que chegam juntas são classificadas em lote
+# (backend/batching.py): o lote vira uma única multiplicação de matrizes em um
+# pool de threads (o NumPy libera o GIL). Se o resultado não chega dentro do
+# orçamento de latência, ou o modelo falha, a requisição usa a análise por
+# palavras-chave.
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from backend.batching import MicroBatcher
+from backend.config import settings
+from backend.emotion_analyzer import EmotionAnalysis, EmotionAnalyzer, EmotionalState, emotion_analyzer
+from backend.lexicon import CompiledLexicon, available_languages, lexicon_for, lexicon_source
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIM = 4096
+SIGN_BIT = 1 << 31
+# Pesos por tipo de feature: trigramas de caracteres aproximam variações das palavras
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 1.0
+TRIGRAM_WEIGHT = 0.4
+# Regularização da camada linear e pontuação mínima para decidir um estado
+RIDGE_ALPHA = 1.0
+MIN_SCORE = 0.2
+MAX_CONFIDENCE = 0.95
+
+_PUNCTUATION = ".,;:!?¿¡\"'()[]…"
+
+# Embeddings
+
+def _hashed(features: list[str], weight: float) -> tuple[tuple[int, ...], tuple[float, ...]]:
+    """Hashes das features e os pesos com sinal (crc32: estável entre processos, ao contrário de hash())"""
+    hashes = tuple(zlib.crc32(feature.encode("utf-8")) for feature in features)
+    return hashes, tuple(weight if hashed & SIGN_BIT else -weight for hashed in hashes)
+
+@lru_cache(maxsize=65536)
+def _word_features(word: str) -> tuple[tuple[int, ...], tuple[float, ...]]:
+    """Palavra e seus trigramas de caracteres (vocabulário repetido: calculado uma vez)"""
+    padded = f"<{word}>"
+    word_hashes, word_weights = _hashed(["w:" + word], WORD_WEIGHT)
+    trigram_hashes, trigram_weights = _hashed(
+        ["c:" + padded[start:start + 3] for start in range(len(padded) - 2)], TRIGRAM_WEIGHT
+    )
+    return word_hashes + trigram_hashes, word_weights + trigram_weights
+
+def embed(texts: list[str], dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Embeddings por feature hashing com sinal (len(texts) × dim, norma 1; zeros sem features)"""
+    hashes = []
+    weights = []
+    lengths = []
+    for text in texts:
+        start = len(hashes)
+        words = [word for word in (word.strip(_PUNCTUATION) for word in text.lower().split()) if word]
+        for word in words:
+            word_hashes, word_weights = _word_features(word)
+            hashes.extend(word_hashes)
+            weights.extend(word_weights)
+        bigram_hashes, bigram_weights = _hashed(
+            [f"b:{first} {second}" for first, second in zip(words, words[1:])], BIGRAM_WEIGHT
+        )
+        hashes.extend(bigram_hashes)
+        weights.extend(bigram_weights)
+        lengths.append(len(hashes) - start)
+
+    # Posição no vetor achatado: linha × dim + (hash mod dim)
+    indices = (np.asarray(hashes, dtype=np.int64) & (dim - 1)) + np.repeat(
+        np.arange(len(texts), dtype=np.int64) * dim, lengths
+    )
+    matrix = np.bincount(
+        indices, weights=np.asarray(weights, dtype=np.float64),
+        minlength=len(texts) * dim
+    ).reshape(len(texts), dim).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+# Modelo
+
+class EmbeddingModel:
+    """Camada linear (dim × estados) sobre os embeddings"""
+
+    def __init__(self, weights: np.ndarray, labels: list[str], metadata: Optional[dict] = None):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        self.labels = list(labels)
+        self.dim = self.weights.shape[0]
+        self.metadata = metadata or {}
+        digest = hashlib.blake2b(self.weights.tobytes(), digest_size=6)
+        digest.update(json.dumps(self.labels).encode("utf-8"))
+        self.version = digest.hexdigest()
+
+    @classmethod
+    def train(cls, examples: Iterable[tuple[str, str]], dim: int = DEFAULT_DIM, alpha: float = RIDGE_ALPHA,
+              batch_size: int = 1024) -> "EmbeddingModel":
+        """Regressão ridge dos exemplos (texto, estado) para o estado em one-hot
+
+        As matrizes XᵀX e XᵀY são acumuladas por lote: a memória não cresce com
+        o número de exemplos (só com dim²)."""
+        if dim & (dim - 1):
+            raise ValueError("dim deve ser potência de 2")
+        labels = [state.value for state in EmotionalState]
+        label_index = {label: index for index, label in enumerate(labels)}
+        gram = np.zeros((dim, dim), dtype=np.float64)
+        targets = np.zeros((dim, len(labels)), dtype=np.float64)
+        counts = np.zeros(len(labels), dtype=np.int64)
+
+        def add(batch: list[tuple[str, str]]) -> None:
+            features = embed([text for text, _ in batch], dim).astype(np.float64)
+            rows = np.array([label_index[label] for _, label in batch])
+            onehot = np.zeros((len(batch), len(labels)))
+            onehot[np.arange(len(batch)), rows] = 1
+            gram[...] += features.T @ features
+            targets[...] += features.T @ onehot
+            np.add.at(counts, rows, 1)
+
+        batch = []
+        for text, label in examples:
+            if label not in label_index:
+                raise ValueError(f"Rótulo desconhecido: {label!r}")
+            batch.append((text, label))
+            if len(batch) >= batch_size:
+                add(batch)
+                batch = []
+        if batch:
+            add(batch)
+
+        gram[np.diag_indices(dim)] += alpha
+        metadata = {
+            "trained_at": datetime.utcnow().isoformat(),
+            "alpha": alpha,
+            "examples": {label: int(count) for label, count in zip(labels, counts)},
+        }
+        return cls(np.linalg.solve(gram, targets), labels, metadata)
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingModel":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["weights"], [str(label) for label in data["labels"]], json.loads(str(data["metadata"])))
+
+    def save(self, path: str) -> None:
+        """Grava o modelo (.npz, sem pickle) de forma atômica"""
+        temporary = path + ".tmp.npz"
+        np.savez(temporary, weights=self.weights, labels=np.array(self.labels), metadata=np.array(json.dumps(self.metadata)))
+        os.replace(temporary, path)
+
+    def classify(self, texts: list[str]) -> list[tuple[str, float]]:
+        """(estado, confiança) por texto; sem pontuação suficiente, (calm, 0.3) como nas palavras-chave"""
+        if not texts:
+            return []
+        scores = embed(texts, self.dim) @ self.weights
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(texts)), best]
+
+        results = []
+        for index, score in zip(best.tolist(), best_scores.tolist()):
+            if score < MIN_SCORE:
+                results.append((EmotionalState.CALM.value, 0.3))
+            else:
+                results.append((self.labels[index], round(min(score, MAX_CONFIDENCE), 4)))
+        return results
+
+    def info(self) -> dict:
+        return {"version": self.version, "dim": self.dim, "labels": len(self.labels), **self.metadata}
+
+_models: dict[str, EmbeddingModel] = {}
+_models_lock = threading.Lock()
+
+def load_model(path: str) -> EmbeddingModel:
+    """Modelo do arquivo, carregado uma vez por processo"""
+    with _models_lock:
+        if path not in _models:
+            _models[path] = EmbeddingModel.load(path)
+        return _models[path]
+
+def classified_analysis(model: EmbeddingModel, text: str, result: tuple[str, float],
+                        lexicon: Optional[CompiledLexicon] = None,
+                        analyzer: EmotionAnalyzer = emotion_analyzer) -> EmotionAnalysis:
+    """EmotionAnalysis do estado classificado; a versão inclui a do modelo"""
+    state, confidence = result
+    analysis = analyzer.analysis_for(text, EmotionalState(state), confidence, lexicon)
+    analysis.lexicon_version = f"{analysis.lexicon_version}:{model.version}"
+    return analysis
+
+# Backend do pipeline (lotes + orçamento de latência)
+
+class EmbeddingEmotionBackend:
+    """Classificação em lote por embeddings, com fallback para as palavras-chave"""
+
+    def __init__(self, model_path: str, budget_ms: float = 50, max_batch: int = 32, max_wait_ms: float = 2,
+                 workers: int = 1, analyzer: EmotionAnalyzer = emotion_analyzer):
+        self.model_path = model_path
+        self.analyzer = analyzer
+        # O orçamento de latência é o timeout de cada requisição no lote
+        self.batcher = MicroBatcher(
+            self._classify, max_batch=max_batch, max_wait_ms=max_wait_ms, timeout_ms=budget_ms,
+            workers=max(1, workers), name="emotion-classifier"
+        )
+        self._model: Optional[EmbeddingModel] = None
+        self._model_error: Optional[Exception] = None
+        self._model_lock = threading.Lock()
+
+        self.requests = 0
+        self.fallbacks = 0
+        self.errors = 0
+
+    @classmethod
+    def from_settings(cls) -> "EmbeddingEmotionBackend":
+        if not settings.emotion_model_path:
+            raise ValueError("EMOTION_BACKEND=embedding exige EMOTION_MODEL_PATH")
+        return cls(
+            settings.emotion_model_path,
+            budget_ms=settings.emotion_classifier_budget_ms,
+            max_batch=settings.emotion_classifier_max_batch,
+            max_wait_ms=settings.emotion_classifier_max_wait_ms,
+            workers=settings.emotion_classifier_workers
+        )
+
+    def model(self) -> EmbeddingModel:
+        """Carrega o modelo no primeiro lote; uma falha vale até reiniciar (sem novas tentativas a cada lote)"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None and self._model_error is None:
+                    try:
+                        self._model = load_model(self.model_path)
+                        logger.info(f"Modelo de emoções {self._model.version} carregado de {self.model_path}")
+                    except (OSError, ValueError, KeyError) as e:
+                        logger.error(f"Modelo de emoções indisponível ({self.model_path}): {e}; usando palavras-chave")
+                        self._model_error = e
+        if self._model is None:
+            raise RuntimeError(f"Modelo de emoções indisponível: {self._model_error}")
+        return self._model
+
+    def _classify(self, texts: list[str]) -> list[tuple[str, float]]:
+        return self.model().classify(texts)
+
+    async def analyze(self, text: str, lexicon: Optional[CompiledLexicon] = None) -> EmotionAnalysis:
+        """Estado pelo classificador (em lote), dentro do orçamento; senão palavras-chave"""
+        self.requests += 1
+        if self._model_error is not None:
+            self.errors += 1
+            return self.analyzer.analyze(text, lexicon=lexicon)
+
+        try:
+            result = await self.batcher.submit(text)
+        except asyncio.TimeoutError:
+            self.fallbacks += 1
+            return self.analyzer.analyze(text, lexicon=lexicon)
+        except Exception:
+            self.errors += 1
+            return self.analyzer.analyze(text, lexicon=lexicon)
+        return classified_analysis(self._model, text, result, lexicon, self.analyzer)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "embedding",
+            "model": self._model.info() if self._model else None,
+            "model_error": str(self._model_error) if self._model_error else None,
+            "requests": self.requests,
+            "batching": self.batcher.stats(),
+            "fallbacks": self.fallbacks,
+            "errors": self.errors
+        }
+
+    def close(self) -> None:
+        self.batcher.close()
+
+# Treino e avaliação
+
+def lexicon_examples() -> Iterator[tuple[str, str]]:
+    """Palavras-chave de todos os idiomas como exemplos (texto, estado)"""
+    for language in available_languages():
+        for state, keywords in lexicon_source(language)["emotion"].items():
+            for keyword in keywords:
+                yield keyword, state
+
+def file_examples(path: str) -> Iterator[tuple[str, str]]:
+    with open(path, encoding="utf-8") as examples:
+        for line in examples:
+            if line.strip():
+                record = json.loads(line)
+                yield record["text"], record["label"]
+
+def database_examples(db, limit: Optional[int] = None, min_confidence: float = 0.6) -> Iterator[tuple[str, str]]:
+    """Mensagens do usuário já rotuladas com confiança mínima (rótulos fracos)"""
+    from backend.models import Message
+
+    query = db.query(Message.content, Message.emotional_state).filter(
+        Message.role == "user",
+        Message.emotional_state.isnot(None),
+        Message.emotion_confidence >= min_confidence
+    ).order_by(Message.created_at.desc())
+    if limit:
+        query = query.limit(limit)
+    for content, state in query.yield_per(1000):
+        if content:
+            yield content, state
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Classificador de emoções por embeddings")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    train = subcommands.add_parser("train", help="Treina a regressão ridge sobre os embeddings e grava o modelo")
+    train.add_argument("--output", default=settings.emotion_model_path)
+    train.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    train.add_argument("--examples", help="JSONL com {\"text\", \"label\"}")
+    train.add_argument("--from-db", action="store_true", help="Incluir mensagens rotuladas do banco")
+    train.add_argument("--limit", type=int, help="Máximo de mensagens do banco")
+    evaluate = subcommands.add_parser("eval", help="Concordância com as palavras-chave nas mensagens do banco")
+    evaluate.add_argument("model", nargs="?", default=settings.emotion_model_path)
+    evaluate.add_argument("--limit", type=int, default=5000)
+    evaluate.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        if not args.output:
+            parser.error("informe --output (ou EMOTION_MODEL_PATH)")
+        sources = [lexicon_examples()]
+        if args.examples:
+            sources.append(file_examples(args.examples))
+
+        db = None
+        if args.from_db:
+            from backend.database import SessionLocal
+            db = SessionLocal()
+            sources.append(database_examples(db, args.limit))
+        try:
+            started = time.perf_counter()
+            model = EmbeddingModel.train((example for source in sources for example in source), args.dim)
+        finally:
+            if db is not None:
+                db.close()
+        model.save(args.output)
+        print(f"{args.output}: {json.dumps(model.info())} em {time.perf_counter() - started:.2f}s", file=sys.stderr)
+        return
+
+    if not args.model:
+        parser.error("informe o modelo (ou EMOTION_MODEL_PATH)")
+    from backend.database import SessionLocal
+    from backend.models import Message
+
+    model = EmbeddingModel.load(args.model)
+    db = SessionLocal()
+    try:
+        texts = [content for (content,) in db.query(Message.content).filter(
+            Message.role == "user", Message.content.isnot(None)
+        ).order_by(Message.created_at.desc()).limit(args.limit)]
+    finally:
+        db.close()
+
+    agreement = 0
+    elapsed = 0.0
+    for start in range(0, len(texts), args.batch_size):
+        batch = texts[start:start + args.batch_size]
+        started = time.perf_counter()
+        results = model.classify(batch)
+        elapsed += time.perf_counter() - started
+        for text, (state, _) in zip(batch, results):
+            agreement += state == emotion_analyzer.analyze(text, lexicon=lexicon_for(None, text)).emotional_state.value
+    print(json.dumps({
+        "model": model.version,
+        "messages": len(texts),
+        "keyword_agreement": round(agreement / len(texts), 4) if texts else None,
+        "classify_us_per_message": round(elapsed * 1e6 / len(texts), 1) if texts else None
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ from enum import Enum
 from dataclasses import dataclass
 from typing import Optional, Tuple
 
+from backend.lexicon import CompiledLexicon, compiled_lexicon, crisis_terms_found
+
 class SafetyLevel(str, Enum):
     SAFE = "safe"
     WARNING = "warning"
@@ -51,12 +53,23 @@ class EmotionalSafetyGuard:
         'tribunal', 'julgamento', 'direito', 'contrato'
     ]
     
-    def analyze(self, text: str, conversation_length: int = 0) -> SafetyAnalysis:
-        """Analisa segurança da mensagem"""
+    def analyze(self, text: str, conversation_length: int = 0,
+                lexicon: Optional[CompiledLexicon] = None) -> SafetyAnalysis:
+        """Analisa segurança da mensagem (com o léxico informado ou o em uso)"""
         text_lower = text.lower()
         
+        # Uma passada pelo texto: categoria de maior prioridade encontrada
+        lexicon = lexicon or compiled_lexicon()
+        category = lexicon.safety_category(lexicon.find(text_lower))
+        
+        # O idioma escolhido nunca restringe a detecção de crise: os termos de
+        # crise de todos os idiomas também valem (mensagens mistas, gírias como
+        # "to" = "tô" detectadas como inglês), estejam seus léxicos carregados ou não
+        if category != "crisis" and crisis_terms_found(text_lower):
+            category = "crisis"
+        
         # Verificar risco de crise
-        if self._contains_keywords(text_lower, self.CRISIS_KEYWORDS):
+        if category == "crisis":
             return SafetyAnalysis(
                 level=SafetyLevel.CRITICAL,
                 reason="Possible suicidal ideation or self-harm risk detected",
@@ -65,7 +78,7 @@ class EmotionalSafetyGuard:
             )
         
         # Verificar abuso
-        if self._contains_keywords(text_lower, self.ABUSE_KEYWORDS):
+        if category == "abuse":
             return SafetyAnalysis(
                 level=SafetyLevel.CRITICAL,
                 reason="Possible abuse or violence situation detected",
@@ -74,7 +87,7 @@ class EmotionalSafetyGuard:
             )
         
         # Verificar dependência emocional excessiva
-        if self._contains_keywords(text_lower, self.DEPENDENCY_KEYWORDS):
+        if category == "dependency":
             return SafetyAnalysis(
                 level=SafetyLevel.WARNING,
                 reason="Signs of emotional dependency on AI detected",
@@ -83,7 +96,7 @@ class EmotionalSafetyGuard:
             )
         
         # Verificar pedidos de conselho médico
-        if self._contains_keywords(text_lower, self.MEDICAL_KEYWORDS):
+        if category == "medical":
             return SafetyAnalysis(
                 level=SafetyLevel.WARNING,
                 reason="Medical advice request detected",
@@ -92,7 +105,7 @@ class EmotionalSafetyGuard:
             )
         
         # Verificar pedidos de conselho legal
-        if self._contains_keywords(text_lower, self.LEGAL_KEYWORDS):
+        if category == "legal":
             return SafetyAnalysis(
                 level=SafetyLevel.WARNING,
                 reason="Legal advice request detected",
@@ -115,10 +128,6 @@ class EmotionalSafetyGuard:
             action="PROCEED NORMALLY"
         )
     
-    def _contains_keywords(self, text: str, keywords: list[str]) -> bool:
-        """Verifica se texto contém keywords"""
-        return any(keyword in text for keyword in keywords)
-    
     def _get_crisis_response(self) -> str:
         """Resposta para situação de crise"""
         return """I'm genuinely concerned about what you're sharing. Your safety is important.
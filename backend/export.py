@@ -0,0 +1,240 @@
+# Exportação em streaming (NDJSON) de conversas, mensagens e logs de auditoria
+#
+# Uso pela linha de comando:
+#   python -m backend.export messages --output mensagens.ndjson.gz --gzip
+#   python -m backend.export conversations --user-id 123 --start 2024-01-01
+#   python -m backend.export audit_logs --event-type safety_alert --start 2024-01-01 --gzip -o auditoria.ndjson.gz
+import argparse
+import json
+import sys
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from backend.database import ReadSessionLocal
+from backend.models import AuditLog, Conversation, Message
+from backend.pagination import encode_cursor, keyset_after
+
+# Colunas exportadas (projeção sem hidratar objetos ORM)
+MESSAGE_COLUMNS = (
+    Message.id,
+    Message.conversation_id,
+    # messages.user_id nunca é preenchido: o dono é o da conversa
+    Conversation.user_id.label("user_id"),
+    Message.role,
+    Message.content,
+    Message.emotional_state,
+    Message.sentiment,
+    Message.emotion_confidence,
+    Message.emotion_intensity,
+    Message.safety_level,
+    Message.lexicon_version,
+    Message.created_at,
+)
+
+CONVERSATION_COLUMNS = (
+    Conversation.id,
+    Conversation.user_id,
+    Conversation.title,
+    Conversation.primary_emotion,
+    Conversation.sentiment,
+    Conversation.average_intensity,
+    Conversation.message_count,
+    Conversation.is_archived,
+    Conversation.created_at,
+    Conversation.updated_at,
+)
+
+AUDIT_LOG_COLUMNS = (
+    AuditLog.id,
+    AuditLog.user_id,
+    AuditLog.event_type,
+    AuditLog.event_data,
+    AuditLog.safety_level,
+    AuditLog.action_taken,
+    AuditLog.created_at,
+)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+def _iter_chunked(query, timestamp_column, id_column, chunk_size: int) -> Iterator[dict]:
+    """Percorre a consulta em blocos keyset, mantendo memória constante"""
+    cursor = None
+    while True:
+        page = query
+        if cursor:
+            page = page.filter(keyset_after(timestamp_column, id_column, cursor))
+        rows = page.order_by(timestamp_column, id_column).limit(chunk_size).all()
+
+        for row in rows:
+            yield dict(row._mapping)
+
+        if len(rows) < chunk_size:
+            return
+        cursor = encode_cursor(rows[-1]._mapping[timestamp_column.key], rows[-1]._mapping[id_column.key])
+
+def iter_messages(
+    db,
+    conversation_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    emotional_state: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[dict]:
+    """Itera mensagens filtradas, em ordem cronológica"""
+    query = db.query(*MESSAGE_COLUMNS).outerjoin(Conversation, Conversation.id == Message.conversation_id)
+
+    if conversation_id:
+        query = query.filter(Message.conversation_id == conversation_id)
+    if user_id:
+        query = query.filter(Conversation.user_id == user_id)
+    if start:
+        query = query.filter(Message.created_at >= start)
+    if end:
+        query = query.filter(Message.created_at < end)
+    if emotional_state:
+        query = query.filter(Message.emotional_state == emotional_state)
+
+    return _iter_chunked(query, Message.created_at, Message.id, chunk_size)
+
+def iter_conversations(
+    db,
+    conversation_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    emotional_state: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[dict]:
+    """Itera conversas filtradas, em ordem de criação"""
+    query = db.query(*CONVERSATION_COLUMNS)
+
+    if conversation_id:
+        query = query.filter(Conversation.id == conversation_id)
+    if user_id:
+        query = query.filter(Conversation.user_id == user_id)
+    if start:
+        query = query.filter(Conversation.created_at >= start)
+    if end:
+        query = query.filter(Conversation.created_at < end)
+    if emotional_state:
+        query = query.filter(Conversation.primary_emotion == emotional_state)
+
+    return _iter_chunked(query, Conversation.created_at, Conversation.id, chunk_size)
+
+def filter_audit_logs(
+    query,
+    user_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    safety_level: Optional[str] = None
+):
+    """Filtros da revisão de segurança (cobertos pelos índices de audit_logs)"""
+    if user_id:
+        query = query.filter(AuditLog.user_id == user_id)
+    if start:
+        query = query.filter(AuditLog.created_at >= start)
+    if end:
+        query = query.filter(AuditLog.created_at < end)
+    if event_type:
+        query = query.filter(AuditLog.event_type == event_type)
+    if safety_level:
+        query = query.filter(AuditLog.safety_level == safety_level)
+    return query
+
+def iter_audit_logs(
+    db,
+    user_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    safety_level: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[dict]:
+    """Itera logs de auditoria filtrados, em ordem cronológica (exportação de compliance)"""
+    query = filter_audit_logs(db.query(*AUDIT_LOG_COLUMNS), user_id, start, end, event_type, safety_level)
+    return _iter_chunked(query, AuditLog.created_at, AuditLog.id, chunk_size)
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value)}")
+
+def to_ndjson(records: Iterable[dict], batch_size: int = 200) -> Iterator[bytes]:
+    """Serializa registros como NDJSON, agrupando linhas em blocos de bytes"""
+    buffer = []
+    for record in records:
+        buffer.append(json.dumps(record, ensure_ascii=False, default=_json_default))
+        if len(buffer) >= batch_size:
+            yield ("\n".join(buffer) + "\n").encode("utf-8")
+            buffer = []
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode("utf-8")
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprime um fluxo de bytes em formato gzip, bloco a bloco"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+EXPORTERS = {
+    "messages": iter_messages,
+    "conversations": iter_conversations,
+}
+
+# Logs de auditoria só são exportados pelo endpoint restrito de auditoria e pela linha de comando
+ALL_EXPORTERS = {**EXPORTERS, "audit_logs": iter_audit_logs}
+
+def stream_export(kind: str, compress: bool = False, **filters) -> Iterator[bytes]:
+    """Gera a exportação completa usando uma sessão própria (para StreamingResponse)"""
+    db = ReadSessionLocal()
+    try:
+        chunks = to_ndjson(ALL_EXPORTERS[kind](db, **filters))
+        if compress:
+            chunks = gzip_chunks(chunks)
+        yield from chunks
+    finally:
+        db.close()
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Exporta conversas/mensagens/logs de auditoria em NDJSON")
+    parser.add_argument("kind", choices=sorted(ALL_EXPORTERS))
+    parser.add_argument("--output", "-o", default="-", help="Arquivo de saída (padrão: stdout)")
+    parser.add_argument("--gzip", action="store_true", help="Comprimir a saída com gzip")
+    parser.add_argument("--conversation-id")
+    parser.add_argument("--user-id")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Data inicial (ISO 8601)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Data final, exclusiva (ISO 8601)")
+    parser.add_argument("--emotional-state")
+    parser.add_argument("--event-type", help="Somente audit_logs")
+    parser.add_argument("--safety-level", help="Somente audit_logs")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    filters = {"user_id": args.user_id, "start": args.start, "end": args.end}
+    if args.kind == "audit_logs":
+        if args.conversation_id or args.emotional_state:
+            parser.error("audit_logs aceita apenas --user-id, --start, --end, --event-type e --safety-level")
+        filters.update(event_type=args.event_type, safety_level=args.safety_level)
+    else:
+        if args.event_type or args.safety_level:
+            parser.error("--event-type e --safety-level valem apenas para audit_logs")
+        filters.update(conversation_id=args.conversation_id, emotional_state=args.emotional_state)
+
+    chunks = stream_export(args.kind, compress=args.gzip, chunk_size=args.chunk_size, **filters)
+
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import hashlib
+from typing import Optional
+
+# ETags fortes para respostas condicionais (If-None-Match -> 304)
+
+def make_etag(*parts) -> str:
+    """Gera um ETag forte a partir das partes que definem a versão do recurso"""
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return '"' + hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Verifica se o header If-None-Match do cliente corresponde ao ETag atual"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
@@ -0,0 +1,49 @@
+import os
+import threading
+import time
+
+# IDs únicos, ordenáveis por tempo (formato ULID: 48 bits de milissegundos +
+# 80 bits aleatórios, em base32 Crockford com 26 caracteres).
+#
+# Dentro do mesmo milissegundo a parte aleatória é incrementada, então os IDs
+# gerados por um processo são estritamente crescentes e nunca colidem. Inserções
+# ficam no fim dos índices B-tree, ao contrário dos UUID4 aleatórios.
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+class MonotonicIdGenerator:
+    """Gerador thread-safe de IDs monotônicos no formato ULID"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._last_random = 0
+
+    def new(self) -> str:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            elif self._last_random < _RANDOM_MAX:
+                self._last_random += 1
+            else:
+                # Parte aleatória esgotada neste milissegundo: avança o relógio lógico
+                self._last_ms += 1
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            value = (self._last_ms << _RANDOM_BITS) | self._last_random
+
+        chars = []
+        for _ in range(26):
+            chars.append(_ALPHABET[value & 0x1F])
+            value >>= 5
+        return "".join(reversed(chars))
+
+# Instância global
+id_generator = MonotonicIdGenerator()
+
+def new_id(prefix: str = "") -> str:
+    """Gera um novo ID ordenável por tempo, com prefixo opcional (ex.: "conv-")"""
+    return prefix + id_generator.new()
@@ -0,0 +1,81 @@
+# Idioma das mensagens (escolha do léxico por idioma em backend/lexicon.py)
+#
+# O idioma vem de User.language ("pt-BR", "en-US", ...). Sem idioma definido
+# (conversa anônima) ou com um idioma sem léxico, ele é detectado pelo próprio
+# texto: contagem de palavras funcionais típicas de cada idioma, limitada ao
+# começo da mensagem. Custa uma divisão em palavras e uma consulta a dict por
+# palavra (~10 µs por mensagem curta).
+from typing import Iterable, Optional
+
+DEFAULT_LANGUAGE = "pt"
+
+# Palavras frequentes e exclusivas de cada idioma (as comuns a dois ficam de fora,
+# inclusive pronomes como "me" e grafias sem acento como "so")
+STOPWORDS = {
+    "pt": frozenset({
+        "não", "você", "eu", "estou", "muito", "com", "uma", "um", "meu", "minha",
+        "isso", "mas", "também", "ele", "ela", "tenho", "sinto", "hoje", "quando",
+        "sou", "em", "ao", "nós", "mais", "já", "até", "só", "o", "os", "do", "da",
+        "dos", "das", "à", "pra", "estava", "foi", "vou", "nada", "obrigado", "obrigada",
+    }),
+    "es": frozenset({
+        "yo", "estoy", "muy", "con", "una", "un", "mi", "eso", "pero", "también",
+        "él", "tengo", "siento", "hoy", "cuando", "soy", "en", "nosotros", "más",
+        "ya", "hasta", "solo", "el", "los", "del", "y", "lo", "qué", "estaba",
+        "fue", "voy", "nadie", "porqué", "mucho", "la", "las", "gracias",
+    }),
+    "en": frozenset({
+        "i", "i'm", "im", "am", "is", "are", "the", "and", "you", "my", "not",
+        "don't", "very", "with", "to", "for", "it", "this", "that", "but", "feel",
+        "have", "today", "because", "when", "of", "in", "was", "be", "can't",
+        "what", "myself", "thanks", "thank",
+    }),
+}
+
+# Palavra → idioma (as listas não se sobrepõem): uma consulta por palavra
+_WORD_LANGUAGE = {word: language for language, words in STOPWORDS.items() for word in words}
+
+# Letras que só aparecem em um dos idiomas (cada ocorrência vale como uma palavra)
+LETTER_HINTS = {"ã": "pt", "õ": "pt", "ç": "pt", "ñ": "es", "¿": "es", "¡": "es"}
+
+# Só o começo da mensagem: custo limitado mesmo em textos longos
+DETECTION_PREFIX = 400
+
+# Pontuação colada às palavras ("hoje,", "¿qué")
+_PUNCTUATION = ".,;:!?¿¡\"'()[]…"
+
+def normalize_language(language: Optional[str]) -> Optional[str]:
+    """Código primário em minúsculas ("pt-BR" → "pt", "en_US" → "en")"""
+    if not language:
+        return None
+    return language.strip().replace("_", "-").split("-")[0].lower() or None
+
+def detect_language(text: str, languages: Iterable[str] = STOPWORDS, default: str = DEFAULT_LANGUAGE) -> str:
+    """Idioma mais provável do texto entre `languages` (`default` se nada indicar)"""
+    candidates = [language for language in languages if language in STOPWORDS]
+    if not candidates:
+        return default
+
+    prefix = text[:DETECTION_PREFIX].lower()
+    scores = dict.fromkeys(candidates, 0)
+    for word in prefix.split():
+        language = _WORD_LANGUAGE.get(word) or _WORD_LANGUAGE.get(word.strip(_PUNCTUATION))
+        if language in scores:
+            scores[language] += 1
+    for letter, language in LETTER_HINTS.items():
+        if language in scores and letter in prefix:
+            scores[language] += prefix.count(letter)
+
+    best = max(scores.values())
+    if best == 0 or scores.get(default) == best:
+        return default
+    return max(scores, key=scores.get)
+
+def resolve_language(preferred: Optional[str], text: str, available: Iterable[str],
+                     default: str = DEFAULT_LANGUAGE) -> str:
+    """Idioma do usuário, se houver léxico para ele; senão o detectado no texto"""
+    available = set(available)
+    language = normalize_language(preferred)
+    if language in available:
+        return language
+    return detect_language(text, available, default)
@@ -0,0 +1,780 @@
+# Léxicos compilados (Aho-Corasick) e artefato binário pré-compilado
+#
+# As listas de palavras-chave de EmotionAnalyzer e EmotionalSafetyGuard viram
+# um único autômato Aho-Corasick: uma passada pelo texto encontra todas as
+# palavras-chave presentes (mesma semântica de "keyword in text"), em vez de
+# uma busca por palavra-chave. A análise de segurança e a de emoção da mesma
+# mensagem compartilham essa passada.
+#
+# O passo de build grava o autômato em um artefato binário versionado:
+#
+#   python -m backend.lexicon build [--output backend/lexicon.bin]
+#   python -m backend.lexicon info
+#
+# Em produção o artefato é mapeado em memória (mmap) no primeiro uso: as
+# tabelas ficam no page cache, compartilhadas entre processos, e cada estado do
+# autômato só vira dict Python quando algum texto passa por ele. Se o artefato não
+# existir, estiver corrompido ou for de outra versão dos léxicos (fingerprint
+# diferente), o autômato é compilado a partir do código.
+#
+# Léxicos externos: com LEXICON_FILE apontando para um JSON versionado
+#
+#   {"version": "2024-07-01", "emotion": {"sadness": [...], ...},
+#    "intensifiers": [...], "safety": {"crisis": [...], ...}}
+#
+# as listas vêm do arquivo em vez do código. O LexiconReloader observa o
+# arquivo: cada versão nova é validada e compilada na thread dele, e só então
+# substitui o léxico em uso (troca de uma referência). Uma requisição usa o
+# mesmo léxico do começo ao fim; um arquivo inválido é rejeitado e a versão
+# anterior continua valendo. A versão gravada em cada mensagem é o fingerprint
+# do conteúdo; o campo "version" do arquivo é só um rótulo.
+#
+# Idiomas: o português (idioma padrão) está no código; os demais são arquivos
+# no mesmo formato em backend/lexicons/<idioma>.json, que LEXICON_DIR pode
+# sobrescrever ou complementar. Cada idioma tem o próprio autômato (nenhuma
+# passada fica mais lenta por causa dos outros), compilado na primeira
+# mensagem naquele idioma e mantido em um LRU de LEXICON_MAX_LANGUAGES.
+#
+# Crise: os termos de crise de todos os idiomas formam um autômato pequeno à
+# parte (CrisisMatcher), carregado no startup dos apps e fora do LRU. Qualquer
+# mensagem passa por ele, então o veredito não depende de quais idiomas o
+# tráfego de outros usuários já carregou.
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Iterable, Optional
+
+from backend.config import settings
+from backend.language import DEFAULT_LANGUAGE, normalize_language, resolve_language
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_MAGIC = b"EAILEX\x00\x00"
+ARTIFACT_FORMAT = 1
+DEFAULT_ARTIFACT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicon.bin")
+PACKAGED_LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicons")
+
+# Categorias de segurança em ordem de prioridade (a primeira encontrada decide)
+SAFETY_CATEGORIES = ("crisis", "abuse", "dependency", "medical", "legal")
+
+class LexiconError(ValueError):
+    """Arquivo de léxicos inválido"""
+
+def builtin_lexicon_source() -> dict:
+    """Listas de origem definidas nas classes dos analisadores"""
+    # Import tardio: os analisadores importam este módulo
+    from backend.emotion_analyzer import EmotionAnalyzer
+    from backend.emotional_safety import EmotionalSafetyGuard
+
+    return {
+        "version": "builtin",
+        "language": DEFAULT_LANGUAGE,
+        "emotion": {state.value: keywords for state, keywords in EmotionAnalyzer.EMOTION_KEYWORDS.items()},
+        "intensifiers": EmotionAnalyzer.INTENSIFIERS,
+        "safety": {
+            "crisis": EmotionalSafetyGuard.CRISIS_KEYWORDS,
+            "abuse": EmotionalSafetyGuard.ABUSE_KEYWORDS,
+            "dependency": EmotionalSafetyGuard.DEPENDENCY_KEYWORDS,
+            "medical": EmotionalSafetyGuard.MEDICAL_KEYWORDS,
+            "legal": EmotionalSafetyGuard.LEGAL_KEYWORDS,
+        },
+    }
+
+def validate_lexicon(data) -> dict:
+    """Valida um léxico externo e devolve as listas no formato de lexicon_source()"""
+    from backend.emotion_analyzer import EmotionalState
+
+    if not isinstance(data, dict):
+        raise LexiconError("o léxico deve ser um objeto JSON")
+    unknown = set(data) - {"version", "emotion", "intensifiers", "safety"}
+    if unknown:
+        raise LexiconError(f"chaves desconhecidas: {', '.join(sorted(unknown))}")
+
+    def keywords(value, where: str) -> list[str]:
+        if not isinstance(value, list):
+            raise LexiconError(f"{where}: esperada uma lista de palavras-chave")
+        for keyword in value:
+            if not isinstance(keyword, str) or not keyword.strip():
+                raise LexiconError(f"{where}: palavra-chave vazia ou não textual ({keyword!r})")
+            # O texto é analisado em minúsculas: outra grafia nunca seria encontrada
+            if keyword != keyword.lower():
+                raise LexiconError(f"{where}: palavra-chave fora de minúsculas ({keyword!r})")
+        return list(value)
+
+    version = data.get("version")
+    if version is not None and not isinstance(version, str):
+        raise LexiconError("version deve ser texto")
+
+    emotion = data.get("emotion")
+    if not isinstance(emotion, dict):
+        raise LexiconError("emotion: esperado um objeto estado -> palavras-chave")
+    states = {state.value for state in EmotionalState}
+    for state in emotion:
+        if state not in states:
+            raise LexiconError(f"emotion: estado desconhecido {state!r}")
+
+    safety = data.get("safety")
+    if not isinstance(safety, dict):
+        raise LexiconError("safety: esperado um objeto categoria -> palavras-chave")
+    missing = [category for category in SAFETY_CATEGORIES if category not in safety]
+    unknown = set(safety) - set(SAFETY_CATEGORIES)
+    if missing or unknown:
+        raise LexiconError(
+            f"safety: categorias devem ser exatamente {', '.join(SAFETY_CATEGORIES)}"
+        )
+
+    source = {
+        "version": version,
+        "emotion": {state: keywords(words, f"emotion.{state}") for state, words in emotion.items()},
+        "intensifiers": keywords(data.get("intensifiers", []), "intensifiers"),
+        "safety": {category: keywords(safety[category], f"safety.{category}") for category in SAFETY_CATEGORIES},
+    }
+    # Sem palavras de crise o alerta crítico nunca dispararia
+    if not source["safety"]["crisis"]:
+        raise LexiconError("safety.crisis não pode ficar vazio")
+    return source
+
+def read_lexicon_file(path: str) -> dict:
+    """Lê e valida um arquivo de léxicos (OSError ou LexiconError)"""
+    with open(path, encoding="utf-8") as lexicon_file:
+        try:
+            data = json.load(lexicon_file)
+        except json.JSONDecodeError as e:
+            raise LexiconError(f"JSON inválido: {e}") from None
+    return validate_lexicon(data)
+
+def lexicon_file_path(language: str = DEFAULT_LANGUAGE) -> Optional[str]:
+    """Arquivo de léxicos do idioma (None: listas do código ou idioma sem léxico)"""
+    if language == DEFAULT_LANGUAGE and settings.lexicon_file:
+        return settings.lexicon_file
+    for directory in (settings.lexicon_dir, PACKAGED_LEXICON_DIR):
+        if directory:
+            path = os.path.join(directory, f"{language}.json")
+            if os.path.isfile(path):
+                return path
+    return None
+
+def available_languages() -> list[str]:
+    """Idiomas com léxico: o padrão e os arquivos de LEXICON_DIR e backend/lexicons"""
+    languages = {DEFAULT_LANGUAGE}
+    for directory in (settings.lexicon_dir, PACKAGED_LEXICON_DIR):
+        if directory and os.path.isdir(directory):
+            languages.update(
+                normalize_language(name[:-len(".json")]) for name in os.listdir(directory) if name.endswith(".json")
+            )
+    return sorted(languages)
+
+def lexicon_source(language: str = DEFAULT_LANGUAGE) -> dict:
+    """Listas em uso no idioma: arquivo (LEXICON_FILE, LEXICON_DIR, pacote) ou as do código"""
+    path = lexicon_file_path(language)
+    if path is not None:
+        return {**read_lexicon_file(path), "language": language}
+    if language == DEFAULT_LANGUAGE:
+        return builtin_lexicon_source()
+    raise LexiconError(f"nenhum léxico para o idioma {language!r}")
+
+def file_signature(path: Optional[str]) -> tuple:
+    """Identifica a versão de um arquivo de léxicos no disco (mtime, tamanho, inode)"""
+    if path is None:
+        return (None,)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (path, None)
+    return (path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def lexicon_fingerprint(source: Optional[dict] = None) -> str:
+    """Hash dos léxicos de emoção e segurança (muda a cada edição das listas)"""
+    source = source or lexicon_source()
+    lexicons = {
+        "emotion": source["emotion"],
+        "intensifiers": source["intensifiers"],
+        "safety": [source["safety"][category] for category in SAFETY_CATEGORIES],
+    }
+    raw = json.dumps(lexicons, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+# Autômato
+
+class AhoCorasick:
+    """Autômato Aho-Corasick em tabelas planas (uint32), com estados materializados sob demanda"""
+
+    ARRAYS = ("goto_offsets", "goto_chars", "goto_targets", "fail", "out_offsets", "out_ids")
+
+    def __init__(self, patterns: list[str], tables: dict):
+        self.patterns = patterns
+        self.tables = tables
+        self._goto_offsets = tables["goto_offsets"]
+        self._goto_chars = tables["goto_chars"]
+        self._goto_targets = tables["goto_targets"]
+        self._fail = tables["fail"]
+        self._out_offsets = tables["out_offsets"]
+        self._out_ids = tables["out_ids"]
+        # Estado → (transições, padrões reconhecidos, estado de falha); None até o 1º uso
+        self._states: list = [None] * len(self._fail)
+
+    @classmethod
+    def build(cls, patterns: Iterable[str]) -> "AhoCorasick":
+        """Compila os padrões (ids = posição na lista ordenada e sem repetições)"""
+        patterns = sorted(set(patterns))
+        goto: list[dict[str, int]] = [{}]
+        outputs: list[list[int]] = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                if char not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            outputs[state].append(pattern_id)
+
+        # Falhas em largura: o estado de falha é sempre mais raso, já resolvido
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in goto[state].items():
+                queue.append(target)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[target] = goto[fallback].get(char, 0)
+                outputs[target] = outputs[target] + outputs[fail[target]]
+
+        tables = {name: array("I") for name in cls.ARRAYS}
+        tables["goto_offsets"].append(0)
+        tables["out_offsets"].append(0)
+        for state, transitions in enumerate(goto):
+            for char, target in sorted(transitions.items()):
+                tables["goto_chars"].append(ord(char))
+                tables["goto_targets"].append(target)
+            tables["goto_offsets"].append(len(tables["goto_chars"]))
+            tables["out_ids"].extend(sorted(outputs[state]))
+            tables["out_offsets"].append(len(tables["out_ids"]))
+        tables["fail"].extend(fail)
+        return cls(patterns, tables)
+
+    def _materialize(self, state: int) -> tuple:
+        start, end = self._goto_offsets[state], self._goto_offsets[state + 1]
+        transitions = dict(zip(map(chr, self._goto_chars[start:end]), self._goto_targets[start:end]))
+        start, end = self._out_offsets[state], self._out_offsets[state + 1]
+        # Corrida entre threads é inofensiva: ambas montam a mesma tupla
+        entry = (transitions, tuple(self._out_ids[start:end]), self._fail[state])
+        self._states[state] = entry
+        return entry
+
+    def find(self, text: str) -> set[int]:
+        """Ids dos padrões que ocorrem no texto"""
+        states = self._states
+        found = set()
+        state = 0
+        entry = states[0] or self._materialize(0)
+        for char in text:
+            target = entry[0].get(char)
+            while target is None and state:
+                state = entry[2]
+                entry = states[state] or self._materialize(state)
+                target = entry[0].get(char)
+            if target is None:
+                continue
+            state = target
+            entry = states[state] or self._materialize(state)
+            if entry[1]:
+                found.update(entry[1])
+        return found
+
+    @property
+    def state_count(self) -> int:
+        return len(self._fail)
+
+# Léxico compilado
+
+class CompiledLexicon:
+    """Autômato único (emoção + intensificadores + segurança) e índices para pontuar"""
+
+    def __init__(self, source: dict, fingerprint: str, automaton: AhoCorasick):
+        self.fingerprint = fingerprint
+        self.language = source.get("language", DEFAULT_LANGUAGE)
+        self.label = source.get("version")
+        self.automaton = automaton
+        self.loaded_at = datetime.utcnow()
+        # Última consulta: emoção e segurança analisam o mesmo texto em seguida
+        self._last: Optional[tuple[str, frozenset]] = None
+
+        pattern_ids = {pattern: pattern_id for pattern_id, pattern in enumerate(automaton.patterns)}
+        # Padrão → [(estado, posição na lista)]; repetições nas listas contam de novo, como antes
+        self.emotion_entries: dict[int, list[tuple[str, int]]] = {}
+        for state, keywords in source["emotion"].items():
+            for position, keyword in enumerate(keywords):
+                self.emotion_entries.setdefault(pattern_ids[keyword], []).append((state, position))
+        self.intensifiers: dict[int, int] = {}
+        for keyword in source["intensifiers"]:
+            pattern_id = pattern_ids[keyword]
+            self.intensifiers[pattern_id] = self.intensifiers.get(pattern_id, 0) + 1
+        self.safety_categories = [
+            (category, frozenset(pattern_ids[keyword] for keyword in source["safety"][category]))
+            for category in SAFETY_CATEGORIES
+        ]
+
+    @staticmethod
+    def patterns(source: dict) -> list[str]:
+        patterns = [keyword for keywords in source["emotion"].values() for keyword in keywords]
+        patterns += source["intensifiers"]
+        patterns += [keyword for keywords in source["safety"].values() for keyword in keywords]
+        return patterns
+
+    @classmethod
+    def compile(cls, source: dict, fingerprint: str) -> "CompiledLexicon":
+        """Compila o autômato a partir das listas de origem"""
+        return cls(source, fingerprint, AhoCorasick.build(cls.patterns(source)))
+
+    def find(self, text: str) -> frozenset:
+        """Ids das palavras-chave presentes no texto (já em minúsculas)"""
+        last = self._last
+        if last is not None and last[0] == text:
+            return last[1]
+        found = frozenset(self.automaton.find(text))
+        self._last = (text, found)
+        return found
+
+    def emotion_hits(self, found: frozenset) -> dict[str, list[str]]:
+        """Palavras-chave encontradas por estado (valor do enum), na ordem das listas de origem"""
+        hits: dict[str, list[tuple[int, str]]] = {}
+        for pattern_id in found:
+            for state, position in self.emotion_entries.get(pattern_id, ()):
+                hits.setdefault(state, []).append((position, self.automaton.patterns[pattern_id]))
+        return {state: [keyword for _, keyword in sorted(entries)] for state, entries in hits.items()}
+
+    def intensifier_count(self, found: frozenset) -> int:
+        return sum(self.intensifiers.get(pattern_id, 0) for pattern_id in found)
+
+    def safety_category(self, found: frozenset) -> Optional[str]:
+        """Categoria de maior prioridade presente (None se nenhuma)"""
+        if found:
+            for category, pattern_ids in self.safety_categories:
+                if not pattern_ids.isdisjoint(found):
+                    return category
+        return None
+
+    def info(self) -> dict:
+        return {
+            "language": self.language,
+            "version": self.fingerprint,
+            "label": self.label,
+            "patterns": len(self.automaton.patterns),
+            "states": self.automaton.state_count,
+            "loaded_at": self.loaded_at,
+        }
+
+# Artefato
+
+def write_artifact(path: str, lexicon: CompiledLexicon) -> int:
+    """Grava o artefato (cabeçalho JSON + tabelas uint32 alinhadas); devolve o tamanho"""
+    arrays = {}
+    blobs = []
+    offset = 0
+    for array_name in AhoCorasick.ARRAYS:
+        table = lexicon.automaton.tables[array_name]
+        arrays[array_name] = [offset, len(table)]
+        blob = array("I", table).tobytes()
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps({
+        "format": ARTIFACT_FORMAT,
+        "fingerprint": lexicon.fingerprint,
+        "language": lexicon.language,
+        "byteorder": sys.byteorder,
+        "itemsize": array("I").itemsize,
+        "patterns": lexicon.automaton.patterns,
+        "arrays": arrays,
+    }, ensure_ascii=False).encode("utf-8")
+    # Dados começam em múltiplo de 8 (memoryview.cast sobre o mmap sem cópia)
+    header += b" " * (-(len(ARTIFACT_MAGIC) + 4 + len(header)) % 8)
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as artifact:
+        artifact.write(ARTIFACT_MAGIC)
+        artifact.write(struct.pack("<I", len(header)))
+        artifact.write(header)
+        for blob in blobs:
+            artifact.write(blob)
+    os.replace(temporary, path)
+    return os.path.getsize(path)
+
+def read_artifact_header(path: str) -> Optional[dict]:
+    with open(path, "rb") as artifact:
+        if artifact.read(len(ARTIFACT_MAGIC)) != ARTIFACT_MAGIC:
+            return None
+        (length,) = struct.unpack("<I", artifact.read(4))
+        return json.loads(artifact.read(length))
+
+def load_artifact(path: str, source: dict, fingerprint: str) -> Optional[CompiledLexicon]:
+    """Mapeia o artefato em memória; None se ausente, inválido ou desatualizado"""
+    try:
+        with open(path, "rb") as artifact:
+            mapped = mmap.mmap(artifact.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        if mapped[:len(ARTIFACT_MAGIC)] != ARTIFACT_MAGIC:
+            raise ValueError("assinatura inválida")
+        (length,) = struct.unpack_from("<I", mapped, len(ARTIFACT_MAGIC))
+        data_start = len(ARTIFACT_MAGIC) + 4 + length
+        header = json.loads(mapped[len(ARTIFACT_MAGIC) + 4:data_start])
+
+        if header["format"] != ARTIFACT_FORMAT or header["byteorder"] != sys.byteorder \
+                or header["itemsize"] != array("I").itemsize:
+            raise ValueError("formato incompatível")
+        if header["fingerprint"] != fingerprint:
+            logger.warning(f"Artefato de léxicos desatualizado ({path}); compilando a partir do código")
+            return None
+
+        data = memoryview(mapped)[data_start:]
+        tables = {}
+        for array_name in AhoCorasick.ARRAYS:
+            offset, count = header["arrays"][array_name]
+            size = count * header["itemsize"]
+            if offset + size > len(data):
+                raise ValueError("artefato truncado")
+            tables[array_name] = data[offset:offset + size].cast("I")
+        return CompiledLexicon(source, fingerprint, AhoCorasick(header["patterns"], tables))
+    except (ValueError, KeyError, TypeError, struct.error) as e:
+        logger.warning(f"Artefato de léxicos inválido ({path}): {e}; compilando a partir do código")
+        return None
+
+def artifact_path(language: str = DEFAULT_LANGUAGE) -> str:
+    """lexicon.bin no idioma padrão; lexicon.<idioma>.bin nos demais"""
+    path = settings.lexicon_artifact_path or DEFAULT_ARTIFACT_PATH
+    if language == DEFAULT_LANGUAGE:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{language}{extension}"
+
+# Crise em todos os idiomas
+
+class CrisisMatcher:
+    """Termos de crise de todos os idiomas disponíveis em um único autômato"""
+
+    def __init__(self, terms: dict[str, list[str]], signature: tuple):
+        # Idioma → termos de crise; assinatura dos arquivos de origem quando foi montado
+        self.terms = terms
+        self.signature = signature
+        self.automaton = AhoCorasick.build(term for language_terms in terms.values() for term in language_terms)
+
+    @classmethod
+    def build(cls, previous: Optional["CrisisMatcher"] = None) -> "CrisisMatcher":
+        """Lê os termos de cada idioma; um arquivo inválido mantém os termos anteriores dele"""
+        languages = available_languages()
+        terms = {}
+        for language in languages:
+            try:
+                terms[language] = lexicon_source(language)["safety"]["crisis"]
+            except (OSError, LexiconError) as e:
+                kept = previous.terms.get(language) if previous else None
+                if language == DEFAULT_LANGUAGE and kept is None:
+                    kept = builtin_lexicon_source()["safety"]["crisis"]
+                logger.error(f"Termos de crise de {language} rejeitados: {e}")
+                if kept:
+                    terms[language] = kept
+        return cls(terms, crisis_signature(languages))
+
+    def matches(self, text: str) -> bool:
+        """Algum termo de crise de qualquer idioma no texto (já em minúsculas)"""
+        return bool(self.automaton.find(text))
+
+    def info(self) -> dict:
+        return {
+            "languages": sorted(self.terms),
+            "patterns": len(self.automaton.patterns),
+            "states": self.automaton.state_count,
+        }
+
+def crisis_signature(languages: Optional[list[str]] = None) -> tuple:
+    return tuple(file_signature(lexicon_file_path(language)) for language in languages or available_languages())
+
+# Registro por idioma
+
+class LexiconRegistry:
+    """Léxicos compilados por idioma, carregados no primeiro uso (LRU; o padrão nunca sai)"""
+
+    def __init__(self, max_languages: int = 4):
+        self.max_languages = max(1, max_languages)
+        # Idioma → (léxico, assinatura do arquivo de origem quando foi carregado)
+        self._lexicons: "OrderedDict[str, tuple[CompiledLexicon, tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Cargas em série (RLock: um idioma inválido recorre ao padrão)
+        self._load_lock = threading.RLock()
+        self._available: Optional[frozenset] = None
+        # Sempre com todos os idiomas, fora do LRU (nunca despejado)
+        self._crisis: Optional[CrisisMatcher] = None
+
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def available(self) -> frozenset:
+        if self._available is None:
+            self._available = frozenset(available_languages())
+        return self._available
+
+    def refresh_available(self) -> None:
+        self._available = frozenset(available_languages())
+
+    @property
+    def crisis(self) -> CrisisMatcher:
+        """Autômato de crise (montado na primeira chamada; os apps o carregam no startup)"""
+        if self._crisis is None:
+            with self._load_lock:
+                if self._crisis is None:
+                    self._crisis = CrisisMatcher.build()
+        return self._crisis
+
+    def refresh_crisis(self, force: bool = False) -> bool:
+        """Remonta o autômato de crise se algum arquivo de idioma mudou; True se trocou"""
+        current = self.crisis
+        if not force and crisis_signature() == current.signature:
+            return False
+        self._crisis = CrisisMatcher.build(current)
+        return True
+
+    def _cached(self, language: str) -> Optional[CompiledLexicon]:
+        with self._lock:
+            entry = self._lexicons.get(language)
+            if entry is None:
+                return None
+            self._lexicons.move_to_end(language)
+            return entry[0]
+
+    def get(self, language: Optional[str] = None) -> CompiledLexicon:
+        """Léxico do idioma (o padrão se None), compilado ou mapeado na primeira chamada"""
+        language = language or DEFAULT_LANGUAGE
+        lexicon = self._cached(language)
+        if lexicon is not None:
+            return lexicon
+
+        with self._load_lock:
+            lexicon = self._cached(language)
+            if lexicon is None:
+                lexicon = self._load(language)
+            return lexicon
+
+    def _load(self, language: str) -> CompiledLexicon:
+        path = lexicon_file_path(language)
+        signature = file_signature(path)
+        try:
+            source = lexicon_source(language)
+        except (OSError, LexiconError) as e:
+            if language != DEFAULT_LANGUAGE:
+                # Sem léxico válido no idioma: o padrão, até o arquivo mudar (LexiconReloader)
+                logger.error(f"Léxicos de {path or language} rejeitados: {e}; usando os de {DEFAULT_LANGUAGE}")
+                lexicon = self.get(DEFAULT_LANGUAGE)
+                self.put(language, lexicon, signature)
+                return lexicon
+            # Nunca ficar sem léxico (e sem detecção de crise): usar as listas do código
+            logger.error(f"Léxicos de {path} rejeitados: {e}; usando os do código")
+            source = builtin_lexicon_source()
+
+        started = time.perf_counter()
+        fingerprint = lexicon_fingerprint(source)
+        lexicon = load_artifact(artifact_path(language), source, fingerprint) \
+            or CompiledLexicon.compile(source, fingerprint)
+        self.loads += 1
+        logger.info(f"Léxicos de {language} ({fingerprint}) carregados em {time.perf_counter() - started:.3f}s")
+        self.put(language, lexicon, signature)
+        return lexicon
+
+    def put(self, language: str, lexicon: CompiledLexicon, signature: tuple) -> None:
+        """Coloca um léxico já compilado em uso (troca de referência) e aplica o limite do LRU"""
+        with self._lock:
+            self._lexicons[language] = (lexicon, signature)
+            self._lexicons.move_to_end(language)
+            while len(self._lexicons) > self.max_languages:
+                oldest = next((name for name in self._lexicons if name not in (DEFAULT_LANGUAGE, language)), None)
+                if oldest is None:
+                    break
+                del self._lexicons[oldest]
+                self.evictions += 1
+
+    def loaded(self) -> dict[str, tuple[CompiledLexicon, tuple]]:
+        with self._lock:
+            return dict(self._lexicons)
+
+    def stats(self) -> dict:
+        return {
+            "available": sorted(self.available),
+            "loaded": {language: lexicon.fingerprint for language, (lexicon, _) in self.loaded().items()},
+            "max_languages": self.max_languages,
+            "crisis": self._crisis.info() if self._crisis else None,
+            "loads": self.loads,
+            "evictions": self.evictions
+        }
+
+registry = LexiconRegistry(settings.lexicon_max_languages)
+
+def compiled_lexicon(language: Optional[str] = None) -> CompiledLexicon:
+    """Léxico compilado do idioma (padrão se None): artefato mapeado ou compilação"""
+    return registry.get(language)
+
+def lexicon_for(preferred_language: Optional[str], text: str) -> CompiledLexicon:
+    """Léxico do idioma do usuário, ou do idioma detectado no texto se ele não tiver um"""
+    return registry.get(resolve_language(preferred_language, text, registry.available))
+
+def crisis_terms_found(text: str) -> bool:
+    """Termos de crise de qualquer idioma no texto (já em minúsculas), independente do LRU"""
+    return registry.crisis.matches(text)
+
+# Recarga a quente
+
+class LexiconReloader:
+    """Observa os arquivos dos idiomas carregados e troca cada léxico a cada versão válida"""
+
+    def __init__(self, registry: LexiconRegistry = registry, interval_seconds: float = 10):
+        self.registry = registry
+        self.interval_seconds = interval_seconds
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._check_lock = threading.Lock()
+
+        self.reloads = 0
+        # Idioma → último erro de validação (até uma versão válida substituí-lo)
+        self.errors: dict[str, dict] = {}
+
+    def check(self, force: bool = False) -> bool:
+        """Recarrega os idiomas cujo arquivo mudou (ou todos se force); True se algum foi trocado"""
+        with self._check_lock:
+            # Arquivos novos em LEXICON_DIR passam a valer para a detecção de idioma
+            self.registry.refresh_available()
+            swapped = self.registry.refresh_crisis(force)
+            for language, (current, seen) in self.registry.loaded().items():
+                path = lexicon_file_path(language)
+                signature = file_signature(path)
+                if signature == seen and not force:
+                    continue
+                swapped = self._reload(language, current, path, signature) or swapped
+            return swapped
+
+    def _reload(self, language: str, current: CompiledLexicon, path: Optional[str], signature: tuple) -> bool:
+        started = time.perf_counter()
+        try:
+            source = lexicon_source(language)
+        except (OSError, LexiconError) as e:
+            # Versão rejeitada: a anterior continua em uso até o arquivo mudar de novo
+            logger.error(f"Léxicos de {path or language} rejeitados: {e}")
+            self.errors[language] = {"at": datetime.utcnow(), "error": str(e)}
+            self.registry.put(language, current, signature)
+            return False
+
+        self.errors.pop(language, None)
+        fingerprint = lexicon_fingerprint(source)
+        if fingerprint == current.fingerprint and current.language == language:
+            self.registry.put(language, current, signature)
+            return False
+
+        lexicon = CompiledLexicon.compile(source, fingerprint)
+        self.registry.put(language, lexicon, signature)
+        self.reloads += 1
+        logger.info(
+            f"Léxicos de {language} {lexicon.label or ''} ({current.fingerprint} -> {fingerprint}) "
+            f"em uso após {time.perf_counter() - started:.3f}s"
+        )
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Erro ao recarregar léxicos: {e}")
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="lexicon-reloader", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "lexicon_file": settings.lexicon_file,
+            "lexicon_dir": settings.lexicon_dir,
+            "interval_seconds": self.interval_seconds,
+            "reloads": self.reloads,
+            "errors": self.errors
+        }
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Artefato pré-compilado dos léxicos")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="Compila os léxicos e grava os artefatos")
+    build.add_argument("--language", help="Só este idioma (padrão: todos os disponíveis)")
+    build.add_argument("--output", help="Caminho do artefato (só com --language)")
+    info = subcommands.add_parser("info", help="Mostra a versão de um artefato")
+    info.add_argument("path", nargs="?", default=artifact_path())
+    check = subcommands.add_parser("check", help="Valida um arquivo de léxicos")
+    check.add_argument("file")
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        try:
+            source = read_lexicon_file(args.file)
+        except (OSError, LexiconError) as e:
+            print(f"{args.file}: {e}", file=sys.stderr)
+            sys.exit(1)
+        lexicon = CompiledLexicon.compile(source, lexicon_fingerprint(source))
+        print(json.dumps({"file": args.file, **lexicon.info()}, default=str, indent=2))
+    elif args.command == "build":
+        if args.output and not args.language:
+            parser.error("--output exige --language")
+        languages = [normalize_language(args.language)] if args.language else available_languages()
+        for language in languages:
+            started = time.perf_counter()
+            try:
+                source = lexicon_source(language)
+            except (OSError, LexiconError) as e:
+                print(f"{lexicon_file_path(language) or language}: {e}", file=sys.stderr)
+                sys.exit(1)
+            lexicon = CompiledLexicon.compile(source, lexicon_fingerprint(source))
+            output = args.output or artifact_path(language)
+            size = write_artifact(output, lexicon)
+            print(
+                f"{output}: {language}, {size} bytes, fingerprint {lexicon.fingerprint}, "
+                f"{len(lexicon.automaton.patterns)} padrões, {lexicon.automaton.state_count} estados "
+                f"em {time.perf_counter() - started:.3f}s",
+                file=sys.stderr
+            )
+    else:
+        header = read_artifact_header(args.path) if os.path.exists(args.path) else None
+        if header is None:
+            print(f"{args.path}: ausente ou inválido")
+            return
+        language = header.get("language", DEFAULT_LANGUAGE)
+        print(json.dumps({
+            "path": args.path,
+            "format": header["format"],
+            "language": language,
+            "fingerprint": header["fingerprint"],
+            "current": header["fingerprint"] == lexicon_fingerprint(lexicon_source(language)),
+            "patterns": len(header["patterns"]),
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,3 @@
-import openai
-import anthropic
 from backend.config import settings
 from backend.emotion_analyzer import EmotionAnalysis
 from backend.dynamic_prompt import prompt_builder
@@ -11,13 +9,20 @@ class LLMService:
     
     def __init__(self):
         self.provider = settings.llm_provider
-        
-        if self.provider == "openai":
-            self.client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
-            self.model = "gpt-4-turbo-preview"
-        else:
-            self.client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
-            self.model = "claude-3-5-sonnet-20241022"
+        self.model = "gpt-4-turbo-preview" if self.provider == "openai" else "claude-3-5-sonnet-20241022"
+        self._client = None
+    
+    @property
+    def client(self):
+        """Cliente criado na primeira chamada: o import dos SDKs fica fora do cold start"""
+        if self._client is None:
+            if self.provider == "openai":
+                import openai
+                self._client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
+            else:
+                import anthropic
+                self._client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+        return self._client
     
     async def generate_response(
         self,
@@ -1,18 +1,31 @@
-from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import create_engine
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Optional, List
 
 from backend.config import settings
-from backend.models import Base, User, Conversation, Message, AuditLog
-from backend.emotion_analyzer import emotion_analyzer
-from backend.emotional_safety import safety_guard, SafetyLevel
+from backend.models import Conversation, Message, AuditLog, ArchivedConversation
+from backend.database import SessionLocal, get_db, get_read_db, pool_metrics
+from backend.emotion_analyzer import create_emotion_backend
 from backend.llm_service import llm_service
-from backend.dynamic_prompt import prompt_builder
+from backend.pagination import encode_cursor, keyset_after
+from backend.http_cache import make_etag, etag_matches
+from backend.export import EXPORTERS, filter_audit_logs, stream_export
+from backend.purge import delete_conversations, delete_user, purge_conversations
+from backend.search import search_messages
+from backend.analytics import emotion_distribution, intensity_trend, safety_rates
+from backend.sql_store import SQLConversationStore
+from backend.storage import ConversationArchivedError
+from backend.batching import MicroBatcher
+from backend.chat_service import ChatService, analyze_batch
+from backend.baseline import BaselineAggregator
+from backend.retention import RetentionSweeper, restore_conversation
+from backend.lexicon import LexiconReloader, compiled_lexicon, registry as lexicon_registry
 
 # Configurar logging
 logging.basicConfig(level=getattr(logging, settings.log_level))
@@ -34,28 +47,89 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
+# Linha de base emocional por usuário, alimentada pelas mensagens analisadas
+baseline_aggregator = BaselineAggregator(
+    SessionLocal,
+    flush_interval_seconds=settings.baseline_flush_interval_seconds
+) if settings.enable_baseline_aggregation else None
+
+# Arquivo frio: conversas inativas e logs de auditoria antigos saem das tabelas quentes
+retention_sweeper = RetentionSweeper(
+    SessionLocal,
+    settings.retention_archive_dir,
+    conversation_days=settings.retention_conversation_days,
+    audit_log_days=settings.retention_audit_log_days,
+    interval_seconds=settings.retention_sweep_interval_seconds,
+    batch_size=settings.retention_batch_size,
+    pause_seconds=settings.retention_batch_pause_seconds
+) if settings.retention_archive_dir else None
+
+# Léxicos externos: cada versão nova dos arquivos entra em uso sem reiniciar
+lexicon_reloader = LexiconReloader(
+    interval_seconds=settings.lexicon_reload_interval_seconds
+) if settings.lexicon_file or settings.lexicon_dir else None
+
+# Análise emocional do pipeline: palavras-chave ou classificador por embeddings
+emotion_backend = create_emotion_backend(settings.emotion_backend)
+
+# Análises de segurança/palavras-chave das requisições concorrentes em lotes
+analysis_batcher = MicroBatcher(
+    analyze_batch,
+    max_batch=settings.analysis_batch_max_size,
+    max_wait_ms=settings.analysis_batch_max_wait_ms,
+    timeout_ms=settings.analysis_batch_timeout_ms,
+    workers=settings.analysis_batch_workers,
+    name="analysis"
+) if settings.analysis_batching else None
+
+# Pipeline de mensagens sobre o banco SQL
+chat_service = ChatService(
+    SQLConversationStore(SessionLocal),
+    responder=llm_service.generate_response,
+    enable_audit_logs=settings.enable_audit_logs,
+    on_analysis=baseline_aggregator.publish if baseline_aggregator else None,
+    emotion_backend=emotion_backend,
+    analysis_batcher=analysis_batcher
 )
-Base.metadata.create_all(bind=engine)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
-    """Dependency para obter sessão do banco"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@app.on_event("startup")
+async def start_background_workers():
+    """Inicia o agregador de linhas de base, a varredura de retenção e a recarga de léxicos"""
+    if baseline_aggregator:
+        baseline_aggregator.start()
+    if retention_sweeper:
+        retention_sweeper.start()
+    if lexicon_reloader:
+        lexicon_reloader.start()
+    # Termos de crise de todos os idiomas, antes da primeira mensagem
+    lexicon_registry.crisis
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    """Grava os deltas pendentes das linhas de base e interrompe a varredura"""
+    if baseline_aggregator:
+        baseline_aggregator.stop()
+    if retention_sweeper:
+        retention_sweeper.stop()
+    if lexicon_reloader:
+        lexicon_reloader.stop()
+    emotion_backend.close()
+    if analysis_batcher:
+        analysis_batcher.close()
 
 # Modelos Pydantic
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class MessageRequest(BaseModel):
     content: str
     conversation_id: Optional[str] = None
+    language: Optional[str] = None  # Sobrepõe User.language (ex.: "en-US")
+
+class PurgeRequest(BaseModel):
+    user_id: Optional[str] = None
+    older_than_days: Optional[int] = Field(None, ge=0)
+    archived: Optional[bool] = None
+    batch_size: int = Field(500, ge=1, le=5000)
 
 class MessageResponse(BaseModel):
     id: str
@@ -71,6 +145,44 @@ class ConversationResponse(BaseModel):
     message_count: int
     created_at: datetime
 
+def _get_conversation_row(db: Session, conversation_id: str):
+    """Busca apenas as colunas da conversa (sem tocar na tabela de mensagens)"""
+    conversation = db.query(
+        Conversation.id,
+        Conversation.title,
+        Conversation.primary_emotion,
+        Conversation.sentiment,
+        Conversation.average_intensity,
+        Conversation.emotion_counts,
+        Conversation.sentiment_trajectory,
+        Conversation.message_count,
+        Conversation.created_at,
+        Conversation.updated_at
+    ).filter(
+        Conversation.id == conversation_id
+    ).first()
+    
+    if not conversation:
+        if db.get(ArchivedConversation, conversation_id) is not None:
+            raise HTTPException(status_code=410, detail="Conversa arquivada; restaure-a para acessar o histórico")
+        raise HTTPException(status_code=404, detail="Conversa não encontrada")
+    return conversation
+
+def _ndjson_download(chunks, name: str, compress: bool) -> StreamingResponse:
+    """Download NDJSON; comprimido, é um arquivo .gz (sem Content-Encoding, que
+    faria o cliente descomprimir e salvar texto com extensão .gz)"""
+    if compress:
+        return StreamingResponse(
+            chunks,
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{name}.ndjson.gz"'}
+        )
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{name}.ndjson"'}
+    )
+
 # Rotas
 
 @app.get("/health")
@@ -78,180 +190,136 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
+@app.get("/api/v1/db/pool")
+async def get_pool_metrics():
+    """Métricas do pool de conexões (ocupação, overflow e tempo de espera)"""
+    return pool_metrics()
+
 @app.post("/api/v1/messages")
-async def send_message(
-    request: MessageRequest,
-    db: Session = Depends(get_db)
-):
+async def send_message(request: MessageRequest):
     """Enviar mensagem e obter resposta empática"""
     
     try:
-        # Análise de segurança
-        safety_analysis = safety_guard.analyze(request.content)
-        
-        if safety_analysis.level == SafetyLevel.CRITICAL:
-            # Log de auditoria
-            if settings.enable_audit_logs:
-                audit_log = AuditLog(
-                    event_type="safety_alert",
-                    event_data={
-                        "type": "crisis_detected",
-                        "message": request.content[:100]
-                    },
-                    safety_level="CRITICAL"
-                )
-                db.add(audit_log)
-                db.commit()
-            
-            return JSONResponse(
-                status_code=status.HTTP_200_OK,
-                content={
-                    "safety_alert": True,
-                    "message": safety_analysis.redirect_message,
-                    "level": safety_analysis.level
-                }
-            )
-        
-        # Análise emocional
-        emotion_analysis = emotion_analyzer.analyze(request.content)
-        
-        # Buscar ou criar conversa
-        conversation = None
-        if request.conversation_id:
-            conversation = db.query(Conversation).filter(
-                Conversation.id == request.conversation_id
-            ).first()
-        
-        if not conversation:
-            conversation = Conversation(
-                title=f"Conversation - {emotion_analysis.emotional_state.value}",
-                primary_emotion=emotion_analysis.emotional_state.value,
-                sentiment=emotion_analysis.sentiment.value
-            )
-            db.add(conversation)
-            db.flush()
-        
-        # Salvar mensagem do usuário
-        user_message = Message(
-            conversation_id=conversation.id,
-            content=request.content,
-            role="user",
-            emotional_state=emotion_analysis.emotional_state.value,
-            sentiment=emotion_analysis.sentiment.value,
-            emotion_confidence=emotion_analysis.confidence,
-            emotion_intensity=emotion_analysis.intensity,
-            emotion_keywords=emotion_analysis.keywords,
-            safety_level=safety_analysis.level.value if safety_analysis.level != SafetyLevel.SAFE else None
-        )
-        db.add(user_message)
-        db.flush()
-        
-        # Buscar histórico de conversa
-        conversation_history = db.query(Message).filter(
-            Message.conversation_id == conversation.id
-        ).order_by(Message.created_at).all()
-        
-        # Converter para formato esperado pelo LLM
-        history = [
-            {
-                "role": msg.role,
-                "content": msg.content
-            }
-            for msg in conversation_history[-10:]  # Últimas 10 mensagens
-        ]
-        
-        # Gerar resposta com IA
-        ai_response = await llm_service.generate_response(
-            user_message=request.content,
-            emotion_analysis=emotion_analysis,
-            conversation_history=history
-        )
-        
-        # Salvar resposta do assistente
-        assistant_message = Message(
-            conversation_id=conversation.id,
-            content=ai_response,
-            role="assistant"
-        )
-        db.add(assistant_message)
-        
-        # Atualizar conversa
-        conversation.message_count += 2
-        conversation.updated_at = datetime.utcnow()
-        
-        db.commit()
-        
-        return {
-            "conversation_id": conversation.id,
-            "user_message": {
-                "id": user_message.id,
-                "role": "user",
-                "content": request.content,
-                "emotional_state": emotion_analysis.emotional_state.value,
-                "emotion_intensity": emotion_analysis.intensity,
-                "created_at": user_message.created_at
-            },
-            "assistant_message": {
-                "id": assistant_message.id,
-                "role": "assistant",
-                "content": ai_response,
-                "created_at": assistant_message.created_at
-            },
-            "emotion_analysis": {
-                "state": emotion_analysis.emotional_state.value,
-                "sentiment": emotion_analysis.sentiment.value,
-                "confidence": emotion_analysis.confidence,
-                "intensity": emotion_analysis.intensity,
-                "keywords": emotion_analysis.keywords
-            }
-        }
+        return await chat_service.send_message(request.content, request.conversation_id, request.language)
     
+    except ConversationArchivedError:
+        raise HTTPException(status_code=410, detail="Conversa arquivada; restaure-a para continuar")
     except Exception as e:
         logger.error(f"Erro ao processar mensagem: {e}")
         raise HTTPException(status_code=500, detail="Erro ao processar mensagem")
 
 @app.get("/api/v1/conversations")
 async def list_conversations(
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db)
 ):
-    """Listar conversas"""
-    conversations = db.query(Conversation).order_by(
-        Conversation.updated_at.desc()
-    ).limit(20).all()
+    """Listar conversas (paginação keyset; próximo cursor no header X-Next-Cursor)"""
+    query = db.query(
+        Conversation.id,
+        Conversation.title,
+        Conversation.primary_emotion,
+        Conversation.sentiment,
+        Conversation.average_intensity,
+        Conversation.message_count,
+        Conversation.created_at,
+        Conversation.updated_at
+    )
+    
+    if cursor:
+        try:
+            query = query.filter(keyset_after(
+                Conversation.updated_at, Conversation.id, cursor, descending=True
+            ))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    
+    rows = query.order_by(
+        Conversation.updated_at.desc(), Conversation.id.desc()
+    ).limit(limit + 1).all()
+    
+    # Versão da página: as próprias linhas (incluindo a que indica a próxima página),
+    # sem varrer a tabela inteira
+    etag = make_etag(limit, cursor, *(tuple(row) for row in rows))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].updated_at, rows[-1].id)
     
     return [
         {
-            "id": conv.id,
-            "title": conv.title,
-            "primary_emotion": conv.primary_emotion,
-            "message_count": conv.message_count,
-            "created_at": conv.created_at,
-            "updated_at": conv.updated_at
+            "id": row.id,
+            "title": row.title,
+            "primary_emotion": row.primary_emotion,
+            "sentiment": row.sentiment,
+            "average_intensity": row.average_intensity,
+            "message_count": row.message_count,
+            "created_at": row.created_at,
+            "updated_at": row.updated_at
         }
-        for conv in conversations
+        for row in rows
     ]
 
 @app.get("/api/v1/conversations/{conversation_id}")
 async def get_conversation(
     conversation_id: str,
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db)
 ):
-    """Obter conversa com histórico"""
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id
-    ).first()
-    
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversa não encontrada")
+    """Obter conversa com histórico (mensagens paginadas por cursor)"""
+    conversation = _get_conversation_row(db, conversation_id)
     
-    messages = db.query(Message).filter(
+    query = db.query(
+        Message.id,
+        Message.role,
+        Message.content,
+        Message.emotional_state,
+        Message.created_at
+    ).filter(
         Message.conversation_id == conversation_id
-    ).order_by(Message.created_at).all()
+    )
+    
+    if cursor:
+        try:
+            query = query.filter(keyset_after(Message.created_at, Message.id, cursor))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    
+    messages = query.order_by(
+        Message.created_at, Message.id
+    ).limit(limit + 1).all()
+    
+    # Versão derivada do conteúdo entregue: a reanálise muda estados emocionais
+    # sem alterar updated_at (chave de ordenação da listagem, que ela não deve mexer)
+    etag = make_etag(tuple(conversation), limit, cursor, *(tuple(msg) for msg in messages))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id)
+    
+    # Cursor da última mensagem entregue, usado para sincronização incremental
+    sync_cursor = encode_cursor(messages[-1].created_at, messages[-1].id) if messages else cursor
     
     return {
         "id": conversation.id,
         "title": conversation.title,
         "primary_emotion": conversation.primary_emotion,
+        "sentiment": conversation.sentiment,
+        "average_intensity": conversation.average_intensity,
+        "emotion_counts": conversation.emotion_counts,
+        "sentiment_trajectory": conversation.sentiment_trajectory,
         "message_count": conversation.message_count,
         "created_at": conversation.created_at,
         "messages": [
@@ -263,48 +331,387 @@ async def get_conversation(
                 "created_at": msg.created_at
             }
             for msg in messages
-        ]
+        ],
+        "next_cursor": next_cursor,
+        "sync_cursor": sync_cursor
     }
 
+@app.get("/api/v1/conversations/{conversation_id}/messages")
+async def get_messages_since(
+    conversation_id: str,
+    response: Response,
+    since: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db)
+):
+    """Sincronização incremental: mensagens posteriores ao cursor informado"""
+    conversation = _get_conversation_row(db, conversation_id)
+    
+    # O ETag identifica (estado da conversa, cursor final): se o cliente já
+    # recebeu uma resposta terminando em `since` neste estado, não há novidades
+    etag = make_etag(conversation.id, conversation.updated_at, conversation.message_count, limit, since)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    query = db.query(
+        Message.id,
+        Message.role,
+        Message.content,
+        Message.emotional_state,
+        Message.created_at
+    ).filter(
+        Message.conversation_id == conversation_id
+    )
+    
+    if since:
+        try:
+            query = query.filter(keyset_after(Message.created_at, Message.id, since))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    
+    messages = query.order_by(
+        Message.created_at, Message.id
+    ).limit(limit + 1).all()
+    
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    next_since = encode_cursor(messages[-1].created_at, messages[-1].id) if messages else since
+    
+    if not has_more:
+        response.headers["ETag"] = make_etag(
+            conversation.id, conversation.updated_at, conversation.message_count, limit, next_since
+        )
+    
+    return {
+        "conversation_id": conversation.id,
+        "message_count": conversation.message_count,
+        "messages": [
+            {
+                "id": msg.id,
+                "role": msg.role,
+                "content": msg.content,
+                "emotional_state": msg.emotional_state,
+                "created_at": msg.created_at
+            }
+            for msg in messages
+        ],
+        "cursor": next_since,
+        "has_more": has_more
+    }
+
+@app.get("/api/v1/export/{kind}")
+async def export_data(
+    kind: str,
+    conversation_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    emotional_state: Optional[str] = None,
+    compress: bool = False
+):
+    """Exportar conversas ou mensagens em NDJSON (streaming, opcionalmente gzip)"""
+    if kind not in EXPORTERS:
+        raise HTTPException(status_code=404, detail="Tipo de exportação inválido")
+    
+    return _ndjson_download(
+        stream_export(
+            kind,
+            compress=compress,
+            conversation_id=conversation_id,
+            user_id=user_id,
+            start=start,
+            end=end,
+            emotional_state=emotional_state
+        ),
+        kind,
+        compress
+    )
+
+@app.get("/api/v1/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    user_id: Optional[str] = None,
+    emotional_state: Optional[str] = None,
+    conversation_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    prefix: bool = False,
+    db: Session = Depends(get_read_db)
+):
+    """Busca textual nas mensagens de um usuário e/ou conversa (por relevância, paginada por cursor;
+    prefix=true trata o último termo como prefixo, para busca enquanto digita)"""
+    try:
+        return await run_in_threadpool(
+            search_messages, db, q,
+            user_id=user_id,
+            emotional_state=emotional_state,
+            conversation_id=conversation_id,
+            limit=limit,
+            cursor=cursor,
+            prefix=prefix
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Analytics (somente tabelas de rollup; ver backend/analytics.py)
+
+ANALYTICS_MAX_DAYS = 366
+
+def _analytics_range(start: Optional[date], end: Optional[date]) -> tuple[date, date]:
+    """Período padrão: últimos 30 dias; no máximo ANALYTICS_MAX_DAYS"""
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end or (end - start).days >= ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Período inválido (máximo {ANALYTICS_MAX_DAYS} dias)")
+    return start, end
+
+@app.get("/api/v1/analytics/emotions")
+async def analytics_emotions(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Distribuição diária de emoções e sentimentos"""
+    return emotion_distribution(db, *_analytics_range(start, end))
+
+@app.get("/api/v1/analytics/safety")
+async def analytics_safety(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Eventos por nível de segurança e taxa de alertas de crise por dia"""
+    return safety_rates(db, *_analytics_range(start, end))
+
+@app.get("/api/v1/analytics/intensity")
+async def analytics_intensity(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    emotional_state: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Tendência diária da intensidade emocional média"""
+    return intensity_trend(db, *_analytics_range(start, end), emotional_state=emotional_state)
+
 @app.delete("/api/v1/conversations/{conversation_id}")
 async def delete_conversation(
     conversation_id: str,
     db: Session = Depends(get_db)
 ):
     """Deletar conversa"""
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id
-    ).first()
+    deleted = await run_in_threadpool(delete_conversations, db, [conversation_id])
     
-    if not conversation:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Conversa não encontrada")
     
-    db.delete(conversation)
-    db.commit()
+    return {"status": "deleted"}
+
+@app.post("/api/v1/conversations/purge")
+async def purge_conversations_endpoint(
+    request: PurgeRequest,
+    db: Session = Depends(get_db)
+):
+    """Excluir conversas em massa (por usuário, idade e/ou arquivamento), em lotes"""
+    try:
+        deleted = await run_in_threadpool(
+            purge_conversations,
+            db,
+            user_id=request.user_id,
+            older_than_days=request.older_than_days,
+            archived=request.archived,
+            batch_size=request.batch_size
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"status": "purged", "deleted": deleted}
+
+@app.delete("/api/v1/users/{user_id}")
+async def delete_user_endpoint(user_id: str, db: Session = Depends(get_db)):
+    """Excluir usuário e seus dados (conversas em lotes; logs de auditoria preservados sem dono)"""
+    try:
+        deleted = await run_in_threadpool(delete_user, db, user_id, archive_dir=settings.retention_archive_dir)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
     return {"status": "deleted"}
 
+@app.get("/api/v1/archive/conversations")
+async def list_archived_conversations(
+    response: Response,
+    user_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Listar conversas arquivadas (mais recentes primeiro; cursor no header X-Next-Cursor)"""
+    query = db.query(
+        ArchivedConversation.id,
+        ArchivedConversation.title,
+        ArchivedConversation.primary_emotion,
+        ArchivedConversation.message_count,
+        ArchivedConversation.created_at,
+        ArchivedConversation.updated_at,
+        ArchivedConversation.archived_at
+    )
+    if user_id:
+        query = query.filter(ArchivedConversation.user_id == user_id)
+    
+    if cursor:
+        try:
+            query = query.filter(keyset_after(
+                ArchivedConversation.archived_at, ArchivedConversation.id, cursor, descending=True
+            ))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    
+    rows = query.order_by(
+        ArchivedConversation.archived_at.desc(), ArchivedConversation.id.desc()
+    ).limit(limit + 1).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].archived_at, rows[-1].id)
+    
+    return [row._asdict() for row in rows]
+
+@app.post("/api/v1/conversations/{conversation_id}/restore")
+async def restore_archived_conversation(
+    conversation_id: str,
+    db: Session = Depends(get_db)
+):
+    """Restaurar uma conversa do arquivo frio (ids e histórico originais)"""
+    if not settings.retention_archive_dir:
+        raise HTTPException(status_code=503, detail="Arquivo frio desabilitado")
+    
+    try:
+        restored = await run_in_threadpool(
+            restore_conversation, db, settings.retention_archive_dir, conversation_id
+        )
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Conversa já restaurada")
+    except (LookupError, OSError) as e:
+        logger.error(f"Erro ao restaurar conversa {conversation_id}: {e}")
+        raise HTTPException(status_code=500, detail="Arquivo da conversa indisponível")
+    
+    if not restored:
+        raise HTTPException(status_code=404, detail="Conversa arquivada não encontrada")
+    return {"status": "restored", "conversation_id": conversation_id}
+
+@app.get("/api/v1/retention")
+async def get_retention_stats():
+    """Estado da varredura de retenção"""
+    if not retention_sweeper:
+        return {"enabled": False}
+    return {"enabled": True, **retention_sweeper.stats()}
+
+@app.get("/api/v1/lexicon")
+async def get_lexicon(language: Optional[str] = None):
+    """Versão dos léxicos em uso (do idioma padrão ou do informado), idiomas carregados e recarga a quente"""
+    if language is not None and language not in lexicon_registry.available:
+        raise HTTPException(status_code=404, detail="Idioma sem léxico")
+    lexicon = await run_in_threadpool(compiled_lexicon, language)
+    return {
+        **lexicon.info(),
+        "languages": lexicon_registry.stats(),
+        "hot_reload": lexicon_reloader.stats() if lexicon_reloader else None
+    }
+
+@app.post("/api/v1/lexicon/reload")
+async def reload_lexicon():
+    """Recarrega o arquivo de léxicos agora (validação e compilação fora do event loop)"""
+    if not lexicon_reloader:
+        raise HTTPException(status_code=503, detail="Léxicos externos não configurados (LEXICON_FILE/LEXICON_DIR)")
+    
+    swapped = await run_in_threadpool(lexicon_reloader.check, True)
+    if lexicon_reloader.errors:
+        raise HTTPException(status_code=422, detail={
+            language: error["error"] for language, error in lexicon_reloader.errors.items()
+        })
+    return {"reloaded": swapped, "languages": lexicon_registry.stats()}
+
+@app.get("/api/v1/emotion-backend")
+async def get_emotion_backend():
+    """Backend da análise emocional: lotes, latência e fallbacks para as palavras-chave"""
+    return emotion_backend.stats()
+
+@app.get("/api/v1/analysis-batching")
+async def get_analysis_batching():
+    """Micro-lotes da análise: tamanho dos lotes, latência e vazão"""
+    if not analysis_batcher:
+        return {"enabled": False}
+    return {"enabled": True, **analysis_batcher.stats()}
+
 @app.get("/api/v1/audit-logs")
 async def get_audit_logs(
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    event_type: Optional[str] = None,
+    safety_level: Optional[str] = None,
+    user_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    compress: bool = False,
+    db: Session = Depends(get_read_db)
 ):
-    """Obter logs de auditoria (apenas para admin)"""
+    """Obter logs de auditoria (apenas para admin; paginação keyset ou exportação NDJSON)"""
     if not settings.enable_audit_logs:
         raise HTTPException(status_code=403, detail="Audit logs desabilitados")
     
-    logs = db.query(AuditLog).order_by(
-        AuditLog.created_at.desc()
-    ).limit(limit).all()
+    filters = {
+        "user_id": user_id,
+        "start": start,
+        "end": end,
+        "event_type": event_type,
+        "safety_level": safety_level
+    }
+    
+    if format == "ndjson":
+        # Exportação completa para compliance: sem limite de página, ordem cronológica
+        return _ndjson_download(stream_export("audit_logs", compress=compress, **filters), "audit_logs", compress)
+    
+    query = filter_audit_logs(db.query(
+        AuditLog.id,
+        AuditLog.user_id,
+        AuditLog.event_type,
+        AuditLog.safety_level,
+        AuditLog.action_taken,
+        AuditLog.created_at
+    ), **filters)
+    
+    if cursor:
+        try:
+            query = query.filter(keyset_after(
+                AuditLog.created_at, AuditLog.id, cursor, descending=True
+            ))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    
+    rows = query.order_by(
+        AuditLog.created_at.desc(), AuditLog.id.desc()
+    ).limit(limit + 1).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
     
     return [
         {
-            "id": log.id,
-            "event_type": log.event_type,
-            "safety_level": log.safety_level,
-            "created_at": log.created_at
+            "id": row.id,
+            "user_id": row.user_id,
+            "event_type": row.event_type,
+            "safety_level": row.safety_level,
+            "action_taken": row.action_taken,
+            "created_at": row.created_at
         }
-        for log in logs
+        for row in rows
     ]
 
 if __name__ == "__main__":
@@ -0,0 +1,374 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+# Armazenamento em memória limitado para o app simplificado (simple_main)
+#
+# Conversas ficam em um OrderedDict ordenado por último acesso (LRU); as
+# expiradas (TTL) ficam sempre no início e são removidas em O(1) amortizado.
+# Cada conversa guarda no máximo `max_messages` mensagens recentes.
+
+class MessageRecord:
+    """Mensagem compacta (sem __dict__ por instância)"""
+    __slots__ = ("id", "role", "content", "emotional_state", "created_at")
+
+    def __init__(self, id: str, role: str, content: str, emotional_state: Optional[str] = None,
+                 created_at: Optional[float] = None):
+        self.id = id
+        self.role = role
+        self.content = content
+        self.emotional_state = emotional_state
+        self.created_at = created_at if created_at is not None else time.time()
+
+    def to_dict(self) -> dict:
+        data = {"id": self.id, "role": self.role, "content": self.content}
+        if self.emotional_state is not None:
+            data["emotional_state"] = self.emotional_state
+        data["created_at"] = datetime.utcfromtimestamp(self.created_at).isoformat()
+        return data
+
+    def to_tuple(self) -> tuple:
+        return (self.id, self.role, self.content, self.emotional_state, self.created_at)
+
+    def size(self) -> int:
+        """Estimativa de bytes ocupados pelo registro e suas strings"""
+        return (sys.getsizeof(self) + sys.getsizeof(self.id) + sys.getsizeof(self.content)
+                + sys.getsizeof(self.created_at))
+
+class ConversationRecord:
+    """Conversa compacta com janela limitada de mensagens"""
+    __slots__ = ("id", "title", "primary_emotion", "message_count", "created_at",
+                 "last_access", "messages", "size", "sentiment", "average_intensity",
+                 "emotion_counts", "sentiment_score", "sentiment_trajectory")
+
+    def __init__(self, id: str, title: str, primary_emotion: str,
+                 created_at: Optional[float] = None):
+        self.id = id
+        # Títulos e emoções se repetem muito: internar evita uma cópia por conversa
+        self.title = sys.intern(title)
+        self.primary_emotion = sys.intern(primary_emotion)
+        self.message_count = 0
+        self.created_at = created_at if created_at is not None else time.time()
+        self.last_access = self.created_at
+        # Lista simples (um deque reserva blocos de 64 posições por conversa)
+        self.messages: list[MessageRecord] = []
+        # Agregados emocionais (backend/aggregates.py); None até a primeira mensagem
+        self.sentiment: Optional[str] = None
+        self.average_intensity: Optional[float] = None
+        self.emotion_counts: Optional[dict] = None
+        self.sentiment_score: Optional[float] = None
+        self.sentiment_trajectory: Optional[list] = None
+        self.size = sys.getsizeof(self) + sys.getsizeof(self.id) + sys.getsizeof(self.messages)
+
+    def aggregates(self) -> dict:
+        """Cópia dos agregados (o chamador pode alterá-los sem afetar o store)"""
+        return {
+            "average_intensity": self.average_intensity,
+            "emotion_counts": dict(self.emotion_counts) if self.emotion_counts else None,
+            "sentiment_score": self.sentiment_score,
+            "sentiment_trajectory": list(self.sentiment_trajectory) if self.sentiment_trajectory else None
+        }
+
+    def aggregates_size(self) -> int:
+        size = 0
+        if self.emotion_counts is not None:
+            size += sys.getsizeof(self.emotion_counts)
+        if self.sentiment_trajectory is not None:
+            size += sys.getsizeof(self.sentiment_trajectory)
+        return size
+
+    def to_dict(self, include_messages: bool = False) -> dict:
+        data = {
+            "id": self.id,
+            "title": self.title,
+            "primary_emotion": self.primary_emotion,
+            "sentiment": self.sentiment,
+            "average_intensity": self.average_intensity,
+            "message_count": self.message_count,
+            "created_at": datetime.utcfromtimestamp(self.created_at).isoformat()
+        }
+        if include_messages:
+            data["emotion_counts"] = self.emotion_counts
+            data["sentiment_trajectory"] = self.sentiment_trajectory
+            data["messages"] = [message.to_dict() for message in self.messages]
+        return data
+
+    def to_tuple(self) -> tuple:
+        return (self.id, self.title, self.primary_emotion, self.message_count, self.created_at,
+                [message.to_tuple() for message in self.messages],
+                (self.sentiment, self.average_intensity, self.emotion_counts,
+                 self.sentiment_score, self.sentiment_trajectory),
+                self.last_access)
+
+class InMemoryConversationStore:
+    """Store em memória com limite de conversas, mensagens, bytes e TTL"""
+
+    def __init__(self, max_conversations: int = 10000, max_messages: int = 200,
+                 ttl_seconds: Optional[float] = 86400, max_bytes: Optional[int] = None):
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._conversations: "OrderedDict[str, ConversationRecord]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        # Callback opcional que recebe cada mutação (log append-only; ver backend/snapshot.py)
+        self.journal = None
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Lock das mutações (usado pelo snapshot para rotacionar o log atomicamente)"""
+        return self._lock
+
+    # Consultas
+
+    def get(self, conversation_id: str) -> Optional[ConversationRecord]:
+        """Busca uma conversa e a marca como usada recentemente"""
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return None
+
+            now = time.time()
+            if self._is_expired(conversation, now):
+                self._remove(conversation_id)
+                self.expirations += 1
+                return None
+
+            conversation.last_access = now
+            self._conversations.move_to_end(conversation_id)
+            return conversation
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return self.get(conversation_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def list_conversations(self) -> list[dict]:
+        """Lista as conversas ativas, da mais recente para a mais antiga"""
+        with self._lock:
+            self._expire(time.time())
+            return [conversation.to_dict() for conversation in reversed(self._conversations.values())]
+
+    def conversation_dict(self, conversation_id: str) -> Optional[dict]:
+        """Conversa com histórico de mensagens (ou None se não existir)"""
+        with self._lock:
+            conversation = self.get(conversation_id)
+            return conversation.to_dict(include_messages=True) if conversation else None
+
+    # Escrita
+
+    def create_conversation(self, conversation_id: str, title: str, primary_emotion: str) -> ConversationRecord:
+        """Cria uma conversa, liberando espaço por LRU se necessário"""
+        with self._lock:
+            conversation = ConversationRecord(conversation_id, title, primary_emotion)
+            if conversation_id in self._conversations:
+                self._remove(conversation_id)
+
+            self._conversations[conversation_id] = conversation
+            self._bytes += conversation.size
+            self._log(("c", conversation_id, conversation.title, conversation.primary_emotion, conversation.created_at))
+            self._enforce_limits()
+            return conversation
+
+    def append_messages(self, conversation_id: str, *messages: MessageRecord) -> None:
+        """Adiciona mensagens à conversa, descartando as mais antigas acima do limite"""
+        with self._lock:
+            conversation = self.get(conversation_id)
+            if conversation is None:
+                raise KeyError(conversation_id)
+
+            for message in messages:
+                self._append(conversation, message)
+                # Posição da mensagem na conversa: o replay reconhece o que o snapshot já tem
+                self._log(("m", conversation_id, conversation.message_count) + message.to_tuple())
+            self._trim(conversation)
+
+            self._enforce_limits()
+
+    def update_aggregates(self, conversation_id: str, primary_emotion: str, sentiment: Optional[str],
+                          average_intensity: Optional[float], emotion_counts: Optional[dict],
+                          sentiment_score: Optional[float], sentiment_trajectory: Optional[list]) -> None:
+        """Substitui os agregados emocionais (conversas já despejadas são ignoradas)"""
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return
+            self._log(("a", conversation_id, primary_emotion, sentiment, average_intensity,
+                       emotion_counts, sentiment_score, sentiment_trajectory))
+            self._set_aggregates(conversation, primary_emotion, sentiment, average_intensity,
+                                 emotion_counts, sentiment_score, sentiment_trajectory)
+
+    def delete(self, conversation_id: str) -> bool:
+        """Remove uma conversa; retorna False se ela não existir"""
+        with self._lock:
+            if conversation_id not in self._conversations:
+                return False
+            self._remove(conversation_id)
+            return True
+
+    # Memória
+
+    def memory_usage(self) -> dict:
+        """Contabilidade de memória e contadores de despejo"""
+        with self._lock:
+            return {
+                "conversations": len(self._conversations),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_conversations": self.max_conversations,
+                "max_messages_per_conversation": self.max_messages,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+    def _is_expired(self, conversation: ConversationRecord, now: float) -> bool:
+        return self.ttl_seconds is not None and now - conversation.last_access > self.ttl_seconds
+
+    def _remove(self, conversation_id: str) -> None:
+        conversation = self._conversations.pop(conversation_id)
+        self._bytes -= conversation.size
+        self._log(("d", conversation_id))
+
+    def _append(self, conversation: ConversationRecord, message: MessageRecord) -> None:
+        conversation.messages.append(message)
+        added = message.size()
+        conversation.size += added
+        self._bytes += added
+        conversation.message_count += 1
+
+    def _trim(self, conversation: ConversationRecord) -> None:
+        """Descarta as mensagens mais antigas acima do limite por conversa"""
+        overflow = len(conversation.messages) - self.max_messages
+        if overflow > 0:
+            dropped = sum(message.size() for message in conversation.messages[:overflow])
+            del conversation.messages[:overflow]
+            conversation.size -= dropped
+            self._bytes -= dropped
+
+    def _set_aggregates(self, conversation: ConversationRecord, primary_emotion: str, sentiment: Optional[str],
+                        average_intensity: Optional[float], emotion_counts: Optional[dict],
+                        sentiment_score: Optional[float], sentiment_trajectory: Optional[list]) -> None:
+        previous = conversation.aggregates_size()
+        conversation.primary_emotion = sys.intern(primary_emotion)
+        conversation.sentiment = sys.intern(sentiment) if sentiment else None
+        conversation.average_intensity = average_intensity
+        conversation.emotion_counts = emotion_counts
+        conversation.sentiment_score = sentiment_score
+        conversation.sentiment_trajectory = sentiment_trajectory
+        delta = conversation.aggregates_size() - previous
+        conversation.size += delta
+        self._bytes += delta
+
+    def _log(self, entry: tuple) -> None:
+        if self.journal is not None:
+            self.journal(entry)
+
+    # Persistência (snapshots e replay do log)
+
+    def conversation_ids(self) -> list[str]:
+        """Cópia rasa dos IDs atuais, para snapshots incrementais"""
+        with self._lock:
+            return list(self._conversations)
+
+    def dump_conversations(self, conversation_ids: list[str]) -> list[tuple]:
+        """Serializa as conversas informadas (as já removidas são ignoradas)"""
+        with self._lock:
+            dumped = []
+            for conversation_id in conversation_ids:
+                conversation = self._conversations.get(conversation_id)
+                if conversation is not None:
+                    dumped.append(conversation.to_tuple())
+            return dumped
+
+    def load_conversation(self, data: tuple) -> None:
+        """Restaura uma conversa serializada por dump_conversations"""
+        conversation_id, title, primary_emotion, message_count, created_at, messages = data[:6]
+        with self._lock:
+            conversation = ConversationRecord(conversation_id, title, primary_emotion, created_at=created_at)
+            conversation.message_count = message_count
+            conversation.messages = [MessageRecord(*message) for message in messages]
+            conversation.size += sum(message.size() for message in conversation.messages)
+            self._conversations[conversation_id] = conversation
+            self._bytes += conversation.size
+            if len(data) > 6:
+                # Snapshots anteriores aos agregados têm só 6 campos
+                self._set_aggregates(conversation, primary_emotion, *data[6])
+            if len(data) > 7:
+                conversation.last_access = data[7]
+
+    def restore_access_order(self) -> None:
+        """Reordena as conversas por último acesso (a carga segue a ordem do snapshot e do log)"""
+        with self._lock:
+            ordered = sorted(self._conversations.values(), key=lambda conversation: conversation.last_access)
+            self._conversations = OrderedDict((conversation.id, conversation) for conversation in ordered)
+
+    def enforce_limits(self) -> None:
+        """Aplica TTL/LRU (usado após restaurar um snapshot)"""
+        with self._lock:
+            self._enforce_limits()
+
+    def apply(self, entry: tuple) -> None:
+        """Reaplica uma entrada do log; idempotente sobre um snapshot parcial"""
+        operation = entry[0]
+        with self._lock:
+            if operation == "c":
+                _, conversation_id, title, primary_emotion, created_at = entry
+                if conversation_id not in self._conversations:
+                    conversation = ConversationRecord(conversation_id, title, primary_emotion, created_at=created_at)
+                    self._conversations[conversation_id] = conversation
+                    self._bytes += conversation.size
+            elif operation == "m":
+                conversation = self._conversations.get(entry[1])
+                if conversation is None:
+                    return
+                if len(entry) > 7:
+                    # Mensagem já contada no snapshot (a ordem do log é a dos appends,
+                    # não a dos IDs: duas requisições podem confirmar fora de ordem)
+                    position = entry[2]
+                    message = MessageRecord(*entry[3:])
+                    if position <= conversation.message_count:
+                        return
+                else:
+                    # Logs antigos, sem a posição: deduplicação pelos IDs da janela
+                    message = MessageRecord(*entry[2:])
+                    if any(existing.id == message.id for existing in conversation.messages):
+                        return
+                self._append(conversation, message)
+                self._trim(conversation)
+                conversation.last_access = max(conversation.last_access, message.created_at)
+            elif operation == "a":
+                conversation = self._conversations.get(entry[1])
+                if conversation is not None:
+                    self._set_aggregates(conversation, *entry[2:])
+            elif operation == "d":
+                conversation = self._conversations.pop(entry[1], None)
+                if conversation is not None:
+                    self._bytes -= conversation.size
+
+    def _expire(self, now: float) -> None:
+        """Remove conversas expiradas (sempre no início da ordem LRU)"""
+        while self._conversations:
+            oldest = next(iter(self._conversations.values()))
+            if not self._is_expired(oldest, now):
+                return
+            self._remove(oldest.id)
+            self.expirations += 1
+
+    def _enforce_limits(self) -> None:
+        self._expire(time.time())
+
+        while len(self._conversations) > self.max_conversations or (
+            self.max_bytes is not None and self._bytes > self.max_bytes and len(self._conversations) > 1
+        ):
+            oldest_id = next(iter(self._conversations))
+            self._remove(oldest_id)
+            self.evictions += 1
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, Integer, DateTime, Float, Text, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, String, Integer, Date, DateTime, Float, Text, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
-import uuid
+
+from backend.ids import new_id
 
 Base = declarative_base()
 
@@ -10,7 +11,7 @@ class User(Base):
     """Modelo de usuário"""
     __tablename__ = "users"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(String, primary_key=True, default=new_id)
     username = Column(String(255), unique=True, index=True)
     email = Column(String(255), unique=True, index=True)
     hashed_password = Column(String(255))
@@ -37,16 +38,16 @@ class User(Base):
     is_verified = Column(Boolean, default=False)
     
     # Relacionamentos
-    conversations = relationship("Conversation", back_populates="user", cascade="all, delete-orphan")
-    messages = relationship("Message", back_populates="user", cascade="all, delete-orphan")
-    sessions = relationship("Session", back_populates="user", cascade="all, delete-orphan")
+    conversations = relationship("Conversation", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    messages = relationship("Message", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    sessions = relationship("Session", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
 class Conversation(Base):
     """Modelo de conversa"""
     __tablename__ = "conversations"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), index=True)
+    id = Column(String, primary_key=True, default=new_id)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     
     # Contexto
     title = Column(String(255), nullable=True)
@@ -55,7 +56,10 @@ class Conversation(Base):
     # Análise emocional
     primary_emotion = Column(String(50), nullable=True)
     sentiment = Column(String(20), nullable=True)
-    average_intensity = Column(Float, default=0.5)
+    average_intensity = Column(Float, default=0.5)  # EMA da intensidade (backend/aggregates.py)
+    emotion_counts = Column(JSON, nullable=True)
+    sentiment_score = Column(Float, nullable=True)
+    sentiment_trajectory = Column(JSON, nullable=True)
     
     # Histórico
     message_count = Column(Integer, default=0)
@@ -67,15 +71,42 @@ class Conversation(Base):
     
     # Relacionamentos
     user = relationship("User", back_populates="conversations")
-    messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    # Exclusão em cascata feita pelo banco (ON DELETE CASCADE), sem carregar as mensagens
+    messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan", passive_deletes=True)
+    
+    # Índices para paginação keyset
+    __table_args__ = (
+        Index("ix_conversations_updated_at_id", "updated_at", "id"),
+    )
+
+class ArchivedConversation(Base):
+    """Índice das conversas movidas para o arquivo frio (backend/retention.py)"""
+    __tablename__ = "archived_conversations"
+    
+    # Mesmo id da conversa original (restauração mantém ids e timestamps)
+    id = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    title = Column(String(255), nullable=True)
+    primary_emotion = Column(String(50), nullable=True)
+    message_count = Column(Integer, default=0)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    
+    # Arquivo gzip NDJSON, relativo ao diretório de arquivo
+    archive_path = Column(String(255))
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_archived_conversations_user_id_archived_at_id", "user_id", "archived_at", "id"),
+    )
 
 class Message(Base):
     """Modelo de mensagem"""
     __tablename__ = "messages"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    conversation_id = Column(String, ForeignKey("conversations.id"), index=True)
-    user_id = Column(String, ForeignKey("users.id"), index=True)
+    id = Column(String, primary_key=True, default=new_id)
+    conversation_id = Column(String, ForeignKey("conversations.id", ondelete="CASCADE"), index=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     
     # Conteúdo
     content = Column(Text)
@@ -92,6 +123,9 @@ class Message(Base):
     safety_level = Column(String(20), nullable=True)
     safety_reason = Column(Text, nullable=True)
     
+    # Fingerprint dos léxicos que pontuaram a mensagem (backend/lexicon.py)
+    lexicon_version = Column(String(32), nullable=True)
+    
     # Metadados
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     tokens_used = Column(Integer, nullable=True)
@@ -99,13 +133,18 @@ class Message(Base):
     # Relacionamentos
     conversation = relationship("Conversation", back_populates="messages")
     user = relationship("User", back_populates="messages")
+    
+    # Índices para paginação keyset
+    __table_args__ = (
+        Index("ix_messages_conversation_created_at_id", "conversation_id", "created_at", "id"),
+    )
 
 class Session(Base):
     """Modelo de sessão (para cache de contexto)"""
     __tablename__ = "sessions"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), index=True)
+    id = Column(String, primary_key=True, default=new_id)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     
     # Contexto da sessão
     context_data = Column(JSON)  # Últimas mensagens, estado emocional, etc
@@ -122,8 +161,9 @@ class AuditLog(Base):
     """Modelo de log de auditoria para segurança"""
     __tablename__ = "audit_logs"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=True, index=True)
+    id = Column(String, primary_key=True, default=new_id)
+    # A trilha de auditoria sobrevive à exclusão do usuário (fica sem dono)
+    user_id = Column(String, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     
     # Evento
     event_type = Column(String(50))  # "login", "message", "safety_alert", etc
@@ -134,6 +174,45 @@ class AuditLog(Base):
     action_taken = Column(String(255), nullable=True)
     
     # Metadados
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
     ip_address = Column(String(50), nullable=True)
     user_agent = Column(String(255), nullable=True)
+    
+    # Índices compostos para os filtros da revisão de segurança + paginação keyset
+    # (os prefixos cobrem os antigos índices simples de user_id e created_at)
+    __table_args__ = (
+        Index("ix_audit_logs_created_at_id", "created_at", "id"),
+        Index("ix_audit_logs_event_type_created_at_id", "event_type", "created_at", "id"),
+        Index("ix_audit_logs_safety_level_created_at_id", "safety_level", "created_at", "id"),
+        Index("ix_audit_logs_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+class EmotionDailyRollup(Base):
+    """Mensagens do usuário por dia × estado emocional × sentimento (backend/analytics.py)"""
+    __tablename__ = "emotion_daily_rollups"
+    
+    day = Column(Date, primary_key=True)
+    emotional_state = Column(String(50), primary_key=True)
+    sentiment = Column(String(20), primary_key=True)
+    
+    message_count = Column(Integer, nullable=False, default=0)
+    intensity_sum = Column(Float, nullable=False, default=0.0)
+
+class SafetyDailyRollup(Base):
+    """Mensagens do usuário e alertas de crise por dia × nível de segurança"""
+    __tablename__ = "safety_daily_rollups"
+    
+    day = Column(Date, primary_key=True)
+    safety_level = Column(String(20), primary_key=True)  # safe, warning, critical (valores de SafetyLevel)
+    
+    event_count = Column(Integer, nullable=False, default=0)
+
+class UserBaselineCounter(Base):
+    """Contadores aditivos da linha de base emocional (backend/baseline.py)"""
+    __tablename__ = "user_baseline_counters"
+    
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    kind = Column(String(20), primary_key=True)  # messages, emotion, sentiment, intensity, trigger, trigger_error
+    key = Column(String(100), primary_key=True)
+    
+    value = Column(Float, nullable=False, default=0.0)
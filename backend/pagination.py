@@ -0,0 +1,36 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import and_, or_
+
+# Cursores opacos para paginação keyset (timestamp + id como desempate)
+
+def encode_cursor(timestamp: datetime, row_id: str) -> str:
+    """Codifica a posição (timestamp, id) em um cursor opaco"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decodifica um cursor; lança ValueError se for inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        timestamp, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), row_id
+    except Exception as e:
+        raise ValueError("Cursor inválido") from e
+
+def keyset_after(timestamp_column, id_column, cursor: str, descending: bool = False):
+    """Condição WHERE para as linhas que vêm depois do cursor na ordenação"""
+    timestamp, row_id = decode_cursor(cursor)
+    
+    if descending:
+        return or_(
+            timestamp_column < timestamp,
+            and_(timestamp_column == timestamp, id_column < row_id)
+        )
+    return or_(
+        timestamp_column > timestamp,
+        and_(timestamp_column == timestamp, id_column > row_id)
+    )
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from backend.models import (
+    ArchivedConversation, AuditLog, Conversation, Message, Session as UserSession, User, UserBaselineCounter
+)
+from backend.retention import purge_archived_user
+
+# Exclusão em massa de conversas em lotes limitados
+#
+# Cada lote é uma transação curta: o banco nunca fica travado por uma
+# varredura longa e os objetos ORM das mensagens nunca são carregados.
+
+DEFAULT_BATCH_SIZE = 500
+
+def _delete_messages(db: Session, conversation_ids: list[str], batch_size: int) -> int:
+    """Remove as mensagens das conversas em lotes (conversas enormes não travam o banco)"""
+    deleted = 0
+    while True:
+        batch = select(Message.id).where(
+            Message.conversation_id.in_(conversation_ids)
+        ).limit(batch_size)
+        result = db.execute(delete(Message).where(Message.id.in_(batch)))
+        db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+def delete_conversations(
+    db: Session,
+    conversation_ids: Iterable[str],
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """Exclui as conversas informadas e suas mensagens, sem cascata pelo ORM"""
+    conversation_ids = list(conversation_ids)
+    deleted = 0
+
+    for start in range(0, len(conversation_ids), batch_size):
+        ids = conversation_ids[start:start + batch_size]
+        _delete_messages(db, ids, batch_size)
+
+        result = db.execute(delete(Conversation).where(Conversation.id.in_(ids)))
+        db.commit()
+        deleted += result.rowcount
+
+    return deleted
+
+def purge_conversations(
+    db: Session,
+    user_id: Optional[str] = None,
+    older_than_days: Optional[int] = None,
+    archived: Optional[bool] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """Exclui conversas por usuário, idade (updated_at) e/ou flag de arquivamento"""
+    if user_id is None and older_than_days is None and archived is None:
+        raise ValueError("Informe ao menos um filtro para a exclusão em massa")
+    
+    query = select(Conversation.id)
+
+    if user_id is not None:
+        query = query.where(Conversation.user_id == user_id)
+    if older_than_days is not None:
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        query = query.where(Conversation.updated_at < cutoff)
+    if archived is not None:
+        query = query.where(Conversation.is_archived == archived)
+
+    deleted = 0
+    while True:
+        ids = db.execute(query.limit(batch_size)).scalars().all()
+        if not ids:
+            return deleted
+        deleted += delete_conversations(db, ids, batch_size)
+
+def delete_user(db: Session, user_id: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                archive_dir: Optional[str] = None) -> bool:
+    """Exclui o usuário, suas conversas (em lotes, inclusive as do arquivo frio) e sessões;
+    os logs de auditoria ficam sem dono"""
+    # Arquivo frio primeiro: sem archive_dir a exclusão falha antes de apagar qualquer coisa
+    purge_archived_user(db, archive_dir, user_id)
+    purge_conversations(db, user_id=user_id, batch_size=batch_size)
+
+    # Explícito em vez de depender de ON DELETE: tabelas criadas antes das
+    # cascatas (create_all não altera constraints) recusariam a exclusão
+    db.execute(update(AuditLog).where(AuditLog.user_id == user_id).values(user_id=None))
+    db.execute(delete(Message).where(Message.user_id == user_id))
+    db.execute(delete(ArchivedConversation).where(ArchivedConversation.user_id == user_id))
+    db.execute(delete(UserSession).where(UserSession.user_id == user_id))
+    db.execute(delete(UserBaselineCounter).where(UserBaselineCounter.user_id == user_id))
+    result = db.execute(delete(User).where(User.id == user_id))
+    db.commit()
+    return result.rowcount > 0
@@ -0,0 +1,295 @@
+# Reanálise offline das mensagens após mudanças nos léxicos
+#
+# Percorre a tabela messages em blocos keyset, reanalisa cada bloco em um pool
+# de processos e grava só as linhas que mudaram (UPDATE em lote por chave
+# primária). Cada mensagem usa o léxico do idioma do usuário (ou o detectado
+# no texto), como no pipeline. Mensagens já pontuadas pela versão atual de
+# algum idioma (messages.lexicon_version) nem são lidas; as demais, mudando ou
+# não, ficam marcadas com a versão usada. Depois de cada commit o cursor vai
+# para um arquivo de checkpoint; ao rodar de novo o job continua de onde
+# parou. O checkpoint guarda as versões dos léxicos: se elas mudaram de novo,
+# o job recomeça. Com --model, o estado emocional vem do classificador por
+# embeddings (um lote por bloco, modelo carregado uma vez por processo) e a
+# versão gravada inclui a do modelo.
+#
+# Os rollups de analytics são corrigidos no mesmo commit de cada bloco: cada
+# linha alterada desconta os valores antigos e soma os novos (UPSERT), então
+# só os dias afetados mudam e os totais de conversas já arquivadas (que não
+# estão mais em messages) são preservados.
+#
+# Uso:
+#   python -m backend.reanalyze --workers 4 --chunk-size 2000
+#   python -m backend.reanalyze --restart            # ignora o checkpoint
+#   python -m backend.reanalyze --model models/emotion.npz
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import String, Text, or_, type_coerce, update
+from sqlalchemy.orm import Session
+
+from backend.analytics import RollupBuffer
+from backend.emotion_analyzer import emotion_analyzer
+from backend.emotional_safety import SafetyLevel, safety_guard
+from backend.lexicon import available_languages, lexicon_fingerprint, lexicon_for, lexicon_source
+from backend.models import Conversation, Message, User
+from backend.pagination import encode_cursor, keyset_after
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_CHECKPOINT = ".reanalyze-checkpoint.json"
+
+# Leitura
+
+# Colunas comparadas com o resultado da reanálise (palavras-chave e timestamp
+# chegam como texto bruto: a decodificação do JSON roda nos processos do pool)
+MESSAGE_COLUMNS = (
+    Message.id,
+    Message.content,
+    Message.emotional_state,
+    Message.sentiment,
+    Message.emotion_confidence,
+    Message.emotion_intensity,
+    type_coerce(Message.emotion_keywords, Text).label("emotion_keywords"),
+    Message.safety_level,
+    User.language,
+)
+
+def iter_chunks(db: Session, chunk_size: int, cursor: Optional[str] = None,
+                fingerprints: Optional[list[str]] = None) -> Iterator[tuple[list[tuple], str]]:
+    """Blocos de mensagens do usuário (não pontuadas por `fingerprints`) com o cursor do fim de cada bloco"""
+    query = db.query(
+        *MESSAGE_COLUMNS,
+        type_coerce(Message.created_at, String).label("created_at")
+    ).outerjoin(
+        Conversation, Conversation.id == Message.conversation_id
+    ).outerjoin(
+        User, User.id == Conversation.user_id
+    ).filter(Message.role == "user")
+    if fingerprints:
+        query = query.filter(or_(Message.lexicon_version.is_(None), Message.lexicon_version.notin_(fingerprints)))
+
+    while True:
+        page = query
+        if cursor:
+            page = page.filter(keyset_after(Message.created_at, Message.id, cursor))
+        rows = page.order_by(Message.created_at, Message.id).limit(chunk_size).all()
+        if not rows:
+            return
+
+        last_timestamp = rows[-1].created_at
+        if isinstance(last_timestamp, str):
+            last_timestamp = datetime.fromisoformat(last_timestamp)
+        cursor = encode_cursor(last_timestamp, rows[-1].id)
+        yield [tuple(row) for row in rows], cursor
+
+        if len(rows) < chunk_size:
+            return
+
+# Reanálise (processos do pool)
+
+def _load_worker_model(model_path: Optional[str]) -> None:
+    """Inicializador do pool: cada processo carrega o modelo uma vez, antes do primeiro bloco"""
+    if model_path:
+        from backend.emotion_classifier import load_model
+        load_model(model_path)
+
+def reanalyze_chunk(rows: list[tuple], versions: dict[str, str], model_path: Optional[str] = None
+                    ) -> tuple[list[dict], dict[str, list[str]], Counter, RollupBuffer]:
+    """Reanalisa um bloco; devolve as linhas alteradas, os ids sem mudança (por versão),
+    as transições e a correção dos rollups"""
+    updates = []
+    unchanged: dict[str, list[str]] = {}
+    transitions = Counter()
+    rollups = RollupBuffer()
+
+    model = classified = None
+    if model_path:
+        # Importação tardia: o NumPy só é carregado com o classificador. load_model
+        # guarda o modelo por processo: os blocos seguintes não releem o arquivo
+        from backend.emotion_classifier import classified_analysis, load_model
+        model = load_model(model_path)
+        classified = model.classify([row[1] or "" for row in rows])
+
+    for index, (message_id, content, state, sentiment, confidence, intensity, keywords, safety_level,
+                language, created_at) in enumerate(rows):
+        lexicon = lexicon_for(language, content or "")
+        if versions.get(lexicon.language) != lexicon.fingerprint:
+            raise RuntimeError(
+                f"Léxicos de {lexicon.language} mudaram durante a reanálise "
+                f"({versions.get(lexicon.language)} -> {lexicon.fingerprint})"
+            )
+
+        if model is not None:
+            emotion = classified_analysis(model, content or "", classified[index], lexicon)
+        else:
+            emotion = emotion_analyzer.analyze(content or "", lexicon=lexicon)
+        safety = safety_guard.analyze(content or "", lexicon=lexicon)
+
+        new = {
+            "emotional_state": emotion.emotional_state.value,
+            "sentiment": emotion.sentiment.value,
+            "emotion_confidence": emotion.confidence,
+            "emotion_intensity": emotion.intensity,
+            "emotion_keywords": emotion.keywords,
+            # Mesmo formato do pipeline: mensagens seguras ficam sem nível
+            "safety_level": safety.level.value if safety.level != SafetyLevel.SAFE else None,
+        }
+        old = {
+            "emotional_state": state,
+            "sentiment": sentiment,
+            "emotion_confidence": confidence,
+            "emotion_intensity": intensity,
+            "emotion_keywords": json.loads(keywords) if isinstance(keywords, str) else keywords,
+            "safety_level": safety_level,
+        }
+        if new == old:
+            unchanged.setdefault(emotion.lexicon_version, []).append(message_id)
+            continue
+
+        updates.append({"id": message_id, **new, "lexicon_version": emotion.lexicon_version})
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        rollups.add_message(created_at, state, sentiment, intensity, safety_level, weight=-1)
+        rollups.add_message(created_at, new["emotional_state"], new["sentiment"], new["emotion_intensity"],
+                            new["safety_level"])
+        if new["emotional_state"] != state:
+            transitions[f"emotional_state:{state}->{new['emotional_state']}"] += 1
+        if new["safety_level"] != safety_level:
+            transitions[f"safety_level:{safety_level}->{new['safety_level']}"] += 1
+
+    return updates, unchanged, transitions, rollups
+
+# Checkpoint
+
+def new_checkpoint(fingerprint: str) -> dict:
+    return {"fingerprint": fingerprint, "cursor": None, "scanned": 0, "updated": 0, "transitions": {}}
+
+def load_checkpoint(path: str, fingerprint: str) -> dict:
+    """Checkpoint salvo, se for dos mesmos léxicos; senão um novo"""
+    if os.path.exists(path):
+        with open(path) as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        if checkpoint.get("fingerprint") == fingerprint:
+            return checkpoint
+    return new_checkpoint(fingerprint)
+
+def save_checkpoint(path: str, checkpoint: dict) -> None:
+    """Grava o checkpoint de forma atômica (tmp + rename)"""
+    temporary = path + ".tmp"
+    with open(temporary, "w") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file, ensure_ascii=False)
+    os.replace(temporary, path)
+
+# Job
+
+def lexicon_versions() -> dict[str, str]:
+    """Versão atual dos léxicos de cada idioma (LexiconError se algum arquivo for inválido)"""
+    return {language: lexicon_fingerprint(lexicon_source(language)) for language in available_languages()}
+
+def run(db: Session, workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE,
+        checkpoint_path: str = DEFAULT_CHECKPOINT, restart: bool = False, model_path: Optional[str] = None) -> dict:
+    """Reanalisa as mensagens pendentes e devolve as estatísticas acumuladas"""
+    versions = lexicon_versions()
+    # Versões gravadas nas mensagens: a do léxico, mais a do modelo com --model
+    stamps = list(versions.values())
+    fingerprint = ",".join(f"{language}:{version}" for language, version in sorted(versions.items()))
+    if model_path:
+        from backend.emotion_classifier import load_model
+        model_version = load_model(model_path).version
+        stamps = [f"{version}:{model_version}" for version in stamps]
+        fingerprint += f",model:{model_version}"
+    checkpoint = new_checkpoint(fingerprint) if restart else load_checkpoint(checkpoint_path, fingerprint)
+
+    transitions = Counter(checkpoint["transitions"])
+    started = time.perf_counter()
+    scanned_this_run = 0
+
+    def apply(rows: list[tuple], cursor: str,
+              result: tuple[list[dict], dict[str, list[str]], Counter, RollupBuffer]) -> None:
+        nonlocal scanned_this_run
+        updates, unchanged, chunk_transitions, rollups = result
+        if updates:
+            # UPDATE em lote por chave primária (executemany, sem carregar objetos ORM)
+            db.execute(update(Message), updates)
+        for version, message_ids in unchanged.items():
+            # Mesmo resultado: só a versão, para a próxima execução não relê-las
+            db.execute(
+                update(Message).where(Message.id.in_(message_ids)).values(lexicon_version=version),
+                execution_options={"synchronize_session": False}
+            )
+        # Rollups no mesmo commit: um bloco retomado do checkpoint não é contado duas vezes
+        rollups.flush(db)
+        db.commit()
+
+        transitions.update(chunk_transitions)
+        scanned_this_run += len(rows)
+        checkpoint.update(
+            cursor=cursor,
+            scanned=checkpoint["scanned"] + len(rows),
+            updated=checkpoint["updated"] + len(updates),
+            transitions=dict(transitions)
+        )
+        save_checkpoint(checkpoint_path, checkpoint)
+
+        elapsed = time.perf_counter() - started
+        print(
+            f"{checkpoint['scanned']} lidas, {checkpoint['updated']} atualizadas "
+            f"({scanned_this_run / elapsed:.0f} msg/s)",
+            file=sys.stderr
+        )
+
+    chunks = iter_chunks(db, chunk_size, checkpoint["cursor"], stamps)
+    if workers <= 1:
+        for rows, cursor in chunks:
+            apply(rows, cursor, reanalyze_chunk(rows, versions, model_path))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_load_worker_model,
+                                 initargs=(model_path,)) as executor:
+            # Resultados aplicados na ordem de envio: o checkpoint nunca pula um bloco
+            in_flight = []
+            for rows, cursor in chunks:
+                in_flight.append((rows, cursor, executor.submit(reanalyze_chunk, rows, versions, model_path)))
+                if len(in_flight) >= workers * 2:
+                    rows, cursor, future = in_flight.pop(0)
+                    apply(rows, cursor, future.result())
+            for rows, cursor, future in in_flight:
+                apply(rows, cursor, future.result())
+
+    elapsed = time.perf_counter() - started
+    return {
+        "fingerprint": fingerprint,
+        "scanned": checkpoint["scanned"],
+        "updated": checkpoint["updated"],
+        "scanned_this_run": scanned_this_run,
+        "seconds": round(elapsed, 2),
+        "messages_per_second": round(scanned_this_run / elapsed, 1) if elapsed else None,
+        "transitions": dict(transitions.most_common())
+    }
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Reanalisa mensagens com os léxicos atuais")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Arquivo de progresso")
+    parser.add_argument("--restart", action="store_true", help="Ignorar o checkpoint existente")
+    parser.add_argument("--model", help="Estado emocional pelo classificador por embeddings (.npz)")
+    args = parser.parse_args(argv)
+
+    from backend.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        stats = run(db, args.workers, args.chunk_size, args.checkpoint, args.restart, args.model)
+    finally:
+        db.close()
+
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
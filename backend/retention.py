@@ -0,0 +1,400 @@
+# Retenção e arquivo frio de conversas e logs de auditoria
+#
+# A varredura move para arquivos gzip NDJSON, particionados pela data do
+# registro, as conversas sem atividade há retention_conversation_days (ou
+# marcadas com is_archived) e os logs de auditoria com mais de
+# retention_audit_log_days:
+#
+#   <archive_dir>/conversations/AAAA/MM/DD/<ulid>.ndjson.gz  (conversa + mensagens)
+#   <archive_dir>/audit_logs/AAAA/MM/DD/<ulid>.ndjson.gz
+#
+# Cada lote é uma transação curta: o arquivo é gravado (tmp + fsync + rename)
+# antes de as linhas saírem das tabelas quentes, e se o commit falhar o arquivo
+# é removido. O lote é travado antes da leitura (FOR UPDATE no Postgres, BEGIN
+# IMMEDIATE no SQLite): nenhuma mensagem nova entra entre o SELECT e o DELETE.
+#
+# A tabela archived_conversations indica em qual arquivo está cada conversa,
+# para a restauração sob demanda (ids e timestamps originais). A exclusão de um
+# usuário (backend/purge.py) reescreve os arquivos com conversas dele, sem elas.
+#
+# Os rollups de analytics e as linhas de base não mudam: o histórico agregado
+# continua contando as mensagens arquivadas. Os arquivos de auditoria são
+# NDJSON comum (zcat/jq) para consultas de compliance.
+#
+# Uso:
+#   python -m backend.retention sweep [--conversation-days 180] [--audit-log-days 365]
+#   python -m backend.retention restore <conversation_id>
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import DateTime, delete, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.export import gzip_chunks, to_ndjson
+from backend.ids import new_id
+from backend.models import ArchivedConversation, AuditLog, Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+# Arquivos
+
+def _partition_path(kind: str, day: date) -> str:
+    return os.path.join(kind, f"{day:%Y}", f"{day:%m}", f"{day:%d}", f"{new_id()}.ndjson.gz")
+
+def _write_archive(archive_dir: str, relative_path: str, records: Iterable[dict]) -> None:
+    """Grava um arquivo gzip NDJSON de forma atômica (tmp + fsync + rename)"""
+    path = os.path.join(archive_dir, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as archive_file:
+        for chunk in gzip_chunks(to_ndjson(records)):
+            archive_file.write(chunk)
+        archive_file.flush()
+        os.fsync(archive_file.fileno())
+    os.replace(temporary, path)
+
+def _remove_archives(archive_dir: str, relative_paths: list[str]) -> None:
+    for relative_path in relative_paths:
+        try:
+            os.remove(os.path.join(archive_dir, relative_path))
+        except OSError:
+            pass
+
+def read_archive(archive_dir: str, relative_path: str) -> Iterator[dict]:
+    """Registros de um arquivo do arquivo frio"""
+    with gzip.open(os.path.join(archive_dir, relative_path), "rt", encoding="utf-8") as archive_file:
+        for line in archive_file:
+            if line.strip():
+                yield json.loads(line)
+
+def _group_by_day(rows: list[dict], column: str) -> dict[date, list[dict]]:
+    days: dict[date, list[dict]] = {}
+    for row in rows:
+        timestamp = row[column] or datetime.utcnow()
+        days.setdefault(timestamp.date(), []).append(row)
+    return days
+
+def _decode_row(table, record: dict) -> dict:
+    """Registro do arquivo → valores de coluna (timestamps voltam a ser datetime)"""
+    row = {}
+    for column in table.columns:
+        if column.name not in record:
+            continue  # Coluna criada depois do arquivamento: fica com o padrão
+        value = record[column.name]
+        if isinstance(column.type, DateTime) and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        row[column.name] = value
+    return row
+
+# Lotes
+
+def _lock_batch(db: Session, query):
+    """Trava as linhas do lote até o commit (no Postgres, workers simultâneos pegam lotes disjuntos)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return query.with_for_update(skip_locked=True)
+    if dialect == "sqlite":
+        # Sem FOR UPDATE no SQLite: o lock de escrita do arquivo vem antes do SELECT
+        # (o pysqlite só abre a transação no primeiro INSERT/UPDATE/DELETE)
+        connection = db.connection()
+        if not connection.connection.dbapi_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+    return query
+
+def inactive_conversations(cutoff: datetime):
+    return select(Conversation.__table__).where(
+        Conversation.updated_at < cutoff
+    ).order_by(Conversation.updated_at, Conversation.id)
+
+def flagged_conversations():
+    return select(Conversation.__table__).where(Conversation.is_archived.is_(True))
+
+def archive_conversation_batch(db: Session, archive_dir: str, query, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Arquiva um lote de conversas (com as mensagens) selecionado pela consulta"""
+    conversations = [dict(row) for row in db.execute(_lock_batch(db, query.limit(batch_size))).mappings()]
+    if not conversations:
+        db.rollback()
+        return 0
+
+    ids = [conversation["id"] for conversation in conversations]
+    messages: dict[str, list[dict]] = {}
+    for row in db.execute(
+        select(Message.__table__).where(
+            Message.conversation_id.in_(ids)
+        ).order_by(Message.conversation_id, Message.created_at, Message.id)
+    ).mappings():
+        messages.setdefault(row["conversation_id"], []).append(dict(row))
+
+    archived_at = datetime.utcnow()
+    written = []
+    index_rows = []
+    try:
+        for day, group in _group_by_day(conversations, "updated_at").items():
+            relative_path = _partition_path("conversations", day)
+            _write_archive(archive_dir, relative_path, (
+                {"conversation": conversation, "messages": messages.get(conversation["id"], [])}
+                for conversation in group
+            ))
+            written.append(relative_path)
+            index_rows.extend(
+                {
+                    "id": conversation["id"],
+                    "user_id": conversation["user_id"],
+                    "title": conversation["title"],
+                    "primary_emotion": conversation["primary_emotion"],
+                    "message_count": conversation["message_count"],
+                    "created_at": conversation["created_at"],
+                    "updated_at": conversation["updated_at"],
+                    "archive_path": relative_path,
+                    "archived_at": archived_at
+                }
+                for conversation in group
+            )
+
+        db.execute(insert(ArchivedConversation), index_rows)
+        db.execute(delete(Message).where(Message.conversation_id.in_(ids)))
+        result = db.execute(delete(Conversation).where(Conversation.id.in_(ids)))
+        if result.rowcount != len(ids):
+            # Outro worker arquivou parte do lote: desfaz e tenta de novo na próxima varredura
+            db.rollback()
+            _remove_archives(archive_dir, written)
+            return 0
+        db.commit()
+    except Exception:
+        db.rollback()
+        _remove_archives(archive_dir, written)
+        raise
+    return len(ids)
+
+def archive_audit_log_batch(db: Session, archive_dir: str, cutoff: datetime, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Arquiva um lote de logs de auditoria anteriores ao corte"""
+    rows = [dict(row) for row in db.execute(_lock_batch(db, select(AuditLog.__table__).where(
+        AuditLog.created_at < cutoff
+    ).order_by(AuditLog.created_at, AuditLog.id).limit(batch_size))).mappings()]
+    if not rows:
+        db.rollback()
+        return 0
+
+    ids = [row["id"] for row in rows]
+    written = []
+    try:
+        for day, group in _group_by_day(rows, "created_at").items():
+            relative_path = _partition_path("audit_logs", day)
+            _write_archive(archive_dir, relative_path, group)
+            written.append(relative_path)
+
+        result = db.execute(delete(AuditLog).where(AuditLog.id.in_(ids)))
+        if result.rowcount != len(ids):
+            db.rollback()
+            _remove_archives(archive_dir, written)
+            return 0
+        db.commit()
+    except Exception:
+        db.rollback()
+        _remove_archives(archive_dir, written)
+        raise
+    return len(ids)
+
+def sweep(
+    db: Session,
+    archive_dir: str,
+    conversation_days: Optional[int] = None,
+    audit_log_days: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    pause_seconds: float = 0,
+    stop: Optional[threading.Event] = None
+) -> dict:
+    """Arquiva tudo o que passou da retenção, lote a lote (interrompível por stop)"""
+    now = datetime.utcnow()
+    passes = [("conversations", lambda: archive_conversation_batch(db, archive_dir, flagged_conversations(), batch_size))]
+    if conversation_days is not None:
+        cutoff = now - timedelta(days=conversation_days)
+        passes.append(("conversations", lambda: archive_conversation_batch(
+            db, archive_dir, inactive_conversations(cutoff), batch_size
+        )))
+    if audit_log_days is not None:
+        audit_cutoff = now - timedelta(days=audit_log_days)
+        passes.append(("audit_logs", lambda: archive_audit_log_batch(db, archive_dir, audit_cutoff, batch_size)))
+
+    stats = {"conversations": 0, "audit_logs": 0}
+    for key, archive_batch in passes:
+        while not (stop and stop.is_set()):
+            archived = archive_batch()
+            stats[key] += archived
+            if archived < batch_size:
+                break
+            if pause_seconds:
+                # Lotes espaçados: a varredura não monopoliza o escritor do banco
+                if stop:
+                    stop.wait(pause_seconds)
+                else:
+                    time.sleep(pause_seconds)
+    return stats
+
+# Restauração
+
+def restore_conversation(db: Session, archive_dir: str, conversation_id: str) -> bool:
+    """Traz uma conversa arquivada de volta às tabelas quentes; False se não estiver arquivada"""
+    entry = db.get(ArchivedConversation, conversation_id)
+    if entry is None:
+        return False
+
+    record = next((
+        record for record in read_archive(archive_dir, entry.archive_path)
+        if record["conversation"]["id"] == conversation_id
+    ), None)
+    if record is None:
+        raise LookupError(f"Conversa {conversation_id} ausente de {entry.archive_path}")
+
+    conversation = _decode_row(Conversation.__table__, record["conversation"])
+    # Volta como ativa: sem isso a próxima varredura a arquivaria de novo
+    conversation.update(is_archived=False, updated_at=datetime.utcnow())
+    db.execute(insert(Conversation.__table__), [conversation])
+    if record["messages"]:
+        db.execute(insert(Message.__table__), [
+            _decode_row(Message.__table__, message) for message in record["messages"]
+        ])
+    db.execute(delete(ArchivedConversation).where(ArchivedConversation.id == conversation_id))
+    db.commit()
+    return True
+
+# Exclusão de usuários
+
+def purge_archived_user(db: Session, archive_dir: Optional[str], user_id: str) -> int:
+    """Remove as conversas do usuário dos arquivos frios (reescritos sem elas ou apagados)
+
+    Não confirma a transação: o índice archived_conversations é apagado por quem chama."""
+    paths = db.execute(
+        select(ArchivedConversation.archive_path).where(ArchivedConversation.user_id == user_id).distinct()
+    ).scalars().all()
+    if paths and not archive_dir:
+        raise ValueError("Usuário com conversas no arquivo frio: defina RETENTION_ARCHIVE_DIR")
+
+    removed = 0
+    for relative_path in paths:
+        try:
+            records = list(read_archive(archive_dir, relative_path))
+        except FileNotFoundError:
+            continue
+        kept = [record for record in records if record["conversation"].get("user_id") != user_id]
+        removed += len(records) - len(kept)
+        if kept:
+            # Mesmo caminho: as entradas do índice das outras conversas continuam válidas
+            _write_archive(archive_dir, relative_path, kept)
+        else:
+            _remove_archives(archive_dir, [relative_path])
+    return removed
+
+# Varredura em segundo plano
+
+class RetentionSweeper:
+    """Executa a varredura de retenção periodicamente em uma thread"""
+
+    def __init__(self, session_factory: sessionmaker, archive_dir: str, conversation_days: Optional[int],
+                 audit_log_days: Optional[int], interval_seconds: float = 3600,
+                 batch_size: int = DEFAULT_BATCH_SIZE, pause_seconds: float = 0.1):
+        self.session_factory = session_factory
+        self.archive_dir = archive_dir
+        self.conversation_days = conversation_days
+        self.audit_log_days = audit_log_days
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.runs = 0
+        self.archived = {"conversations": 0, "audit_logs": 0}
+        self.last_run: Optional[dict] = None
+
+    def run_once(self) -> dict:
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            stats = sweep(
+                db, self.archive_dir, self.conversation_days, self.audit_log_days,
+                self.batch_size, self.pause_seconds, self._stop
+            )
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Erro na varredura de retenção: {e}")
+            stats = {"error": str(e)}
+        finally:
+            db.close()
+
+        self.runs += 1
+        for key in self.archived:
+            self.archived[key] += stats.get(key, 0)
+        self.last_run = {"finished_at": datetime.utcnow(), "seconds": round(time.perf_counter() - started, 2), **stats}
+        return stats
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.run_once()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Interrompe a varredura no fim do lote em andamento"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "archive_dir": self.archive_dir,
+            "conversation_days": self.conversation_days,
+            "audit_log_days": self.audit_log_days,
+            "runs": self.runs,
+            "archived": self.archived,
+            "last_run": self.last_run
+        }
+
+def main(argv: Optional[list] = None):
+    from backend.config import settings
+
+    parser = argparse.ArgumentParser(description="Retenção e arquivo frio")
+    parser.add_argument("--archive-dir", default=settings.retention_archive_dir)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    run_sweep = subcommands.add_parser("sweep", help="Arquiva o que passou da retenção")
+    run_sweep.add_argument("--conversation-days", type=int, default=settings.retention_conversation_days)
+    run_sweep.add_argument("--audit-log-days", type=int, default=settings.retention_audit_log_days)
+    run_sweep.add_argument("--batch-size", type=int, default=settings.retention_batch_size)
+    restore = subcommands.add_parser("restore", help="Restaura uma conversa arquivada")
+    restore.add_argument("conversation_id")
+    args = parser.parse_args(argv)
+
+    if not args.archive_dir:
+        parser.error("Defina RETENTION_ARCHIVE_DIR ou --archive-dir")
+
+    from backend.database import SessionLocal
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        if args.command == "sweep":
+            result = sweep(db, args.archive_dir, args.conversation_days, args.audit_log_days, args.batch_size)
+        else:
+            result = {"restored": restore_conversation(db, args.archive_dir, args.conversation_id)}
+    finally:
+        db.close()
+    print(f"{result} em {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import base64
+import re
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Busca textual no histórico de mensagens
+#
+# SQLite: tabela FTS5 "messages_fts" com conteúdo externo (a tabela messages),
+# tokenizador unicode61 sem acentos ("coração" encontra "coracao") e gatilhos
+# que mantêm o índice a cada INSERT/UPDATE/DELETE, inclusive nas cascatas. A
+# chave do índice é a coluna messages.search_key (INTEGER explícito): o rowid
+# implícito de uma tabela com chave String pode ser renumerado por um VACUUM.
+# A coluna indexada messages.search_scope guarda tokens da conversa e do dono
+# ("c<hex do id> u<hex do user_id>"): a busca de um usuário só percorre as
+# mensagens dele, e o bm25 (peso 0 na coluna de escopo) é calculado e
+# ordenado no banco sobre todas as ocorrências, sem janela de candidatos.
+# Postgres: coluna tsvector gerada com a configuração "portuguese" (stemming),
+# índice GIN e ts_rank_cd; o escopo vem da junção com conversations.
+#
+# Toda busca tem escopo (usuário e/ou conversa). A paginação fixa o conjunto
+# na primeira página (snapshot: maior search_key / created_at) e avança por
+# posição: os scores do bm25 mudam com as estatísticas do corpus, então não
+# servem de cursor; mensagens novas não entram nas páginas seguintes.
+
+MAX_QUERY_TERMS = 16
+
+# Escopo indexado de uma mensagem (mesma regra em SQL e em _scope_token)
+_SQLITE_SCOPE = "'c' || hex({conversation_id}) || coalesce(' u' || hex({user_id}), '')"
+
+_SQLITE_SCHEMA = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_messages_search_key ON messages (search_key)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        content,
+        search_scope,
+        content='messages',
+        content_rowid='search_key',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        UPDATE messages SET
+            search_key = (SELECT coalesce(max(search_key), 0) + 1 FROM messages),
+            search_scope = coalesce(
+                (SELECT {_SQLITE_SCOPE.format(conversation_id="c.id", user_id="c.user_id")}
+                 FROM conversations c WHERE c.id = new.conversation_id),
+                {_SQLITE_SCOPE.format(conversation_id="new.conversation_id", user_id="NULL")}
+            )
+        WHERE rowid = new.rowid;
+        INSERT INTO messages_fts(rowid, content, search_scope)
+            SELECT search_key, content, search_scope FROM messages WHERE rowid = new.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages
+    WHEN old.search_key IS NOT NULL BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content, search_scope)
+            VALUES ('delete', old.search_key, old.content, old.search_scope);
+    END
+    """,
+    # O UPDATE do gatilho de inserção (search_key ainda nulo) não reindexa
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content, search_scope ON messages
+    WHEN old.search_key IS NOT NULL BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content, search_scope)
+            VALUES ('delete', old.search_key, old.content, old.search_scope);
+        INSERT INTO messages_fts(rowid, content, search_scope)
+            VALUES (new.search_key, new.content, new.search_scope);
+    END
+    """,
+    # Conversa trocou de dono: o escopo das mensagens é reindexado
+    f"""
+    CREATE TRIGGER IF NOT EXISTS conversations_fts_owner AFTER UPDATE OF user_id ON conversations BEGIN
+        UPDATE messages
+        SET search_scope = {_SQLITE_SCOPE.format(conversation_id="new.id", user_id="new.user_id")}
+        WHERE conversation_id = new.id;
+    END
+    """,
+]
+
+# Índice anterior, sobre o rowid implícito (substituído na primeira instalação)
+_SQLITE_LEGACY = [
+    "DROP TRIGGER IF EXISTS messages_fts_insert",
+    "DROP TRIGGER IF EXISTS messages_fts_delete",
+    "DROP TRIGGER IF EXISTS messages_fts_update",
+    "DROP TABLE IF EXISTS messages_fts",
+    "ALTER TABLE messages ADD COLUMN search_key INTEGER",
+    "ALTER TABLE messages ADD COLUMN search_scope TEXT",
+    # Mensagens existentes: chaves na ordem atual do rowid, escopo pela conversa
+    f"""
+    UPDATE messages SET
+        search_key = rowid,
+        search_scope = coalesce(
+            (SELECT {_SQLITE_SCOPE.format(conversation_id="c.id", user_id="c.user_id")}
+             FROM conversations c WHERE c.id = messages.conversation_id),
+            {_SQLITE_SCOPE.format(conversation_id="messages.conversation_id", user_id="NULL")}
+        )
+    """,
+]
+
+_POSTGRES_SCHEMA = [
+    """
+    ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('portuguese', coalesce(content, ''))) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_messages_search_vector ON messages USING GIN (search_vector)",
+]
+
+def install_search_index(engine: Engine) -> None:
+    """Cria o índice de busca e os gatilhos (idempotente)"""
+    with engine.begin() as connection:
+        if engine.dialect.name == "sqlite":
+            columns = {row[1] for row in connection.execute(text("PRAGMA table_info(messages)"))}
+            migrate = "search_key" not in columns
+            if migrate:
+                for statement in _SQLITE_LEGACY:
+                    connection.execute(text(statement))
+            for statement in _SQLITE_SCHEMA:
+                connection.execute(text(statement))
+            if migrate:
+                # Indexar as mensagens já existentes uma única vez
+                connection.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+        elif engine.dialect.name == "postgresql":
+            for statement in _POSTGRES_SCHEMA:
+                connection.execute(text(statement))
+
+# Consulta
+
+def _terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())[:MAX_QUERY_TERMS]
+
+def _scope_token(prefix: str, value: str) -> str:
+    """Token de escopo, igual ao gerado por hex() no SQLite (o tokenizador ignora a caixa)"""
+    return prefix + value.encode("utf-8").hex()
+
+# Com prefix (busca enquanto digita) só o último termo é prefixo: sem prefixo
+# indexado (mais de 3 letras), o FTS5 funde as listas de todos os termos que
+# começam com ele, o que custa mais que o próprio bm25 em termos comuns
+
+def _fts5_query(terms: list[str], scope: list[str], prefix: bool) -> str:
+    """Termos como strings FTS5 (a entrada do usuário nunca vira sintaxe), restritos ao escopo"""
+    quoted = [f'"{term}"' for term in terms]
+    if prefix:
+        quoted[-1] += "*"
+    return " AND ".join([f'search_scope : "{token}"' for token in scope] + [f"content : ({' '.join(quoted)})"])
+
+def _tsquery(terms: list[str], prefix: bool) -> str:
+    return " & ".join(terms[:-1] + [f"{terms[-1]}:*" if prefix else terms[-1]])
+
+def encode_search_cursor(snapshot, offset: int) -> str:
+    raw = f"{snapshot}|{offset}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_search_cursor(cursor: str) -> tuple[str, int]:
+    """Decodifica um cursor de busca; lança ValueError se for inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        snapshot, offset = raw.rsplit("|", 1)
+        offset = int(offset)
+    except Exception as e:
+        raise ValueError("Cursor inválido") from e
+    if offset < 0:
+        raise ValueError("Cursor inválido")
+    return snapshot, offset
+
+def search_messages(
+    db: Session,
+    query: str,
+    user_id: Optional[str] = None,
+    emotional_state: Optional[str] = None,
+    conversation_id: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    prefix: bool = False
+) -> dict:
+    """Busca mensagens de um usuário e/ou conversa por relevância; menor score = mais relevante"""
+    if user_id is None and conversation_id is None:
+        raise ValueError("Informe user_id ou conversation_id")
+
+    terms = _terms(query)
+    if not terms:
+        return {"results": [], "next_cursor": None}
+
+    dialect = db.get_bind().dialect.name
+    snapshot, offset = decode_search_cursor(cursor) if cursor else (None, 0)
+    params = {"limit": limit + 1, "offset": offset}
+    filters = []
+
+    if dialect == "sqlite":
+        scope = []
+        if user_id is not None:
+            scope.append(_scope_token("u", user_id))
+        if conversation_id is not None:
+            scope.append(_scope_token("c", conversation_id))
+        params["query"] = _fts5_query(terms, scope, prefix)
+        filters.append("messages_fts MATCH :query")
+        source = "messages_fts JOIN messages m ON m.search_key = messages_fts.rowid"
+        snapshot_key = "messages_fts.rowid"
+        if snapshot is None:
+            snapshot = db.execute(text("SELECT coalesce(max(search_key), 0) FROM messages")).scalar()
+        params["snapshot"] = int(snapshot)
+        # Escopo com peso 0: só o conteúdo conta na relevância
+        score = "bm25(messages_fts, 1.0, 0.0)"
+        snippet = "snippet(messages_fts, 0, '<mark>', '</mark>', '…', 12)"
+        tiebreak = "messages_fts.rowid"
+    elif dialect == "postgresql":
+        params["query"] = _tsquery(terms, prefix)
+        filters.append("m.search_vector @@ to_tsquery('portuguese', :query)")
+        source = "messages m JOIN conversations c ON c.id = m.conversation_id"
+        if user_id is not None:
+            filters.append("c.user_id = :user_id")
+            params["user_id"] = user_id
+        if conversation_id is not None:
+            filters.append("m.conversation_id = :conversation_id")
+            params["conversation_id"] = conversation_id
+        snapshot_key = "m.created_at"
+        if snapshot is None:
+            snapshot = db.execute(text("SELECT coalesce(max(created_at), now()) FROM messages")).scalar().isoformat()
+        params["snapshot"] = snapshot
+        score = "-ts_rank_cd(m.search_vector, to_tsquery('portuguese', :query))"
+        snippet = (
+            "ts_headline('portuguese', m.content, to_tsquery('portuguese', :query), "
+            "'StartSel=<mark>, StopSel=</mark>, MaxWords=24, MinWords=8')"
+        )
+        tiebreak = "m.id"
+    else:
+        raise ValueError(f"Busca não suportada no dialeto {dialect}")
+
+    filters.append(f"{snapshot_key} <= :snapshot")
+    if emotional_state is not None:
+        filters.append("m.emotional_state = :emotional_state")
+        params["emotional_state"] = emotional_state
+
+    rows = db.execute(text(f"""
+        SELECT m.id, m.conversation_id, m.role, m.emotional_state, m.created_at,
+               {score} AS score, {snippet} AS snippet
+        FROM {source}
+        WHERE {' AND '.join(filters)}
+        ORDER BY score, {tiebreak}
+        LIMIT :limit OFFSET :offset
+    """), params).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(snapshot, offset + limit)
+
+    return {
+        "results": [
+            {
+                "message_id": row["id"],
+                "conversation_id": row["conversation_id"],
+                "role": row["role"],
+                "emotional_state": row["emotional_state"],
+                "created_at": row["created_at"],
+                "score": row["score"],
+                "snippet": row["snippet"]
+            }
+            for row in rows
+        ],
+        "next_cursor": next_cursor
+    }
@@ -1,12 +1,14 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import json
 from datetime import datetime
-from backend.emotion_analyzer import emotion_analyzer
-from backend.emotional_safety import safety_guard, SafetyLevel
-from backend.dynamic_prompt import prompt_builder
-from backend.stripe_service import create_checkout_session, handle_webhook
+from backend.config import settings
+from backend.storage import ConversationArchivedError, MemoryConversationStore, create_store
+from backend.snapshot import StorePersistence
+from backend.batching import MicroBatcher
+from backend.chat_service import ChatService, analyze_batch
+from backend.emotion_analyzer import create_emotion_backend
+from backend.lexicon import LexiconReloader, registry as lexicon_registry
+from backend.stripe_service import create_checkout_session, get_payment_status, handle_webhook
 
 app = FastAPI(
     title="Empathic AI Coach",
@@ -23,9 +25,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage (para demo)
-conversations = {}
-messages_store = {}
+# Storage: em memória por padrão (limitado por LRU/TTL); com SIMPLE_STORE_URL
+# apontando para um SQLite/Postgres, o estado é compartilhado entre workers
+store = create_store(settings.simple_store_url)
+
+# Snapshots + log append-only do store em memória (warm restart)
+persistence = None
+if settings.memory_snapshot_dir and isinstance(store, MemoryConversationStore):
+    persistence = StorePersistence(
+        store.store,
+        settings.memory_snapshot_dir,
+        interval_seconds=settings.memory_snapshot_interval_seconds
+    )
+
+# Léxicos externos recarregados sem reiniciar
+lexicon_reloader = LexiconReloader(
+    interval_seconds=settings.lexicon_reload_interval_seconds
+) if settings.lexicon_file or settings.lexicon_dir else None
+
+@app.on_event("startup")
+async def load_persisted_state():
+    """Restaura o último snapshot e inicia os snapshots periódicos"""
+    if persistence:
+        persistence.load()
+        persistence.start()
+    if lexicon_reloader:
+        lexicon_reloader.start()
+    # Termos de crise de todos os idiomas, antes da primeira mensagem
+    lexicon_registry.crisis
+
+@app.on_event("shutdown")
+async def save_persisted_state():
+    """Snapshot final no encerramento"""
+    if persistence:
+        persistence.stop()
+    if lexicon_reloader:
+        lexicon_reloader.stop()
+    emotion_backend.close()
+    if analysis_batcher:
+        analysis_batcher.close()
 
 @app.get("/health")
 async def health_check():
@@ -37,90 +75,35 @@ async def send_message(request: dict):
     """Enviar mensagem e obter resposta empática"""
     
     try:
-        content = request.get("content", "")
-        conversation_id = request.get("conversation_id")
-        
-        # Análise de segurança
-        safety_analysis = safety_guard.analyze(content)
-        
-        if safety_analysis.level == SafetyLevel.CRITICAL:
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "safety_alert": True,
-                    "message": safety_analysis.redirect_message,
-                    "level": safety_analysis.level.value
-                }
-            )
-        
-        # Análise emocional
-        emotion_analysis = emotion_analyzer.analyze(content)
-        
-        # Criar ou buscar conversa
-        if not conversation_id:
-            conversation_id = f"conv-{datetime.utcnow().timestamp()}"
-            conversations[conversation_id] = {
-                "id": conversation_id,
-                "title": f"Conversation - {emotion_analysis.emotional_state.value}",
-                "primary_emotion": emotion_analysis.emotional_state.value,
-                "message_count": 0,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            messages_store[conversation_id] = []
-        
-        # Gerar resposta empática (versão simplificada)
-        ai_response = generate_empathic_response(emotion_analysis, content)
-        
-        # Salvar mensagens
-        user_msg_id = f"msg-{datetime.utcnow().timestamp()}"
-        assistant_msg_id = f"msg-{datetime.utcnow().timestamp() + 0.001}"
-        
-        messages_store[conversation_id].append({
-            "id": user_msg_id,
-            "role": "user",
-            "content": content,
-            "emotional_state": emotion_analysis.emotional_state.value,
-            "created_at": datetime.utcnow().isoformat()
-        })
-        
-        messages_store[conversation_id].append({
-            "id": assistant_msg_id,
-            "role": "assistant",
-            "content": ai_response,
-            "created_at": datetime.utcnow().isoformat()
-        })
-        
-        conversations[conversation_id]["message_count"] += 2
-        
-        return {
-            "conversation_id": conversation_id,
-            "user_message": {
-                "id": user_msg_id,
-                "role": "user",
-                "content": content,
-                "emotional_state": emotion_analysis.emotional_state.value,
-                "emotion_intensity": emotion_analysis.intensity,
-                "created_at": datetime.utcnow().isoformat()
-            },
-            "assistant_message": {
-                "id": assistant_msg_id,
-                "role": "assistant",
-                "content": ai_response,
-                "created_at": datetime.utcnow().isoformat()
-            },
-            "emotion_analysis": {
-                "state": emotion_analysis.emotional_state.value,
-                "sentiment": emotion_analysis.sentiment.value,
-                "confidence": emotion_analysis.confidence,
-                "intensity": emotion_analysis.intensity,
-                "keywords": emotion_analysis.keywords
-            }
-        }
+        return await chat_service.send_message(
+            request.get("content", ""), request.get("conversation_id"), request.get("language")
+        )
     
+    except ConversationArchivedError:
+        raise HTTPException(status_code=410, detail="Conversa arquivada; restaure-a para continuar")
     except Exception as e:
         print(f"Erro: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def empathic_responder(user_message: str, emotion_analysis, conversation_history: list[dict]) -> str:
+    """Adaptador do gerador de respostas simplificado para o ChatService"""
+    return generate_empathic_response(emotion_analysis, user_message)
+
+# Pipeline de mensagens compartilhado com o app completo
+emotion_backend = create_emotion_backend(settings.emotion_backend)
+analysis_batcher = MicroBatcher(
+    analyze_batch,
+    max_batch=settings.analysis_batch_max_size,
+    max_wait_ms=settings.analysis_batch_max_wait_ms,
+    timeout_ms=settings.analysis_batch_timeout_ms,
+    workers=settings.analysis_batch_workers,
+    name="analysis"
+) if settings.analysis_batching else None
+chat_service = ChatService(
+    store, responder=empathic_responder, enable_audit_logs=settings.enable_audit_logs,
+    emotion_backend=emotion_backend, analysis_batcher=analysis_batcher
+)
+
 def generate_empathic_response(emotion_analysis, user_input: str) -> str:
     """Gera resposta empática baseada na emoção"""
     
@@ -182,30 +165,33 @@ def generate_empathic_response(emotion_analysis, user_input: str) -> str:
 @app.get("/api/v1/conversations")
 async def list_conversations():
     """Listar conversas"""
-    return list(conversations.values())
+    return store.list_conversations()
 
 @app.get("/api/v1/conversations/{conversation_id}")
 async def get_conversation(conversation_id: str):
     """Obter conversa com histórico"""
-    if conversation_id not in conversations:
+    conv = store.get_conversation(conversation_id)
+    if conv is None:
         raise HTTPException(status_code=404, detail="Conversa não encontrada")
     
-    conv = conversations[conversation_id]
-    conv["messages"] = messages_store.get(conversation_id, [])
     return conv
 
 @app.delete("/api/v1/conversations/{conversation_id}")
 async def delete_conversation(conversation_id: str):
     """Deletar conversa"""
-    if conversation_id not in conversations:
+    if not store.delete_conversation(conversation_id):
         raise HTTPException(status_code=404, detail="Conversa não encontrada")
     
-    del conversations[conversation_id]
-    if conversation_id in messages_store:
-        del messages_store[conversation_id]
-    
     return {"status": "deleted"}
 
+@app.get("/api/v1/store/stats")
+async def store_stats():
+    """Estatísticas do armazenamento (uso de memória no backend em memória)"""
+    stats = store.stats()
+    if persistence:
+        stats["persistence"] = persistence.stats()
+    return stats
+
 # ========== ROTAS STRIPE ==========
 
 @app.post("/api/v1/checkout")
@@ -246,18 +232,7 @@ async def payment_status(session_id: str):
     Exemplo de uso:
     GET /api/v1/payment-status?session_id=cs_test_123
     """
-    import stripe
-    
-    try:
-        session = stripe.checkout.Session.retrieve(session_id)
-        return {
-            "status": session.payment_status,
-            "customer": session.customer,
-            "subscription": session.subscription,
-            "metadata": session.metadata,
-        }
-    except Exception as e:
-        return {"error": str(e)}
+    return await get_payment_status(session_id)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,233 @@
+import logging
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import Optional
+
+from backend.memory_store import InMemoryConversationStore
+
+logger = logging.getLogger(__name__)
+
+# Snapshots + log append-only do armazenamento em memória
+#
+# Arquivos no diretório de persistência:
+#   snapshot-<N>.bin  estado completo (lotes de pickle comprimidos) no início do segmento N
+#   log-<N>.bin       mutações ocorridas a partir do início do segmento N
+#
+# O snapshot é "fuzzy": o log é rotacionado (segmento N) e as conversas são
+# copiadas em lotes pequenos numa thread de fundo, soltando o lock entre os
+# lotes, então as requisições nunca ficam paradas esperando o snapshot. Na
+# carga, o snapshot N é restaurado e os logs >= N são reaplicados; o replay é
+# idempotente (cada mensagem no log traz sua posição na conversa), então
+# mutações capturadas pelos dois lados não são duplicadas. O último acesso de
+# cada conversa vai no snapshot: TTL e ordem LRU continuam valendo após a carga.
+
+SNAPSHOT_FORMAT = 1
+_FRAME_HEADER = struct.Struct("<I")
+_FILE_PATTERN = re.compile(r"^(snapshot|log)-(\d+)\.bin$")
+
+class StorePersistence:
+    """Persistência periódica e carga rápida de um InMemoryConversationStore"""
+
+    def __init__(self, store: InMemoryConversationStore, directory: str,
+                 interval_seconds: float = 300, batch_size: int = 500):
+        self.store = store
+        self.directory = directory
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+
+        self._segment = 0
+        self._log_file = None
+        self._log_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.last_snapshot_seconds: Optional[float] = None
+        self.last_snapshot_conversations = 0
+
+    # Arquivos
+
+    def _path(self, kind: str, segment: int) -> str:
+        return os.path.join(self.directory, f"{kind}-{segment}.bin")
+
+    def _segments(self, kind: str) -> list[int]:
+        segments = []
+        for name in os.listdir(self.directory):
+            match = _FILE_PATTERN.match(name)
+            if match and match.group(1) == kind:
+                segments.append(int(match.group(2)))
+        return sorted(segments)
+
+    # Log append-only
+
+    def _open_log(self, segment: int) -> None:
+        with self._log_lock:
+            if self._log_file is not None:
+                self._log_file.close()
+            self._segment = segment
+            self._log_file = open(self._path("log", segment), "ab", buffering=0)
+
+    def _append(self, entry: tuple) -> None:
+        """Journal do store: chamado sob o lock do store, em ordem"""
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._log_lock:
+            if self._log_file is not None:
+                self._log_file.write(_FRAME_HEADER.pack(len(data)) + data)
+
+    def _replay_log(self, segment: int) -> int:
+        applied = 0
+        with open(self._path("log", segment), "rb") as log_file:
+            data = log_file.read()
+
+        offset = 0
+        while offset + _FRAME_HEADER.size <= len(data):
+            (length,) = _FRAME_HEADER.unpack_from(data, offset)
+            start = offset + _FRAME_HEADER.size
+            if start + length > len(data):
+                # Última entrada truncada (queda no meio da escrita): descartada
+                break
+            self.store.apply(pickle.loads(data[start:start + length]))
+            applied += 1
+            offset = start + length
+        return applied
+
+    # Carga na inicialização
+
+    def load(self) -> None:
+        """Restaura o último snapshot, reaplica os logs e passa a registrar mutações"""
+        os.makedirs(self.directory, exist_ok=True)
+        started = time.perf_counter()
+
+        snapshots = self._segments("snapshot")
+        base = 0
+        restored = 0
+        for segment in reversed(snapshots):
+            try:
+                restored = self._read_snapshot(segment)
+                base = segment
+                break
+            except Exception as e:
+                logger.warning(f"Snapshot {segment} ignorado: {e}")
+
+        replayed = 0
+        logs = [segment for segment in self._segments("log") if segment >= base]
+        for segment in logs:
+            replayed += self._replay_log(segment)
+        self.store.restore_access_order()
+        self.store.enforce_limits()
+
+        # Novo segmento a cada processo, para nunca reabrir um log possivelmente truncado
+        next_segment = max([base, *logs, *snapshots], default=0) + 1
+        self._open_log(next_segment)
+        self.store.journal = self._append
+
+        logger.info(
+            f"Store restaurado: {restored} conversas do snapshot, {replayed} entradas de log "
+            f"em {time.perf_counter() - started:.3f}s"
+        )
+
+    @staticmethod
+    def _write_frame(output, value) -> None:
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        output.write(_FRAME_HEADER.pack(len(data)) + data)
+
+    def _read_snapshot(self, segment: int) -> int:
+        with open(self._path("snapshot", segment), "rb") as snapshot_file:
+            frames = []
+            while True:
+                header = snapshot_file.read(_FRAME_HEADER.size)
+                if not header:
+                    break
+                (length,) = _FRAME_HEADER.unpack(header)
+                frames.append(pickle.loads(zlib.decompress(snapshot_file.read(length))))
+
+        if not frames or frames[0].get("format") != SNAPSHOT_FORMAT:
+            raise ValueError("formato de snapshot não suportado")
+
+        restored = 0
+        for batch in frames[1:]:
+            for conversation in batch:
+                self.store.load_conversation(conversation)
+            restored += len(batch)
+        return restored
+
+    # Snapshot
+
+    def snapshot(self) -> None:
+        """Grava um snapshot sem bloquear as requisições (copia em lotes)"""
+        if not self._snapshot_lock.acquire(blocking=False):
+            return  # Já existe um snapshot em andamento
+
+        try:
+            started = time.perf_counter()
+
+            # Rotacionar o log e capturar os IDs atomicamente em relação às mutações
+            with self.store.lock:
+                segment = self._segment + 1
+                self._open_log(segment)
+                conversation_ids = self.store.conversation_ids()
+
+            # Cada lote é copiado, serializado e comprimido separadamente: nenhuma
+            # etapa segura o lock do store (ou o GIL) por mais que um lote
+            temporary = self._path("snapshot", segment) + ".tmp"
+            written = 0
+            with open(temporary, "wb") as snapshot_file:
+                self._write_frame(snapshot_file, {"format": SNAPSHOT_FORMAT, "created_at": time.time()})
+                for start in range(0, len(conversation_ids), self.batch_size):
+                    batch = self.store.dump_conversations(conversation_ids[start:start + self.batch_size])
+                    self._write_frame(snapshot_file, batch)
+                    written += len(batch)
+                    time.sleep(0)  # Cede o GIL para as requisições entre os lotes
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.replace(temporary, self._path("snapshot", segment))
+
+            # Snapshots e logs anteriores ao novo segmento não são mais necessários
+            for kind in ("snapshot", "log"):
+                for old in self._segments(kind):
+                    if old < segment:
+                        os.remove(self._path(kind, old))
+
+            self.last_snapshot_seconds = time.perf_counter() - started
+            self.last_snapshot_conversations = written
+        except Exception as e:
+            logger.error(f"Erro ao gravar snapshot: {e}")
+        finally:
+            self._snapshot_lock.release()
+
+    # Thread de fundo
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.snapshot()
+
+    def start(self) -> None:
+        """Inicia os snapshots periódicos em uma thread daemon"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="store-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Para a thread e grava um snapshot final (encerramento limpo)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.snapshot()
+        self.store.journal = None
+        with self._log_lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+    def stats(self) -> dict:
+        return {
+            "segment": self._segment,
+            "last_snapshot_seconds": self.last_snapshot_seconds,
+            "last_snapshot_conversations": self.last_snapshot_conversations
+        }
@@ -0,0 +1,249 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.analytics import CRISIS_EVENT_TYPE, RollupBuffer
+from backend.database import create_db_engine
+from backend.ids import new_id
+from backend.models import ArchivedConversation, AuditLog, Conversation, Message, User
+from backend.purge import delete_conversations
+from backend.storage import AggregateUpdate, ConversationData, MessageData
+
+# Implementação SQL do ConversationStore (SQLite e Postgres)
+#
+# Os ajustes específicos de cada banco ficam em database.create_db_engine;
+# aqui só há SQL portátil (projeções de colunas e UPDATEs sem carregar ORM).
+
+AGGREGATE_COLUMNS = (
+    Conversation.average_intensity,
+    Conversation.emotion_counts,
+    Conversation.sentiment_score,
+    Conversation.sentiment_trajectory,
+)
+
+class _SQLTransaction:
+    """Transação sobre uma Session, com um único commit no final
+
+    IDs e timestamps são gerados no Python, então as escritas não precisam de
+    flush imediato. Com eager_flush (Postgres) a mensagem do usuário vai para o
+    banco enquanto a resposta é gerada; no SQLite o flush fica para o commit,
+    para não segurar o lock de escrita do arquivo durante a chamada ao LLM.
+    """
+
+    def __init__(self, db: Session, eager_flush: bool = True):
+        self.db = db
+        self.eager_flush = eager_flush
+        self.rollups = RollupBuffer()
+
+    def _flush(self) -> None:
+        if self.eager_flush:
+            self.db.flush()
+
+    def get_conversation(self, conversation_id: str) -> Optional[ConversationData]:
+        row = self.db.query(
+            Conversation.id,
+            Conversation.user_id,
+            User.language,
+            Conversation.title,
+            Conversation.primary_emotion,
+            Conversation.sentiment,
+            Conversation.message_count,
+            Conversation.created_at,
+            Conversation.updated_at,
+            *AGGREGATE_COLUMNS
+        ).outerjoin(
+            User, User.id == Conversation.user_id
+        ).filter(
+            Conversation.id == conversation_id
+        ).first()
+        return ConversationData(**row._asdict()) if row else None
+
+    def is_archived(self, conversation_id: str) -> bool:
+        return self.db.query(ArchivedConversation.id).filter(
+            ArchivedConversation.id == conversation_id
+        ).first() is not None
+
+    def recent_messages(self, conversation_id: str, limit: int) -> list[dict]:
+        if limit <= 0:
+            return []
+        rows = self.db.query(Message.role, Message.content).filter(
+            Message.conversation_id == conversation_id
+        ).order_by(Message.created_at.desc(), Message.id.desc()).limit(limit).all()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def create_conversation(self, title: str, primary_emotion: str, sentiment: str) -> ConversationData:
+        now = datetime.utcnow()
+        conversation = Conversation(
+            id=new_id(),
+            title=title,
+            primary_emotion=primary_emotion,
+            sentiment=sentiment,
+            message_count=0,
+            created_at=now,
+            updated_at=now
+        )
+        self.db.add(conversation)
+        self._flush()
+        return ConversationData(
+            id=conversation.id,
+            title=title,
+            primary_emotion=primary_emotion,
+            sentiment=sentiment,
+            message_count=0,
+            created_at=now,
+            updated_at=now
+        )
+
+    def add_message(self, message: MessageData) -> MessageData:
+        message.id = message.id or new_id()
+        message.created_at = message.created_at or datetime.utcnow()
+        row = Message(
+            id=message.id,
+            created_at=message.created_at,
+            conversation_id=message.conversation_id,
+            content=message.content,
+            role=message.role,
+            emotional_state=message.emotional_state,
+            sentiment=message.sentiment,
+            emotion_confidence=message.emotion_confidence,
+            emotion_intensity=message.emotion_intensity,
+            emotion_keywords=message.emotion_keywords,
+            safety_level=message.safety_level,
+            lexicon_version=message.lexicon_version
+        )
+        self.db.add(row)
+        self._flush()
+        if message.role == "user":
+            self.rollups.add_message(
+                message.created_at, message.emotional_state, message.sentiment,
+                message.emotion_intensity, message.safety_level
+            )
+        return message
+
+    def touch_conversation(self, conversation: ConversationData, added_messages: int,
+                           aggregate_update: Optional[AggregateUpdate] = None) -> None:
+        # Inserções pendentes primeiro: a conversa pode ter sido criada nesta
+        # transação, e no SQLite o INSERT já toma o lock de escrita do arquivo
+        self.db.flush()
+        if aggregate_update is not None:
+            # Agregados relidos sob lock (FOR UPDATE no Postgres; no SQLite o lock
+            # de escrita acima): mensagens simultâneas na mesma conversa não se perdem
+            current = self.db.query(
+                Conversation.primary_emotion,
+                Conversation.sentiment,
+                *AGGREGATE_COLUMNS
+            ).filter(
+                Conversation.id == conversation.id
+            ).with_for_update().one()
+            for name, value in current._asdict().items():
+                setattr(conversation, name, value)
+            aggregate_update(conversation)
+
+        now = datetime.utcnow()
+        self.db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation.id)
+            .values(
+                message_count=Conversation.message_count + added_messages,
+                updated_at=now,
+                primary_emotion=conversation.primary_emotion,
+                sentiment=conversation.sentiment,
+                average_intensity=conversation.average_intensity,
+                emotion_counts=conversation.emotion_counts,
+                sentiment_score=conversation.sentiment_score,
+                sentiment_trajectory=conversation.sentiment_trajectory
+            )
+        )
+        conversation.message_count += added_messages
+        conversation.updated_at = now
+
+    def add_audit_log(self, event_type: str, event_data: dict, safety_level: Optional[str]) -> None:
+        now = datetime.utcnow()
+        self.db.add(AuditLog(event_type=event_type, event_data=event_data, safety_level=safety_level, created_at=now))
+        if event_type == CRISIS_EVENT_TYPE:
+            self.rollups.add_safety_event(now.date(), safety_level)
+
+    def commit(self) -> None:
+        # Rollups por último: as linhas agregadas ficam travadas só até o commit
+        self.rollups.flush(self.db)
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
+
+class SQLConversationStore:
+    """ConversationStore sobre SQLAlchemy"""
+
+    blocking = True
+
+    def __init__(self, session_factory: sessionmaker):
+        self.session_factory = session_factory
+
+    @classmethod
+    def from_url(cls, database_url: str) -> "SQLConversationStore":
+        engine = create_db_engine(database_url)
+        return cls(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+
+    def begin(self) -> _SQLTransaction:
+        db = self.session_factory()
+        return _SQLTransaction(db, eager_flush=db.get_bind().dialect.name != "sqlite")
+
+    def list_conversations(self, limit: int = 100) -> list[dict]:
+        with self.session_factory() as db:
+            rows = db.query(
+                Conversation.id,
+                Conversation.title,
+                Conversation.primary_emotion,
+                Conversation.sentiment,
+                Conversation.average_intensity,
+                Conversation.message_count,
+                Conversation.created_at,
+                Conversation.updated_at
+            ).order_by(
+                Conversation.updated_at.desc(), Conversation.id.desc()
+            ).limit(limit).all()
+            return [row._asdict() for row in rows]
+
+    def get_conversation(self, conversation_id: str) -> Optional[dict]:
+        with self.session_factory() as db:
+            conversation = db.query(
+                Conversation.id,
+                Conversation.title,
+                Conversation.primary_emotion,
+                Conversation.sentiment,
+                Conversation.message_count,
+                Conversation.created_at,
+                *AGGREGATE_COLUMNS
+            ).filter(
+                Conversation.id == conversation_id
+            ).first()
+            if not conversation:
+                return None
+
+            messages = db.query(
+                Message.id,
+                Message.role,
+                Message.content,
+                Message.emotional_state,
+                Message.created_at
+            ).filter(
+                Message.conversation_id == conversation_id
+            ).order_by(Message.created_at, Message.id).all()
+
+            data = conversation._asdict()
+            data["messages"] = [message._asdict() for message in messages]
+            return data
+
+    def delete_conversation(self, conversation_id: str) -> bool:
+        with self.session_factory() as db:
+            return delete_conversations(db, [conversation_id]) > 0
+
+    def stats(self) -> dict:
+        with self.session_factory() as db:
+            return {
+                "backend": db.get_bind().dialect.name,
+                "conversations": db.query(func.count(Conversation.id)).scalar(),
+                "messages": db.query(func.count(Message.id)).scalar()
+            }
@@ -0,0 +1,85 @@
+# Perfil do tempo de import dos pontos de entrada (cold start em serverless)
+#
+# Importa o módulo em um processo novo com "python -X importtime", mostra os
+# módulos mais caros e termina com código 1 se o import passar do limite ou se
+# algum módulo carregado sob demanda (SDKs de Stripe, OpenAI e Anthropic, e o
+# NumPy do classificador de emoções) entrar no import.
+# Feito para rodar no CI, antes do deploy:
+#
+#   python -m backend.startup_profile api.index --max-seconds 1.5
+#   python -m backend.startup_profile backend.main --max-seconds 1.5 --top 20
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Optional
+
+# Só podem ser importados na primeira requisição que os usa
+LAZY_MODULES = ("stripe", "openai", "anthropic", "numpy")
+
+def profile_import(module: str, runs: int = 3) -> dict:
+    """Mediana de várias execuções: tempo total, módulos mais caros e SDKs carregados"""
+    probe = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))"
+    )
+    results = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", probe],
+            capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"Falha ao importar {module}:\n{completed.stderr[-2000:]}")
+
+        # Linhas "import time: <self us> | <cumulativo us> | <módulo>"
+        cumulative = {}
+        for line in completed.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, total, name = line[len("import time:"):].split("|")
+            if total.strip().isdigit():
+                cumulative[name.strip()] = int(total)
+        results.append({
+            "seconds": cumulative.get(module, 0) / 1_000_000,
+            "modules": cumulative,
+            "lazy_loaded": json.loads(completed.stdout.strip().splitlines()[-1])
+        })
+
+    results.sort(key=lambda result: result["seconds"])
+    return results[len(results) // 2]
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tempo de import de um ponto de entrada")
+    parser.add_argument("module", nargs="?", default="api.index")
+    parser.add_argument("--max-seconds", type=float, help="Falhar acima deste tempo de import")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Módulos de topo mais caros")
+    args = parser.parse_args(argv)
+
+    result = profile_import(args.module, args.runs)
+
+    # Só dependências diretas (sem ponto) e módulos do projeto: um resumo legível
+    top = sorted(
+        (
+            (seconds, name) for name, seconds in result["modules"].items()
+            if "." not in name or name.startswith(("backend.", "api."))
+        ),
+        reverse=True
+    )[:args.top]
+    print(f"{args.module}: {result['seconds']:.3f}s (mediana de {args.runs})")
+    for micros, name in top:
+        print(f"  {micros / 1000:9.1f} ms  {name}")
+
+    failed = False
+    if result["lazy_loaded"]:
+        print(f"ERRO: módulos sob demanda carregados no import: {', '.join(result['lazy_loaded'])}", file=sys.stderr)
+        failed = True
+    if args.max_seconds is not None and result["seconds"] > args.max_seconds:
+        print(f"ERRO: import acima do limite de {args.max_seconds:.3f}s", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional, Protocol
+
+from backend.config import settings
+from backend.ids import new_id
+from backend.memory_store import InMemoryConversationStore, MessageRecord
+
+# Interface de armazenamento compartilhada por main.py e simple_main.py
+#
+# O pipeline de mensagens (backend/chat_service.py) só conversa com um
+# ConversationStore; as implementações são:
+#   - MemoryConversationStore: dicionários em memória (InMemoryConversationStore)
+#   - SQLConversationStore (backend/sql_store.py): SQLite ou Postgres via SQLAlchemy
+
+@dataclass
+class ConversationData:
+    """Dados de uma conversa, independentes do backend"""
+    id: str
+    user_id: Optional[str] = None
+    language: Optional[str] = None  # User.language (None: detectado no texto)
+    title: Optional[str] = None
+    primary_emotion: Optional[str] = None
+    sentiment: Optional[str] = None
+    message_count: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    # Agregados emocionais (backend/aggregates.py)
+    average_intensity: Optional[float] = None
+    emotion_counts: Optional[dict] = None
+    sentiment_score: Optional[float] = None
+    sentiment_trajectory: Optional[list] = None
+
+@dataclass
+class MessageData:
+    """Dados de uma mensagem, independentes do backend"""
+    conversation_id: str
+    role: str
+    content: str
+    emotional_state: Optional[str] = None
+    sentiment: Optional[str] = None
+    emotion_confidence: Optional[float] = None
+    emotion_intensity: Optional[float] = None
+    emotion_keywords: Optional[list] = None
+    safety_level: Optional[str] = None
+    lexicon_version: Optional[str] = None
+    id: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class ConversationArchivedError(LookupError):
+    """A conversa foi movida para o arquivo frio (backend/retention.py) e precisa ser restaurada"""
+
+# Atualização dos agregados de uma conversa (ex.: aggregates.record_emotion),
+# aplicada no commit sobre os valores atuais, relidos sob lock
+AggregateUpdate = Callable[[ConversationData], None]
+
+class StoreTransaction(Protocol):
+    """Unidade de trabalho de uma requisição: nada é visível antes do commit"""
+
+    def get_conversation(self, conversation_id: str) -> Optional[ConversationData]: ...
+
+    def is_archived(self, conversation_id: str) -> bool: ...
+
+    def recent_messages(self, conversation_id: str, limit: int) -> list[dict]: ...
+
+    def create_conversation(self, title: str, primary_emotion: str, sentiment: str) -> ConversationData: ...
+
+    def add_message(self, message: MessageData) -> MessageData: ...
+
+    def touch_conversation(self, conversation: ConversationData, added_messages: int,
+                           aggregate_update: Optional[AggregateUpdate] = None) -> None: ...
+
+    def add_audit_log(self, event_type: str, event_data: dict, safety_level: Optional[str]) -> None: ...
+
+    def commit(self) -> None: ...
+
+    def close(self) -> None: ...
+
+class ConversationStore(Protocol):
+    """Backend de armazenamento de conversas"""
+
+    # True quando as operações fazem I/O e devem rodar fora do event loop
+    blocking: bool
+
+    def begin(self) -> StoreTransaction: ...
+
+    def list_conversations(self, limit: int = 100) -> list[dict]: ...
+
+    def get_conversation(self, conversation_id: str) -> Optional[dict]: ...
+
+    def delete_conversation(self, conversation_id: str) -> bool: ...
+
+    def stats(self) -> dict: ...
+
+# Implementação em memória
+
+class _MemoryTransaction:
+    """Acumula as escritas e as aplica no store apenas no commit"""
+
+    def __init__(self, store: InMemoryConversationStore):
+        self._store = store
+        self._new_conversations: list[ConversationData] = []
+        self._messages: list[MessageData] = []
+        self._touched: list[tuple[ConversationData, Optional[AggregateUpdate]]] = []
+
+    def get_conversation(self, conversation_id: str) -> Optional[ConversationData]:
+        record = self._store.get(conversation_id)
+        if record is None:
+            return None
+        return ConversationData(
+            id=record.id,
+            title=record.title,
+            primary_emotion=record.primary_emotion,
+            sentiment=record.sentiment,
+            message_count=record.message_count,
+            created_at=datetime.utcfromtimestamp(record.created_at),
+            **record.aggregates()
+        )
+
+    def is_archived(self, conversation_id: str) -> bool:
+        # O store em memória não tem arquivo frio
+        return False
+
+    def recent_messages(self, conversation_id: str, limit: int) -> list[dict]:
+        record = self._store.get(conversation_id)
+        if record is None or limit <= 0:
+            return []
+        return [{"role": message.role, "content": message.content} for message in record.messages[-limit:]]
+
+    def create_conversation(self, title: str, primary_emotion: str, sentiment: str) -> ConversationData:
+        conversation = ConversationData(
+            id=new_id("conv-"),
+            title=title,
+            primary_emotion=primary_emotion,
+            sentiment=sentiment,
+            created_at=datetime.utcnow()
+        )
+        self._new_conversations.append(conversation)
+        return conversation
+
+    def add_message(self, message: MessageData) -> MessageData:
+        message.id = message.id or new_id("msg-")
+        message.created_at = message.created_at or datetime.utcnow()
+        self._messages.append(message)
+        return message
+
+    def touch_conversation(self, conversation: ConversationData, added_messages: int,
+                           aggregate_update: Optional[AggregateUpdate] = None) -> None:
+        # message_count é mantido pelo próprio store; aqui só os agregados emocionais
+        self._touched.append((conversation, aggregate_update))
+
+    def add_audit_log(self, event_type: str, event_data: dict, safety_level: Optional[str]) -> None:
+        # O app em memória não mantém trilha de auditoria
+        pass
+
+    def commit(self) -> None:
+        for conversation in self._new_conversations:
+            self._store.create_conversation(conversation.id, conversation.title, conversation.primary_emotion)
+
+        for message in self._messages:
+            record = MessageRecord(
+                id=message.id,
+                role=message.role,
+                content=message.content,
+                emotional_state=message.emotional_state,
+                created_at=message.created_at.replace(tzinfo=timezone.utc).timestamp()
+            )
+            try:
+                self._store.append_messages(message.conversation_id, record)
+            except KeyError:
+                # Conversa despejada (LRU/TTL) durante a requisição: recriar
+                emotion = message.emotional_state or "calm"
+                self._store.create_conversation(message.conversation_id, f"Conversation - {emotion}", emotion)
+                self._store.append_messages(message.conversation_id, record)
+
+        for conversation, aggregate_update in self._touched:
+            with self._store.lock:
+                # Agregados atuais (outra requisição pode ter gravado desde o início desta)
+                record = self._store.get(conversation.id)
+                if record is None:
+                    continue
+                if aggregate_update is not None:
+                    conversation.primary_emotion = record.primary_emotion
+                    conversation.sentiment = record.sentiment
+                    for name, value in record.aggregates().items():
+                        setattr(conversation, name, value)
+                    aggregate_update(conversation)
+                self._store.update_aggregates(
+                    conversation.id,
+                    primary_emotion=conversation.primary_emotion,
+                    sentiment=conversation.sentiment,
+                    average_intensity=conversation.average_intensity,
+                    emotion_counts=conversation.emotion_counts,
+                    sentiment_score=conversation.sentiment_score,
+                    sentiment_trajectory=conversation.sentiment_trajectory
+                )
+
+        self.close()
+
+    def close(self) -> None:
+        self._new_conversations = []
+        self._messages = []
+        self._touched = []
+
+class MemoryConversationStore:
+    """ConversationStore sobre o InMemoryConversationStore limitado"""
+
+    blocking = False
+
+    def __init__(self, store: Optional[InMemoryConversationStore] = None):
+        # "is not None": um store vazio é falso (__len__) e seria trocado por outro
+        self.store = store if store is not None else InMemoryConversationStore(
+            max_conversations=settings.memory_store_max_conversations,
+            max_messages=settings.memory_store_max_messages,
+            ttl_seconds=settings.memory_store_ttl_seconds,
+            max_bytes=settings.memory_store_max_bytes
+        )
+
+    def begin(self) -> _MemoryTransaction:
+        return _MemoryTransaction(self.store)
+
+    def list_conversations(self, limit: int = 100) -> list[dict]:
+        return self.store.list_conversations()[:limit]
+
+    def get_conversation(self, conversation_id: str) -> Optional[dict]:
+        return self.store.conversation_dict(conversation_id)
+
+    def delete_conversation(self, conversation_id: str) -> bool:
+        return self.store.delete(conversation_id)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self.store.memory_usage()}
+
+def create_store(url: str) -> ConversationStore:
+    """Cria o backend a partir de uma URL: "memory", "sqlite:///..." ou "postgresql://..." """
+    if url == "memory":
+        return MemoryConversationStore()
+
+    # Importação tardia: o app em memória não precisa carregar o SQLAlchemy
+    from backend.sql_store import SQLConversationStore
+    return SQLConversationStore.from_url(url)
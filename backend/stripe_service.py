@@ -1,9 +1,13 @@
-import stripe
 import os
 from fastapi import HTTPException
 
-# Configurar chave secreta do Stripe
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+def _stripe():
+    """SDK do Stripe importado no primeiro uso (fora do cold start do app)"""
+    import stripe
+    
+    # Configurar chave secreta do Stripe
+    stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+    return stripe
 
 # Seus produtos/preços
 PRODUCTS = {
@@ -41,6 +45,7 @@ async def create_checkout_session(plan: str, user_id: str, user_email: str):
         raise HTTPException(status_code=400, detail="Plano inválido")
     
     product = PRODUCTS[plan]
+    stripe = _stripe()
     
     try:
         # Criar sessão de checkout
@@ -80,6 +85,7 @@ async def handle_webhook(payload: bytes, sig_header: str):
     """Processar webhook do Stripe"""
     
     webhook_secret = os.getenv("STRIPE_WEBHOOK_SECRET")
+    stripe = _stripe()
     
     try:
         event = stripe.Webhook.construct_event(
@@ -121,6 +127,23 @@ async def handle_webhook(payload: bytes, sig_header: str):
     return {"status": "success"}
 
 
+async def get_payment_status(session_id: str):
+    """Status de uma sessão de checkout"""
+    
+    stripe = _stripe()
+    
+    try:
+        session = stripe.checkout.Session.retrieve(session_id)
+        return {
+            "status": session.payment_status,
+            "customer": session.customer,
+            "subscription": session.subscription,
+            "metadata": session.metadata,
+        }
+    except stripe.error.StripeError as e:
+        return {"error": str(e)}
+
+
 async def activate_subscription(user_id: str, plan: str, session_id: str):
     """Ativar assinatura no banco de dados"""
     # TODO: Implementar lógica para salvar no banco
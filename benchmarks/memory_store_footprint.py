@@ -0,0 +1,85 @@
+# Memória do InMemoryConversationStore contra os dicionários do simple_main antigo
+#
+# Preenche os dois com as mesmas conversas (uma mensagem do usuário e uma
+# resposta por conversa) e mede com tracemalloc a memória retida por eles.
+#
+#   python -m benchmarks.memory_store_footprint --conversations 100000
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from backend.ids import new_id
+from backend.memory_store import InMemoryConversationStore, MessageRecord
+
+EMOTIONS = ("sad", "anxious", "happy", "calm", "angry")
+
+def sample(index: int) -> tuple[str, str, str]:
+    emotion = EMOTIONS[index % len(EMOTIONS)]
+    return emotion, f"Hoje estou me sentindo {emotion}, mensagem {index}", f"Entendo como você se sente ({index})."
+
+def fill_dicts(conversations: int) -> tuple:
+    """Layout anterior do simple_main: dicts de conversa e listas de dicts de mensagem"""
+    conversation_dicts, messages_store = {}, {}
+    for index in range(conversations):
+        emotion, content, reply = sample(index)
+        conversation_id = new_id("conv-")
+        conversation_dicts[conversation_id] = {
+            "id": conversation_id,
+            "title": f"Conversation - {emotion}",
+            "primary_emotion": emotion,
+            "message_count": 2,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        messages_store[conversation_id] = [
+            {"id": new_id("msg-"), "role": "user", "content": content, "emotional_state": emotion,
+             "created_at": datetime.utcnow().isoformat()},
+            {"id": new_id("msg-"), "role": "assistant", "content": reply,
+             "created_at": datetime.utcnow().isoformat()}
+        ]
+    return conversation_dicts, messages_store
+
+def fill_store(conversations: int) -> InMemoryConversationStore:
+    store = InMemoryConversationStore(max_conversations=conversations, ttl_seconds=None)
+    for index in range(conversations):
+        emotion, content, reply = sample(index)
+        conversation_id = new_id("conv-")
+        store.create_conversation(conversation_id, f"Conversation - {emotion}", emotion)
+        store.append_messages(
+            conversation_id,
+            MessageRecord(new_id("msg-"), "user", content, emotion),
+            MessageRecord(new_id("msg-"), "assistant", reply)
+        )
+    return store
+
+def retained_bytes(fill, conversations: int) -> tuple[int, float]:
+    """Bytes retidos pelo resultado de fill(conversations) e o tempo de preenchimento"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        result = fill(conversations)
+        elapsed = time.perf_counter() - started
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained, elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memória do store em memória contra dicionários simples")
+    parser.add_argument("--conversations", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    dict_bytes, dict_seconds = retained_bytes(fill_dicts, args.conversations)
+    store_bytes, store_seconds = retained_bytes(fill_store, args.conversations)
+    for name, retained, seconds in (("dicts", dict_bytes, dict_seconds), ("store", store_bytes, store_seconds)):
+        print(f"{name:<6}{retained / 2**20:>9.1f} MB{retained / args.conversations:>8.0f} B/conversa{seconds:>7.2f}s")
+    print(f"store/dicts: {store_bytes / dict_bytes:.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# Latência da busca textual (SQLite/FTS5) por frequência do termo
+#
+# Gera --messages mensagens de --users usuários (várias conversas cada) com
+# um termo comum (~18% das mensagens) e um raro (~0,5%) e mede a mediana de
+# cada consulta com escopo de usuário, de conversa e em páginas adiante.
+#
+#   python -m benchmarks.search_latency --messages 300000 --users 2000
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from backend.database import create_db_engine  # noqa: E402
+from backend.ids import new_id  # noqa: E402
+from backend.models import Conversation, Message, User  # noqa: E402
+from backend.search import search_messages  # noqa: E402
+
+CONVERSATIONS_PER_USER = 5
+VOCABULARY = [f"palavra{index}" for index in range(20000)]
+
+def populate(db, messages: int, users: int, seed: int = 1) -> tuple[list[str], list[str]]:
+    generator = random.Random(seed)
+    user_ids = [new_id() for _ in range(users)]
+    conversations = [(new_id(), user_id) for user_id in user_ids for _ in range(CONVERSATIONS_PER_USER)]
+    db.execute(insert(User), [{"id": user_id, "username": user_id, "email": user_id} for user_id in user_ids])
+    db.execute(insert(Conversation), [{"id": cid, "user_id": uid, "title": "Busca"} for cid, uid in conversations])
+
+    batch = []
+    for _ in range(messages):
+        words = [generator.choice(VOCABULARY) for _ in range(generator.randint(5, 20))]
+        if generator.random() < 0.18:
+            words.append("triste")
+        if generator.random() < 0.005:
+            words.append("saudade")
+        batch.append({"id": new_id(), "conversation_id": generator.choice(conversations)[0], "role": "user",
+                      "content": " ".join(words)})
+        if len(batch) == 10000:
+            db.execute(insert(Message), batch)
+            batch = []
+    if batch:
+        db.execute(insert(Message), batch)
+    db.commit()
+    return user_ids, [conversation_id for conversation_id, _ in conversations]
+
+def median_ms(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latência da busca textual por frequência do termo")
+    parser.add_argument("--messages", type=int, default=300_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    engine = create_db_engine(f"sqlite:///{tempfile.mkdtemp()}/search.db")
+    db = sessionmaker(bind=engine)()
+    started = time.perf_counter()
+    user_ids, conversation_ids = populate(db, args.messages, args.users)
+    print(f"{args.messages} mensagens indexadas em {time.perf_counter() - started:.1f}s")
+
+    generator = random.Random(2)
+
+    def page(query: str, pages: int = 1, **scope):
+        cursor = None
+        for _ in range(pages):
+            cursor = search_messages(db, query, cursor=cursor, **scope)["next_cursor"]
+            if cursor is None:
+                return
+
+    cases = {
+        "usuário, termo comum": lambda: page("triste", user_id=generator.choice(user_ids)),
+        "usuário, termo raro": lambda: page("saudade", user_id=generator.choice(user_ids)),
+        "usuário, prefixo curto": lambda: page("tri", prefix=True, user_id=generator.choice(user_ids)),
+        "usuário, prefixo longo": lambda: page("trist", prefix=True, user_id=generator.choice(user_ids)),
+        "usuário, 3 páginas": lambda: page("triste", pages=3, user_id=generator.choice(user_ids)),
+        "conversa, termo comum": lambda: page("triste", conversation_id=generator.choice(conversation_ids)),
+    }
+    for name, function in cases.items():
+        print(f"{name:<24}{median_ms(function, args.repeat):>8.2f} ms")
+    db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
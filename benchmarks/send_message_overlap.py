@@ -0,0 +1,88 @@
+# Latência do send_message com um provedor simulado: gravação sobreposta ao LLM
+#
+# Para cada store mede (1) o pipeline sem provedor (só armazenamento e
+# análises), (2) o pipeline com um provedor de `--llm-ms` e compara com a
+# soma (1) + provedor, que é o que o pipeline sequencial custaria. O store
+# "memory+write" simula um banco remoto com `--write-ms` por mensagem gravada.
+#
+#   python -m benchmarks.send_message_overlap --llm-ms 50 --write-ms 20
+#   BENCH_POSTGRES_URL=postgresql://... python -m benchmarks.send_message_overlap
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from backend.chat_service import ChatService  # noqa: E402
+from backend.storage import MemoryConversationStore, create_store  # noqa: E402
+
+class WriteLatencyStore(MemoryConversationStore):
+    """Store em memória com latência por gravação (banco remoto simulado)"""
+
+    blocking = True
+
+    def __init__(self, write_seconds: float):
+        super().__init__()
+        self.write_seconds = write_seconds
+
+    def begin(self):
+        tx = super().begin()
+        add_message = tx.add_message
+
+        def add_message_with_latency(message):
+            time.sleep(self.write_seconds)
+            return add_message(message)
+
+        tx.add_message = add_message_with_latency
+        return tx
+
+def stores(write_ms: float) -> dict:
+    result = {
+        "memory": MemoryConversationStore(),
+        "memory+write": WriteLatencyStore(write_ms / 1000),
+        "sqlite": create_store(f"sqlite:///{tempfile.mkdtemp()}/overlap.db"),
+    }
+    if os.environ.get("BENCH_POSTGRES_URL"):
+        result["postgres"] = create_store(os.environ["BENCH_POSTGRES_URL"])
+    return result
+
+async def mean_latency(store, llm_seconds: float, messages: int) -> float:
+    async def responder(user_message, emotion_analysis, conversation_history, **kwargs):
+        if llm_seconds:
+            await asyncio.sleep(llm_seconds)
+        return "resposta"
+
+    service = ChatService(store, responder=responder, enable_audit_logs=False)
+    conversation_id = (await service.send_message("estou muito triste"))["conversation_id"]
+    latencies = []
+    for index in range(messages):
+        started = time.perf_counter()
+        await service.send_message(f"ainda estou triste {index}", conversation_id)
+        latencies.append(time.perf_counter() - started)
+    return statistics.mean(latencies)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="send_message: gravação sobreposta ao provedor")
+    parser.add_argument("--llm-ms", type=float, default=50)
+    parser.add_argument("--write-ms", type=float, default=20)
+    parser.add_argument("--messages", type=int, default=40)
+    args = parser.parse_args(argv)
+
+    print(f"{'store':<14}{'sem LLM':>10}{'sequencial':>12}{'sobreposto':>12}{'ganho':>9}")
+    for name, store in stores(args.write_ms).items():
+        store_only = asyncio.run(mean_latency(store, 0, args.messages))
+        overlapped = asyncio.run(mean_latency(store, args.llm_ms / 1000, args.messages))
+        sequential = store_only + args.llm_ms / 1000
+        print(
+            f"{name:<14}{store_only * 1000:>8.1f}ms{sequential * 1000:>10.1f}ms{overlapped * 1000:>10.1f}ms"
+            f"{(sequential - overlapped) * 1000:>7.1f}ms"
+        )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
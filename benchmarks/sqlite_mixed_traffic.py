@@ -0,0 +1,135 @@
+# Tráfego misto de leitura e escrita no SQLite, por perfil de PRAGMAs
+#
+# Escritores gravam mensagens (uma transação por mensagem, como no pipeline)
+# enquanto leitores buscam conversas pelo pool somente leitura. Compara o
+# perfil configurado (WAL, synchronous=NORMAL) com o padrão do SQLite
+# (journal de rollback, synchronous=FULL).
+#
+#   python -m benchmarks.sqlite_mixed_traffic --writers 2 --readers 6 --seconds 5
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from backend.config import settings  # noqa: E402
+from backend.database import create_db_engine  # noqa: E402
+from backend.sql_store import SQLConversationStore  # noqa: E402
+from backend.storage import MessageData  # noqa: E402
+
+PROFILES = {
+    "rollback/FULL": {"sqlite_journal_mode": "DELETE", "sqlite_synchronous": "FULL"},
+    "WAL/NORMAL": {"sqlite_journal_mode": "WAL", "sqlite_synchronous": "NORMAL"},
+}
+
+def seed(store: SQLConversationStore, conversations: int, messages: int) -> list[str]:
+    ids = []
+    for index in range(conversations):
+        tx = store.begin()
+        try:
+            conversation = tx.create_conversation(f"Conversation {index}", "calm", "neutral")
+            for position in range(messages):
+                tx.add_message(MessageData(conversation_id=conversation.id, role="user", content=f"mensagem {position}"))
+            tx.touch_conversation(conversation, added_messages=messages)
+            tx.commit()
+        finally:
+            tx.close()
+        ids.append(conversation.id)
+    return ids
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] * 1000
+
+def run_mixed(database_url: str, writers: int = 2, readers: int = 6, seconds: float = 5,
+              conversations: int = 200, messages: int = 20) -> dict:
+    """Executa a carga e devolve vazão, latências (ms) e erros de lock"""
+    write_engine = create_db_engine(database_url)
+    read_engine = create_db_engine(database_url, read_only=True, pool_size=readers)
+    store = SQLConversationStore(sessionmaker(bind=write_engine, autoflush=False))
+    read_store = SQLConversationStore(sessionmaker(bind=read_engine, autoflush=False))
+    ids = seed(store, conversations, messages)
+
+    write_latencies: list[float] = []
+    read_latencies: list[float] = []
+    errors: list[str] = []
+    deadline = time.perf_counter() + seconds
+
+    def writer(seed_value: int) -> None:
+        generator = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            tx = store.begin()
+            try:
+                conversation = tx.get_conversation(generator.choice(ids))
+                tx.add_message(MessageData(conversation_id=conversation.id, role="user", content="nova mensagem"))
+                tx.touch_conversation(conversation, added_messages=1)
+                tx.commit()
+                write_latencies.append(time.perf_counter() - started)
+            except OperationalError as e:
+                errors.append(str(e.orig))
+            finally:
+                tx.close()
+
+    def reader(seed_value: int) -> None:
+        generator = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                read_store.get_conversation(generator.choice(ids))
+                read_latencies.append(time.perf_counter() - started)
+            except OperationalError as e:
+                errors.append(str(e.orig))
+
+    threads = [threading.Thread(target=writer, args=(index,)) for index in range(writers)]
+    threads += [threading.Thread(target=reader, args=(100 + index,)) for index in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    write_engine.dispose()
+    read_engine.dispose()
+    return {
+        "writes_per_second": len(write_latencies) / seconds,
+        "reads_per_second": len(read_latencies) / seconds,
+        "write_p99_ms": percentile(write_latencies, 0.99),
+        "read_p99_ms": percentile(read_latencies, 0.99),
+        "errors": len(errors)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Leituras e escritas concorrentes no SQLite")
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=6)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'perfil':<15}{'escritas/s':>11}{'leituras/s':>11}{'p99 escrita':>13}{'p99 leitura':>13}{'erros':>7}")
+    for name, profile in PROFILES.items():
+        previous = {key: getattr(settings, key) for key in profile}
+        for key, value in profile.items():
+            setattr(settings, key, value)
+        try:
+            result = run_mixed(f"sqlite:///{tempfile.mkdtemp()}/mixed.db", args.writers, args.readers, args.seconds)
+        finally:
+            for key, value in previous.items():
+                setattr(settings, key, value)
+        print(
+            f"{name:<15}{result['writes_per_second']:>11.0f}{result['reads_per_second']:>11.0f}"
+            f"{result['write_p99_ms']:>11.1f}ms{result['read_p99_ms']:>11.1f}ms{result['errors']:>7}"
+        )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# Mesma carga de trabalho em cada ConversationStore: envio, listagem, leitura e exclusão
+#
+# Envia --messages mensagens distribuídas em --conversations conversas (em
+# lotes concorrentes de --concurrency), lista, lê cada conversa e exclui todas.
+# O responder é instantâneo: o tempo medido é o do pipeline e do armazenamento.
+#
+#   python -m benchmarks.store_workload --conversations 200 --messages 2000
+#   BENCH_POSTGRES_URL=postgresql://... python -m benchmarks.store_workload
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+from backend.chat_service import ChatService  # noqa: E402
+from backend.storage import create_store  # noqa: E402
+
+async def instant_responder(user_message, emotion_analysis, conversation_history, **kwargs):
+    return "entendo como você se sente"
+
+def store_urls() -> dict:
+    urls = {"memory": "memory", "sqlite": f"sqlite:///{tempfile.mkdtemp()}/workload.db"}
+    if os.environ.get("BENCH_POSTGRES_URL"):
+        urls["postgres"] = os.environ["BENCH_POSTGRES_URL"]
+    return urls
+
+async def send_all(service: ChatService, conversations: int, messages: int, concurrency: int) -> list[str]:
+    ids = []
+    for start in range(0, conversations, concurrency):
+        batch = range(start, min(start + concurrency, conversations))
+        results = await asyncio.gather(*(service.send_message(f"estou triste {index}") for index in batch))
+        ids.extend(result["conversation_id"] for result in results)
+
+    for start in range(conversations, messages, concurrency):
+        batch = range(start, min(start + concurrency, messages))
+        await asyncio.gather(*(
+            service.send_message(f"ainda estou ansioso {index}", ids[index % conversations]) for index in batch
+        ))
+    return ids
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+def run(url: str, conversations: int, messages: int, concurrency: int) -> dict:
+    store = create_store(url)
+    service = ChatService(store, responder=instant_responder, enable_audit_logs=False)
+
+    ids, send_seconds = timed(asyncio.run, send_all(service, conversations, messages, concurrency))
+    _, list_seconds = timed(lambda: [store.list_conversations(limit=20) for _ in range(100)])
+    _, get_seconds = timed(lambda: [store.get_conversation(conversation_id) for conversation_id in ids])
+    _, delete_seconds = timed(lambda: [store.delete_conversation(conversation_id) for conversation_id in ids])
+    return {
+        "send_ms": send_seconds * 1000 / messages,
+        "list_ms": list_seconds * 1000 / 100,
+        "get_ms": get_seconds * 1000 / len(ids),
+        "delete_ms": delete_seconds * 1000 / len(ids),
+        "messages_per_second": messages / send_seconds
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga de trabalho comparada entre ConversationStores")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    print(f"{'store':<10}{'envio':>10}{'listagem':>10}{'leitura':>10}{'exclusão':>10}{'msg/s':>9}")
+    for name, url in store_urls().items():
+        result = run(url, args.conversations, max(args.messages, args.conversations), args.concurrency)
+        print(
+            f"{name:<10}{result['send_ms']:>8.2f}ms{result['list_ms']:>8.2f}ms{result['get_ms']:>8.2f}ms"
+            f"{result['delete_ms']:>8.2f}ms{result['messages_per_second']:>9.0f}"
+        )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,15 @@ const apiClient = axios.create({
   },
 })
 
+interface CachedConversation {
+  data: any
+  syncCursor: string | null
+  etag: string | null
+}
+
+// Cache local das conversas para sincronização incremental
+const conversationCache = new Map<string, CachedConversation>()
+
 export function useChatService() {
   const sendMessage = async (content: string, conversationId: string | null) => {
     try {
@@ -35,17 +44,59 @@ export function useChatService() {
 
   const getConversation = async (conversationId: string) => {
     try {
+      const cached = conversationCache.get(conversationId)
+      if (cached) {
+        return await syncConversation(conversationId, cached)
+      }
+
+      // Mensagens vêm paginadas: seguir o cursor até o fim do histórico
       const response = await apiClient.get(`/api/v1/conversations/${conversationId}`)
-      return response.data
+      const conversation = response.data
+      let cursor = conversation.next_cursor
+      let syncCursor = conversation.sync_cursor
+      while (cursor) {
+        const page = await apiClient.get(`/api/v1/conversations/${conversationId}`, {
+          params: { cursor },
+        })
+        conversation.messages.push(...page.data.messages)
+        cursor = page.data.next_cursor
+        syncCursor = page.data.sync_cursor
+      }
+
+      conversationCache.set(conversationId, { data: conversation, syncCursor, etag: null })
+      return conversation
     } catch (error) {
       console.error('Erro ao buscar conversa:', error)
       throw error
     }
   }
 
+  // Busca apenas as mensagens novas; 304 significa que nada mudou
+  const syncConversation = async (conversationId: string, cached: CachedConversation) => {
+    let hasMore = true
+    while (hasMore) {
+      const response = await apiClient.get(`/api/v1/conversations/${conversationId}/messages`, {
+        params: cached.syncCursor ? { since: cached.syncCursor } : {},
+        headers: cached.etag ? { 'If-None-Match': cached.etag } : {},
+        validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+      })
+      if (response.status === 304) {
+        break
+      }
+
+      cached.data.messages.push(...response.data.messages)
+      cached.data.message_count = response.data.message_count
+      cached.syncCursor = response.data.cursor
+      cached.etag = response.data.has_more ? null : response.headers['etag'] ?? null
+      hasMore = response.data.has_more
+    }
+    return cached.data
+  }
+
   const deleteConversation = async (conversationId: string) => {
     try {
       const response = await apiClient.delete(`/api/v1/conversations/${conversationId}`)
+      conversationCache.delete(conversationId)
       return response.data
     } catch (error) {
       console.error('Erro ao deletar conversa:', error)
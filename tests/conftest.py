@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Banco SQLite temporário e chaves fictícias: definidos antes de qualquer
+# import de backend.config (Settings lê o ambiente uma vez)
+_database_dir = tempfile.mkdtemp(prefix="empathic-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_database_dir}/test.db")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("ENABLE_BASELINE_AGGREGATION", "false")
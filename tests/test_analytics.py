@@ -0,0 +1,46 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from backend.analytics import rebuild_rollups
+from backend.database import create_db_engine
+from backend.ids import new_id
+from backend.models import Conversation, EmotionDailyRollup, Message
+from backend.retention import archive_conversation_batch
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/analytics.db")
+    with sessionmaker(autocommit=False, autoflush=False, bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+def add_conversation(db, day: datetime, label: str) -> str:
+    conversation = Conversation(id=new_id(), title="Analytics", created_at=day, updated_at=day)
+    db.add(conversation)
+    db.flush()
+    db.add(Message(id=new_id(), conversation_id=conversation.id, role="user", content="oi", created_at=day,
+                   emotional_state=label, sentiment="neutral", emotion_intensity=0.5))
+    db.commit()
+    return conversation.id
+
+def counts(db) -> dict:
+    return {(row.day, row.emotional_state): row.message_count for row in db.query(EmotionDailyRollup)}
+
+def test_rebuild_keeps_days_of_archived_conversations(db, tmp_path):
+    archived_id = add_conversation(db, datetime(2024, 1, 10, 9), "sadness")
+    add_conversation(db, datetime(2024, 2, 1, 9), "joy")
+    rebuild_rollups(db)
+    assert archive_conversation_batch(
+        db, str(tmp_path / "archive"), select(Conversation.__table__).where(Conversation.id == archived_id)
+    ) == 1
+
+    stats = rebuild_rollups(db)
+    assert stats["kept_archived_days_before"] == "2024-01-11"
+    assert counts(db) == {(date(2024, 1, 10), "sadness"): 1, (date(2024, 2, 1), "joy"): 1}
+
+    # Um --since anterior também não apaga o dia arquivado
+    rebuild_rollups(db, since=date(2024, 1, 1))
+    assert counts(db)[(date(2024, 1, 10), "sadness")] == 1
@@ -0,0 +1,80 @@
+import math
+import threading
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from backend.baseline import UserBaseline, save_baselines
+from backend.database import create_db_engine
+from backend.ids import new_id
+from backend.models import User, UserBaselineCounter
+from backend.purge import delete_user
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/baseline.db")
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+def create_user(session_factory) -> str:
+    with session_factory() as db:
+        user = User(id=new_id(), username=new_id(), email=f"{new_id()}@example.com")
+        db.add(user)
+        db.commit()
+        return user.id
+
+def delta(messages: list[tuple]) -> UserBaseline:
+    baseline = UserBaseline()
+    for message in messages:
+        baseline.add(*message)
+    return baseline
+
+FIRST = [("sadness", "negative", 0.8, ["sozinho", "cansado"]), ("joy", "positive", 0.3, ["feliz"])]
+SECOND = [("sadness", "negative", 0.9, ["sozinho"]), ("anxiety", "negative", 0.7, ["prova"])]
+
+def test_merge_matches_in_memory_merge(session_factory):
+    user_id = create_user(session_factory)
+    with session_factory() as db:
+        save_baselines(db, {user_id: delta(FIRST)})
+        save_baselines(db, {user_id: delta(SECOND)})
+        user = db.get(User, user_id)
+        baseline, triggers = user.emotional_baseline, user.emotional_triggers
+
+    expected = delta(FIRST + SECOND)
+    assert baseline["message_count"] == 4
+    assert baseline["emotion_counts"] == expected.emotion_counts
+    assert baseline["sentiment_counts"] == expected.sentiment_counts
+    assert baseline["intensity"]["count"] == 4
+    assert math.isclose(baseline["intensity"]["mean"], expected.intensity_mean)
+    assert math.isclose(baseline["intensity"]["stddev"], expected.baseline_json()["intensity"]["stddev"], abs_tol=1e-6)
+    assert triggers[0] == {"keyword": "sozinho", "count": 2, "error": 0}
+
+def test_concurrent_flushes_keep_every_increment(session_factory):
+    user_id = create_user(session_factory)
+    workers, flushes = 4, 10
+
+    def flush():
+        for _ in range(flushes):
+            with session_factory() as db:
+                save_baselines(db, {user_id: delta(SECOND)})
+
+    threads = [threading.Thread(target=flush) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with session_factory() as db:
+        baseline = db.get(User, user_id).emotional_baseline
+    assert baseline["message_count"] == workers * flushes * len(SECOND)
+    assert baseline["emotion_counts"] == {"sadness": workers * flushes, "anxiety": workers * flushes}
+
+def test_replace_and_unknown_user(session_factory):
+    user_id = create_user(session_factory)
+    with session_factory() as db:
+        save_baselines(db, {user_id: delta(FIRST)})
+        assert save_baselines(db, {user_id: delta(SECOND), "missing": delta(FIRST)}, merge=False) == 1
+        assert db.get(User, user_id).emotional_baseline["emotion_counts"] == {"sadness": 1, "anxiety": 1}
+
+        assert delete_user(db, user_id)
+        assert db.query(UserBaselineCounter).filter(UserBaselineCounter.user_id == user_id).count() == 0
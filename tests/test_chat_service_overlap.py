@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.chat_service import ChatService
+from backend.storage import MemoryConversationStore
+
+STORE_DELAY = 0.15  # Escrita da mensagem do usuário (banco remoto simulado)
+LLM_DELAY = 0.15
+
+class SlowWriteStore(MemoryConversationStore):
+    """Store em memória cuja gravação de mensagens demora como um banco remoto"""
+
+    blocking = True
+
+    def begin(self):
+        tx = super().begin()
+        add_message = tx.add_message
+
+        def slow_add_message(message):
+            if message.role == "user":
+                time.sleep(STORE_DELAY)
+            return add_message(message)
+
+        tx.add_message = slow_add_message
+        return tx
+
+async def slow_responder(user_message, emotion_analysis, conversation_history, **kwargs):
+    await asyncio.sleep(LLM_DELAY)
+    return "resposta"
+
+async def failing_responder(user_message, emotion_analysis, conversation_history, **kwargs):
+    await asyncio.sleep(0.01)
+    raise RuntimeError("provedor indisponível")
+
+def test_user_message_write_overlaps_llm_call():
+    service = ChatService(SlowWriteStore(), responder=slow_responder, enable_audit_logs=False)
+    started = time.perf_counter()
+    response = asyncio.run(service.send_message("estou muito triste hoje"))
+    elapsed = time.perf_counter() - started
+
+    assert response["assistant_message"]["content"] == "resposta"
+    # Em sequência seriam STORE_DELAY + LLM_DELAY; sobrepostos, pouco mais que o maior
+    assert elapsed < STORE_DELAY + LLM_DELAY - 0.05
+    assert elapsed >= max(STORE_DELAY, LLM_DELAY)
+
+def test_response_payload_and_history():
+    store = MemoryConversationStore()
+    seen_history = []
+
+    async def responder(user_message, emotion_analysis, conversation_history, **kwargs):
+        seen_history.append(list(conversation_history))
+        return "ok"
+
+    service = ChatService(store, responder=responder, enable_audit_logs=False)
+    first = asyncio.run(service.send_message("estou feliz"))
+    second = asyncio.run(service.send_message("ainda feliz", first["conversation_id"]))
+
+    assert set(first) == {"conversation_id", "user_message", "assistant_message", "emotion_analysis"}
+    assert second["conversation_id"] == first["conversation_id"]
+    assert seen_history[1] == [
+        {"role": "user", "content": "estou feliz"},
+        {"role": "assistant", "content": "ok"},
+        {"role": "user", "content": "ainda feliz"},
+    ]
+    assert store.get_conversation(first["conversation_id"])["message_count"] == 4
+
+@pytest.mark.parametrize("store_factory", [MemoryConversationStore, SlowWriteStore])
+def test_provider_failure_commits_nothing(store_factory):
+    store = store_factory()
+    service = ChatService(store, responder=failing_responder, enable_audit_logs=False)
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.send_message("estou triste"))
+    assert store.list_conversations() == []
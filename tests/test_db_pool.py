@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from backend.config import settings
+from backend.database import InstrumentedQueuePool, create_db_engine, pool_metrics
+
+@pytest.fixture
+def small_pool(tmp_path, monkeypatch):
+    """Pool de 2 conexões + 1 de overflow, com espera máxima curta"""
+    monkeypatch.setattr(settings, "db_max_overflow", 1)
+    monkeypatch.setattr(settings, "db_pool_timeout_seconds", 0.3)
+    engine = create_db_engine(f"sqlite:///{tmp_path}/pool.db", pool_size=2)
+    yield engine
+    engine.dispose()
+
+def test_overflow_then_timeout(small_pool):
+    pool = small_pool.pool
+    assert isinstance(pool, InstrumentedQueuePool)
+    held = [small_pool.connect() for _ in range(3)]
+    assert pool.metrics()["overflow"] == 1
+
+    with pytest.raises(PoolTimeoutError):
+        small_pool.connect()
+    metrics = pool.metrics()
+    assert metrics["timeouts"] == 1
+    assert metrics["checked_out"] == 3
+    assert metrics["wait_seconds_max"] >= 0.25
+
+    for connection in held:
+        connection.close()
+
+def test_checkout_waits_for_returned_connection(small_pool):
+    held = [small_pool.connect() for _ in range(3)]
+
+    def release():
+        time.sleep(0.1)
+        held.pop().close()
+
+    releaser = threading.Thread(target=release)
+    releaser.start()
+    with small_pool.connect() as connection:
+        assert connection.execute(text("SELECT 1")).scalar() == 1
+    releaser.join()
+
+    metrics = small_pool.pool.metrics()
+    assert metrics["timeouts"] == 0
+    assert 0.05 <= metrics["wait_seconds_max"] < 0.3
+    for connection in held:
+        connection.close()
+
+def test_pre_ping_replaces_dead_connection(small_pool):
+    with small_pool.connect() as connection:
+        dbapi_connection = connection.connection.dbapi_connection
+    # Conexão morta (failover, proxy) enquanto estava ociosa no pool
+    dbapi_connection.close()
+
+    with small_pool.connect() as connection:
+        assert connection.execute(text("SELECT 1")).scalar() == 1
+        assert connection.connection.dbapi_connection is not dbapi_connection
+
+def test_pool_metrics_report_write_pool():
+    metrics = pool_metrics()
+    assert "write" in metrics
+    assert {"checkouts", "timeouts", "wait_ms_avg"} <= set(metrics["write"])
@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+from backend.emotion_analyzer import emotion_analyzer
+from backend.emotion_classifier import EmbeddingEmotionBackend, EmbeddingModel, lexicon_examples
+
+TEXT = "estou muito triste e sozinho hoje"
+
+def analyze(backend: EmbeddingEmotionBackend, text: str = TEXT):
+    return asyncio.run(backend.analyze(text))
+
+def same_as_keywords(analysis) -> bool:
+    expected = emotion_analyzer.analyze(TEXT)
+    return (analysis.emotional_state, analysis.confidence, analysis.keywords) == (
+        expected.emotional_state, expected.confidence, expected.keywords
+    )
+
+def test_missing_model_falls_back_to_keywords(tmp_path):
+    backend = EmbeddingEmotionBackend(str(tmp_path / "missing.npz"))
+    try:
+        assert same_as_keywords(analyze(backend))
+        # A falha de carregamento vale até reiniciar: o segundo pedido nem entra no lote
+        assert same_as_keywords(analyze(backend))
+        stats = backend.stats()
+        assert stats["model_error"] and stats["errors"] == 2
+        assert stats["batching"]["requests"] == 1
+    finally:
+        backend.close()
+
+def test_latency_budget_falls_back_to_keywords(tmp_path):
+    model_path = str(tmp_path / "emotion.npz")
+    EmbeddingModel.train(lexicon_examples(), dim=256).save(model_path)
+    backend = EmbeddingEmotionBackend(model_path, budget_ms=20)
+    classify = backend.batcher.function
+
+    def slow(texts):
+        time.sleep(0.2)
+        return classify(texts)
+
+    backend.batcher.function = slow
+    try:
+        assert same_as_keywords(analyze(backend))
+        assert backend.stats()["fallbacks"] == 1
+
+        # Dentro do orçamento o estado vem do classificador, que marca a versão do modelo
+        backend.batcher.function = classify
+        backend.batcher.timeout_seconds = None
+        analysis = analyze(backend)
+        assert backend.stats()["model"]["version"] in analysis.lexicon_version
+        assert backend.stats()["fallbacks"] == 1
+    finally:
+        backend.close()
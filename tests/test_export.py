@@ -0,0 +1,55 @@
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.database import SessionLocal
+from backend.export import iter_messages
+from backend.ids import new_id
+from backend.main import app
+from backend.models import Conversation, Message, User
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(app)
+
+@pytest.fixture
+def owned_conversation():
+    """Conversa com dono; as mensagens, como no pipeline, sem messages.user_id"""
+    with SessionLocal() as db:
+        user = User(id=new_id(), username=new_id(), email=f"{new_id()}@example.com")
+        conversation = Conversation(id=new_id(), user_id=user.id, title="Export")
+        db.add_all([user, conversation])
+        db.flush()
+        db.add_all([
+            Message(id=new_id(), conversation_id=conversation.id, role="user", content="estou triste"),
+            Message(id=new_id(), conversation_id=conversation.id, role="assistant", content="entendo")
+        ])
+        db.commit()
+        return user.id, conversation.id
+
+def test_messages_filtered_by_conversation_owner(owned_conversation):
+    user_id, conversation_id = owned_conversation
+    with SessionLocal() as db:
+        rows = list(iter_messages(db, user_id=user_id))
+    assert [row["conversation_id"] for row in rows] == [conversation_id, conversation_id]
+    assert {row["user_id"] for row in rows} == {user_id}
+
+def test_compressed_export_is_a_gzip_file(client, owned_conversation):
+    user_id, conversation_id = owned_conversation
+    response = client.get(f"/api/v1/export/messages?user_id={user_id}&compress=true")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-disposition"].endswith('messages.ndjson.gz"')
+
+    lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+    assert [json.loads(line)["conversation_id"] for line in lines] == [conversation_id, conversation_id]
+
+def test_uncompressed_export_is_ndjson(client, owned_conversation):
+    user_id, _ = owned_conversation
+    response = client.get(f"/api/v1/export/conversations?user_id={user_id}")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["content-disposition"].endswith('conversations.ndjson"')
+    assert [json.loads(line)["user_id"] for line in response.text.splitlines()] == [user_id]
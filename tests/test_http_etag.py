@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from backend.chat_service import ChatService
+from backend.database import SessionLocal
+from backend.main import app
+from backend.models import Message
+from backend.sql_store import SQLConversationStore
+
+async def echo_responder(user_message, emotion_analysis, conversation_history, **kwargs):
+    return "entendo"
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(app)
+
+@pytest.fixture
+def service():
+    return ChatService(SQLConversationStore(SessionLocal), responder=echo_responder, enable_audit_logs=False)
+
+def send(service, content, conversation_id=None):
+    return asyncio.run(service.send_message(content, conversation_id))
+
+def get_with_etag(client, url, etag):
+    return client.get(url, headers={"If-None-Match": etag})
+
+def test_list_etag_follows_page_rows(client, service):
+    conversation_id = send(service, "estou feliz hoje")["conversation_id"]
+
+    first = client.get("/api/v1/conversations")
+    assert first.status_code == 200
+    assert get_with_etag(client, "/api/v1/conversations", first.headers["ETag"]).status_code == 304
+
+    send(service, "agora estou triste", conversation_id)
+    changed = get_with_etag(client, "/api/v1/conversations", first.headers["ETag"])
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+
+def test_list_etag_changes_when_next_page_appears(client, service):
+    send(service, "estou feliz hoje")
+    page = client.get("/api/v1/conversations?limit=1")
+    send(service, "estou com medo")
+    send(service, "estou ansioso")
+    assert get_with_etag(client, "/api/v1/conversations?limit=1", page.headers["ETag"]).status_code == 200
+
+def test_conversation_etag_changes_after_reanalysis(client, service):
+    conversation_id = send(service, "estou feliz hoje")["conversation_id"]
+    url = f"/api/v1/conversations/{conversation_id}"
+
+    first = client.get(url)
+    assert first.status_code == 200
+    assert get_with_etag(client, url, first.headers["ETag"]).status_code == 304
+
+    # Como o backend.reanalyze: só a mensagem muda, updated_at da conversa não
+    with SessionLocal() as db:
+        db.execute(
+            update(Message)
+            .where(Message.conversation_id == conversation_id, Message.role == "user")
+            .values(emotional_state="sad")
+        )
+        db.commit()
+
+    refreshed = get_with_etag(client, url, first.headers["ETag"])
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != first.headers["ETag"]
+    assert refreshed.json()["messages"][0]["emotional_state"] == "sad"
@@ -0,0 +1,68 @@
+import time
+
+from backend.memory_store import InMemoryConversationStore, MessageRecord
+from backend.storage import MemoryConversationStore
+from benchmarks.memory_store_footprint import fill_dicts, fill_store, retained_bytes
+
+def message(index: int, role: str = "user") -> MessageRecord:
+    return MessageRecord(f"msg-{index:06d}", role, f"mensagem {index}", "sad" if role == "user" else None)
+
+def test_smaller_than_plain_dicts():
+    dict_bytes, _ = retained_bytes(fill_dicts, 2000)
+    store_bytes, _ = retained_bytes(fill_store, 2000)
+    assert store_bytes < dict_bytes * 0.85
+
+def test_lru_eviction_keeps_recently_used():
+    store = InMemoryConversationStore(max_conversations=2, ttl_seconds=None)
+    store.create_conversation("a", "Conversation - sad", "sad")
+    store.create_conversation("b", "Conversation - sad", "sad")
+    assert store.get("a") is not None  # "a" passa a ser a mais recente
+    store.create_conversation("c", "Conversation - sad", "sad")
+
+    assert "b" not in store
+    assert store.get("a") is not None and store.get("c") is not None
+    assert store.memory_usage()["evictions"] == 1
+
+def test_ttl_expiration():
+    store = InMemoryConversationStore(ttl_seconds=60)
+    conversation = store.create_conversation("a", "Conversation - sad", "sad")
+    conversation.last_access = time.time() - 61
+
+    assert store.get("a") is None
+    assert store.memory_usage()["expirations"] == 1
+
+def test_message_window_and_total_count():
+    store = InMemoryConversationStore(max_messages=3, ttl_seconds=None)
+    store.create_conversation("a", "Conversation - sad", "sad")
+    for index in range(5):
+        store.append_messages("a", message(index))
+
+    conversation = store.conversation_dict("a")
+    assert [m["id"] for m in conversation["messages"]] == ["msg-000002", "msg-000003", "msg-000004"]
+    assert conversation["message_count"] == 5
+
+def test_byte_accounting_returns_to_zero():
+    store = InMemoryConversationStore(max_messages=2, ttl_seconds=None)
+    for conversation_id in ("a", "b"):
+        store.create_conversation(conversation_id, "Conversation - sad", "sad")
+        store.append_messages(conversation_id, *(message(index) for index in range(4)))
+    assert store.memory_usage()["bytes"] > 0
+
+    store.delete("a")
+    store.delete("b")
+    assert store.memory_usage()["bytes"] == 0
+
+def test_byte_limit_evicts_oldest():
+    store = InMemoryConversationStore(ttl_seconds=None, max_bytes=4000)
+    for index in range(20):
+        store.create_conversation(f"conv-{index}", "Conversation - sad", "sad")
+        store.append_messages(f"conv-{index}", message(index))
+
+    usage = store.memory_usage()
+    assert usage["bytes"] <= 4000 and usage["evictions"] > 0
+    assert "conv-19" in store and "conv-0" not in store
+
+def test_wrapper_keeps_callers_empty_store():
+    store = InMemoryConversationStore(ttl_seconds=None)
+    assert len(store) == 0
+    assert MemoryConversationStore(store).store is store
@@ -0,0 +1,83 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from backend.database import SessionLocal
+from backend.ids import new_id
+from backend.main import app
+from backend.models import ArchivedConversation, AuditLog, Conversation, Message, Session as UserSession, User
+from backend.purge import delete_user, purge_conversations
+from backend.retention import archive_conversation_batch, read_archive, restore_conversation
+
+def create_user_with_data(conversations: int = 3) -> tuple[str, str]:
+    with SessionLocal() as db:
+        user = User(id=new_id(), username=new_id(), email=f"{new_id()}@example.com")
+        db.add(user)
+        db.flush()
+        for _ in range(conversations):
+            conversation = Conversation(id=new_id(), user_id=user.id, title="Purge")
+            db.add(conversation)
+            db.flush()
+            db.add(Message(id=new_id(), conversation_id=conversation.id, role="user", content="oi"))
+        db.add(UserSession(id=new_id(), user_id=user.id))
+        audit_log = AuditLog(id=new_id(), user_id=user.id, event_type="login", event_data={})
+        db.add(audit_log)
+        db.commit()
+        return user.id, audit_log.id
+
+def count(db, column, value) -> int:
+    return db.query(column).filter(column == value).count()
+
+def test_delete_user_keeps_audit_trail_without_owner():
+    user_id, audit_log_id = create_user_with_data()
+    with SessionLocal() as db:
+        assert delete_user(db, user_id, batch_size=2)
+
+        assert db.get(User, user_id) is None
+        assert count(db, Conversation.user_id, user_id) == 0
+        assert count(db, UserSession.user_id, user_id) == 0
+        audit_log = db.get(AuditLog, audit_log_id)
+        assert audit_log is not None and audit_log.user_id is None
+
+def test_delete_unknown_user():
+    with SessionLocal() as db:
+        assert not delete_user(db, "missing")
+    assert TestClient(app).delete("/api/v1/users/missing").status_code == 404
+
+def test_purge_by_user_in_batches():
+    user_id, _ = create_user_with_data(conversations=5)
+    with SessionLocal() as db:
+        assert purge_conversations(db, user_id=user_id, batch_size=2) == 5
+        assert count(db, Conversation.user_id, user_id) == 0
+
+def test_purge_requires_a_filter():
+    with SessionLocal() as db, pytest.raises(ValueError):
+        purge_conversations(db)
+
+def test_delete_user_removes_archived_transcripts(tmp_path):
+    deleted_user, _ = create_user_with_data(conversations=2)
+    kept_user, _ = create_user_with_data(conversations=1)
+    archive_dir = str(tmp_path)
+    with SessionLocal() as db:
+        ids = [row.id for row in db.query(Conversation.id).filter(Conversation.user_id.in_([deleted_user, kept_user]))]
+        assert archive_conversation_batch(
+            db, archive_dir, select(Conversation.__table__).where(Conversation.id.in_(ids))
+        ) == 3
+        deleted_ids = [row.id for row in db.query(ArchivedConversation.id).filter(ArchivedConversation.user_id == deleted_user)]
+        (shared_path,) = {row.archive_path for row in db.query(ArchivedConversation.archive_path).filter(
+            ArchivedConversation.id.in_(ids)
+        )}
+
+        # Sem o diretório do arquivo frio a exclusão deixaria as transcrições para trás
+        with pytest.raises(ValueError):
+            delete_user(db, deleted_user)
+        db.rollback()
+        assert db.get(User, deleted_user) is not None
+
+        assert delete_user(db, deleted_user, archive_dir=archive_dir)
+        remaining = list(read_archive(archive_dir, shared_path))
+        assert [record["conversation"]["user_id"] for record in remaining] == [kept_user]
+        assert not any(restore_conversation(db, archive_dir, conversation_id) for conversation_id in deleted_ids)
+
+        (kept_id,) = set(ids) - set(deleted_ids)
+        assert restore_conversation(db, archive_dir, kept_id)
@@ -0,0 +1,73 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from backend import emotion_classifier, reanalyze
+from backend.analytics import rebuild_rollups
+from backend.database import create_db_engine
+from backend.emotion_classifier import EmbeddingModel, lexicon_examples
+from backend.ids import new_id
+from backend.models import Conversation, EmotionDailyRollup, Message, SafetyDailyRollup
+
+DAY = datetime(2024, 3, 1, 12)
+ARCHIVED_DAY = date(2024, 1, 1)
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/reanalyze.db")
+    with sessionmaker(autocommit=False, autoflush=False, bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+def add_messages(db, labels: list[str]) -> None:
+    conversation = Conversation(id=new_id(), title="Reanálise")
+    db.add(conversation)
+    db.flush()
+    for label in labels:
+        db.add(Message(id=new_id(), conversation_id=conversation.id, role="user", created_at=DAY,
+                       content="estou muito triste e sozinho", emotional_state=label,
+                       sentiment="positive", emotion_intensity=0.1))
+    db.commit()
+
+def rollup_rows(db) -> tuple[set, set]:
+    emotions = {
+        (row.day, row.emotional_state, row.sentiment, row.message_count, round(row.intensity_sum, 6))
+        for row in db.query(EmotionDailyRollup).filter(EmotionDailyRollup.message_count != 0)
+    }
+    safety = {
+        (row.day, row.safety_level, row.event_count)
+        for row in db.query(SafetyDailyRollup).filter(SafetyDailyRollup.event_count != 0)
+    }
+    return emotions, safety
+
+def test_rollups_follow_changed_rows_and_keep_archived_days(db, tmp_path):
+    add_messages(db, ["joy", "joy", "calm"])
+    rebuild_rollups(db)
+    # Dia só com conversas arquivadas: existe nos rollups, mas não em messages
+    db.add(EmotionDailyRollup(day=ARCHIVED_DAY, emotional_state="joy", sentiment="positive",
+                              message_count=7, intensity_sum=3.5))
+    db.commit()
+
+    stats = reanalyze.run(db, checkpoint_path=str(tmp_path / "checkpoint.json"))
+    assert stats["updated"] == 3
+
+    emotions, safety = rollup_rows(db)
+    assert (ARCHIVED_DAY, "joy", "positive", 7, 3.5) in emotions
+    rebuild_rollups(db)
+    rebuilt = rollup_rows(db)
+    assert emotions - {(ARCHIVED_DAY, "joy", "positive", 7, 3.5)} == rebuilt[0]
+    assert safety == rebuilt[1]
+
+def test_model_loaded_once_per_process(db, tmp_path, monkeypatch):
+    model_path = str(tmp_path / "emotion.npz")
+    EmbeddingModel.train(lexicon_examples(), dim=256).save(model_path)
+    add_messages(db, ["joy"] * 5)
+
+    loads = []
+    original = EmbeddingModel.load
+    monkeypatch.setattr(EmbeddingModel, "load", classmethod(lambda cls, path: loads.append(path) or original(path)))
+    monkeypatch.setattr(emotion_classifier, "_models", {})
+
+    reanalyze.run(db, chunk_size=2, checkpoint_path=str(tmp_path / "checkpoint.json"), model_path=model_path)
+    assert loads == [model_path]
@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import SessionLocal, create_db_engine
+from backend.ids import new_id
+from backend.main import app
+from backend.models import Conversation, Message
+from backend.retention import _lock_batch, archive_conversation_batch
+
+def create_conversation(db) -> str:
+    conversation = Conversation(id=new_id(), title="Retenção")
+    db.add(conversation)
+    db.flush()
+    db.add(Message(id=new_id(), conversation_id=conversation.id, role="user", content="oi"))
+    db.commit()
+    return conversation.id
+
+def only(conversation_id: str):
+    return select(Conversation.__table__).where(Conversation.id == conversation_id)
+
+def test_sqlite_batch_holds_write_lock_before_reading(tmp_path):
+    path = tmp_path / "retention.db"
+    engine = create_db_engine(f"sqlite:///{path}")
+    with sessionmaker(bind=engine)() as db:
+        conversation_id = create_conversation(db)
+        db.execute(_lock_batch(db, only(conversation_id)))
+
+        # Uma mensagem nova não entra entre a leitura do lote e a exclusão
+        writer = sqlite3.connect(path, timeout=0)
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            writer.execute("INSERT INTO messages (id, conversation_id, role, content) VALUES (?, ?, 'user', 'x')",
+                           (new_id(), conversation_id))
+        writer.close()
+        db.rollback()
+    engine.dispose()
+
+def test_send_message_to_archived_conversation_is_gone(tmp_path):
+    with SessionLocal() as db:
+        conversation_id = create_conversation(db)
+        assert archive_conversation_batch(db, str(tmp_path), only(conversation_id)) == 1
+        conversations = db.query(Conversation).count()
+
+    response = TestClient(app).post("/api/v1/messages", json={"content": "voltei", "conversation_id": conversation_id})
+    assert response.status_code == 410
+    with SessionLocal() as db:
+        # Nenhuma conversa nova no lugar da arquivada
+        assert db.query(Conversation).count() == conversations
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from backend import lexicon as lexicon_module
+from backend.chat_service import ChatService
+from backend.emotional_safety import SafetyLevel, safety_guard
+from backend.lexicon import LexiconRegistry, available_languages, compiled_lexicon, lexicon_for
+from backend.storage import MemoryConversationStore
+
+# Mensagens de crise em português com gírias ("to" = "tô") ou misturadas com
+# inglês: a detecção de idioma pode escolher outro léxico, a de crise não muda
+CRISIS_MESSAGES = [
+    "to mal, to querendo me matar",
+    "to cansado de tudo, quero morrer",
+    "I am so tired, quero me matar",
+    "so tired of everything, não aguento mais",
+    "quero me matar",
+    "I want to kill myself",
+    "ya no puedo seguir, quiero morir",
+    "hoje eu to tipo, I want to end my life",
+]
+
+async def _responder(user_message, emotion_analysis, conversation_history, **kwargs):
+    return "ok"
+
+@pytest.mark.parametrize("text", CRISIS_MESSAGES)
+def test_crisis_detected_with_detected_language(text):
+    lexicon = lexicon_for(None, text)
+    assert safety_guard.analyze(text, lexicon=lexicon).level == SafetyLevel.CRITICAL
+
+@pytest.mark.parametrize("language", available_languages())
+@pytest.mark.parametrize("text", CRISIS_MESSAGES[:4])
+def test_language_choice_never_narrows_crisis_check(text, language):
+    assert safety_guard.analyze(text, lexicon=compiled_lexicon(language)).level == SafetyLevel.CRITICAL
+
+@pytest.mark.parametrize("user_language", [None, "pt-BR", "en-US", "es"])
+@pytest.mark.parametrize("text", CRISIS_MESSAGES)
+def test_pipeline_redirects_crisis_in_any_language(text, user_language):
+    service = ChatService(MemoryConversationStore(), responder=_responder, enable_audit_logs=False)
+    response = asyncio.run(service.send_message(text, language=user_language))
+    assert response.get("safety_alert") is True
+    assert response["level"] == SafetyLevel.CRITICAL.value
+
+@pytest.mark.parametrize("text", ["I want to kill myself", "quiero morir, ya no puedo seguir"])
+def test_fresh_registry_checks_crisis_of_unloaded_languages(text, monkeypatch):
+    # Processo recém-iniciado: só o léxico pt está carregado no LRU
+    fresh = LexiconRegistry()
+    monkeypatch.setattr(lexicon_module, "registry", fresh)
+    lexicon = compiled_lexicon("pt-BR")
+    assert safety_guard.analyze(text, lexicon=lexicon).level == SafetyLevel.CRITICAL
+    assert not {"en", "es"} & set(fresh.loaded())
+
+def test_safe_messages_stay_safe():
+    for text in ("estou bem hoje", "I feel great today", "hoy estoy muy bien"):
+        assert safety_guard.analyze(text, lexicon=lexicon_for(None, text)).level == SafetyLevel.SAFE
@@ -0,0 +1,109 @@
+import pytest
+from sqlalchemy import text, update
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import create_db_engine
+from backend.ids import new_id
+from backend.models import Conversation, Message, User
+from backend.search import search_messages
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/search.db")
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def add_user(db) -> str:
+    user = User(id=new_id(), username=new_id(), email=f"{new_id()}@example.com")
+    db.add(user)
+    db.commit()
+    return user.id
+
+def add_conversation(db, user_id=None, contents=()) -> str:
+    conversation = Conversation(id=new_id(), user_id=user_id, title="Busca")
+    db.add(conversation)
+    db.flush()
+    for content in contents:
+        db.add(Message(id=new_id(), conversation_id=conversation.id, role="user", content=content))
+        db.flush()
+    db.commit()
+    return conversation.id
+
+def found(db, query, **filters) -> list[str]:
+    return [row["conversation_id"] for row in search_messages(db, query, **filters)["results"]]
+
+def integrity_check(db) -> None:
+    db.execute(text("INSERT INTO messages_fts(messages_fts, rank) VALUES ('integrity-check', 1)"))
+
+def test_ranking_covers_every_match(db):
+    user_id = add_user(db)
+    # A mais relevante é a mais antiga, atrás de muitas ocorrências recentes
+    best = add_conversation(db, user_id, ["triste triste triste"])
+    add_conversation(db, user_id, [f"hoje estou um pouco triste com a mensagem número {index} e outras coisas"
+                                   for index in range(1200)])
+    assert found(db, "triste", user_id=user_id, limit=1) == [best]
+
+def test_results_scoped_to_user_and_conversation(db):
+    alice, bob = add_user(db), add_user(db)
+    alice_conversation = add_conversation(db, alice, ["estou triste"])
+    other_conversation = add_conversation(db, alice, ["triste de novo"])
+    bob_conversation = add_conversation(db, bob, ["também estou triste"])
+
+    assert sorted(found(db, "triste", user_id=alice)) == sorted([alice_conversation, other_conversation])
+    assert found(db, "triste", user_id=bob) == [bob_conversation]
+    assert found(db, "triste", conversation_id=other_conversation) == [other_conversation]
+    assert found(db, "triste", user_id=bob, conversation_id=alice_conversation) == []
+    with pytest.raises(ValueError):
+        search_messages(db, "triste")
+
+def test_owner_change_is_reindexed(db):
+    alice, bob = add_user(db), add_user(db)
+    conversation_id = add_conversation(db, alice, ["estou ansioso"])
+    db.execute(update(Conversation).where(Conversation.id == conversation_id).values(user_id=bob))
+    db.commit()
+
+    assert found(db, "ansioso", user_id=alice) == []
+    assert found(db, "ansioso", user_id=bob) == [conversation_id]
+    integrity_check(db)
+
+def test_pages_are_stable_while_messages_arrive(db):
+    user_id = add_user(db)
+    conversation_id = add_conversation(db, user_id, [f"triste {'x ' * index}" for index in range(25)])
+
+    seen, cursor = [], None
+    while True:
+        page = search_messages(db, "triste", user_id=user_id, limit=7, cursor=cursor)
+        seen.extend(row["message_id"] for row in page["results"])
+        # Mensagens novas (que mudam as estatísticas do bm25) entre as páginas
+        db.add(Message(id=new_id(), conversation_id=conversation_id, role="user", content="triste triste"))
+        db.commit()
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == 25
+
+def test_index_follows_updates_deletes_and_vacuum(db):
+    user_id = add_user(db)
+    conversation_id = add_conversation(db, user_id, ["estou feliz", "coração apertado", "sem medo"])
+    removed = add_conversation(db, user_id, ["feliz também"])
+
+    db.execute(update(Message).where(Message.content == "sem medo").values(content="com medo do futuro"))
+    db.query(Message).filter(Message.conversation_id == removed).delete()
+    db.commit()
+    db.connection().exec_driver_sql("VACUUM")
+    db.commit()
+
+    assert found(db, "coracao", user_id=user_id) == [conversation_id]
+    assert found(db, "futuro", user_id=user_id) == [conversation_id]
+    assert found(db, "feliz", user_id=user_id) == [conversation_id]
+    integrity_check(db)
+
+def test_prefix_only_when_requested(db):
+    user_id = add_user(db)
+    conversation_id = add_conversation(db, user_id, ["tristeza profunda"])
+    assert found(db, "triste", user_id=user_id) == []
+    assert found(db, "trist", user_id=user_id, prefix=True) == [conversation_id]
+    assert found(db, "profunda tri", user_id=user_id, prefix=True) == [conversation_id]
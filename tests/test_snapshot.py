@@ -0,0 +1,53 @@
+import time
+
+from backend.memory_store import InMemoryConversationStore
+from backend.snapshot import StorePersistence
+from backend.storage import MemoryConversationStore, MessageData
+
+def persisted_store(directory, **limits) -> tuple[InMemoryConversationStore, StorePersistence]:
+    store = InMemoryConversationStore(**{"ttl_seconds": None, **limits})
+    persistence = StorePersistence(store, str(directory))
+    persistence.load()
+    return store, persistence
+
+def stage(store: MemoryConversationStore, conversation_id: str, content: str):
+    tx = store.begin()
+    message = tx.add_message(MessageData(conversation_id=conversation_id, role="user", content=content))
+    return tx, message
+
+def test_replay_keeps_messages_committed_out_of_id_order(tmp_path):
+    store, persistence = persisted_store(tmp_path)
+    store.create_conversation("c1", "Conversation - joy", "joy")
+    wrapper = MemoryConversationStore(store)
+    tx, _ = stage(wrapper, "c1", "antes do snapshot")
+    tx.commit()
+    persistence.snapshot()
+
+    # IDs gerados na ordem em que as mensagens entram, confirmadas na ordem inversa
+    first, first_message = stage(wrapper, "c1", "primeira")
+    second, second_message = stage(wrapper, "c1", "segunda")
+    assert first_message.id < second_message.id
+    second.commit()
+    first.commit()
+
+    restored, _ = persisted_store(tmp_path)
+    live = [message.id for message in store.get("c1").messages]
+    assert len(live) == 3
+    assert [message.id for message in restored.get("c1").messages] == live
+    assert restored.get("c1").message_count == 3
+
+def test_restore_keeps_last_access_and_lru_order(tmp_path):
+    store, persistence = persisted_store(tmp_path, ttl_seconds=100)
+    for conversation_id in ("old", "a", "b"):
+        store.create_conversation(conversation_id, "Conversation - calm", "calm")
+    # Criada há mais que o TTL, mas usada agora
+    store.get("old").created_at = time.time() - 1000
+    persistence.snapshot()
+
+    tx, _ = stage(MemoryConversationStore(store), "a", "oi")
+    tx.commit()
+    assert store.conversation_ids() == ["b", "old", "a"]
+
+    restored, _ = persisted_store(tmp_path, ttl_seconds=100)
+    assert restored.conversation_ids() == ["b", "old", "a"]
+    assert restored.get("old") is not None
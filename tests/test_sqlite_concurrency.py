@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from backend.database import create_db_engine
+from benchmarks.sqlite_mixed_traffic import run_mixed
+
+def test_profile_applied_to_file_databases(tmp_path):
+    url = f"sqlite:///{tmp_path}/profile.db"
+    engine = create_db_engine(url)
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() > 0
+    engine.dispose()
+
+def test_read_pool_rejects_writes(tmp_path):
+    url = f"sqlite:///{tmp_path}/readonly.db"
+    create_db_engine(url).dispose()
+    read_engine = create_db_engine(url, read_only=True)
+    with read_engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM conversations")).scalar() == 0
+        with pytest.raises(OperationalError):
+            connection.execute(text("DELETE FROM conversations"))
+    read_engine.dispose()
+
+def test_mixed_traffic_without_lock_errors(tmp_path):
+    result = run_mixed(f"sqlite:///{tmp_path}/mixed.db", writers=2, readers=3, seconds=0.5,
+                       conversations=20, messages=5)
+    assert result["errors"] == 0
+    assert result["writes_per_second"] > 0 and result["reads_per_second"] > 0
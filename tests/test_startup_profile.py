@@ -0,0 +1,16 @@
+from backend.startup_profile import main, profile_import
+
+# Custo do próprio app acima do import do FastAPI (o framework sozinho varia
+# muito entre máquinas; o limite absoluto fica no buildCommand do vercel.json)
+APP_IMPORT_BUDGET_SECONDS = 0.5
+
+def test_entry_point_import_within_budget():
+    app = profile_import("api.index")
+    framework = profile_import("fastapi")
+    assert app["lazy_loaded"] == []
+    assert app["seconds"] - framework["seconds"] <= APP_IMPORT_BUDGET_SECONDS, sorted(
+        (seconds, name) for name, seconds in app["modules"].items() if name.startswith(("backend.", "api."))
+    )[-5:]
+
+def test_command_fails_over_budget():
+    assert main(["api.index", "--max-seconds", "0.001", "--runs", "1"]) == 1
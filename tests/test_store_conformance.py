@@ -0,0 +1,117 @@
+import asyncio
+import os
+
+import pytest
+
+from backend.chat_service import HISTORY_WINDOW, ChatService
+from backend.storage import create_store
+
+# Mesma carga de trabalho em cada ConversationStore; o Postgres entra quando
+# TEST_POSTGRES_URL aponta para um banco descartável
+
+def store_urls() -> list:
+    urls = ["memory", "sqlite"]
+    if os.environ.get("TEST_POSTGRES_URL"):
+        urls.append(os.environ["TEST_POSTGRES_URL"])
+    return urls
+
+@pytest.fixture(params=store_urls(), ids=lambda url: url.split(":")[0])
+def store(request, tmp_path):
+    url = f"sqlite:///{tmp_path}/store.db" if request.param == "sqlite" else request.param
+    return create_store(url)
+
+class RecordingResponder:
+    """Responder fictício que guarda o histórico recebido"""
+
+    def __init__(self):
+        self.histories = []
+
+    async def __call__(self, user_message, emotion_analysis, conversation_history, **kwargs):
+        self.histories.append(list(conversation_history))
+        return f"resposta {len(self.histories)}"
+
+def send(service, content, conversation_id=None):
+    return asyncio.run(service.send_message(content, conversation_id))
+
+def test_send_creates_and_appends(store):
+    service = ChatService(store, responder=RecordingResponder(), enable_audit_logs=False)
+    first = send(service, "estou muito triste hoje")
+    conversation_id = first["conversation_id"]
+    second = send(service, "ainda estou triste", conversation_id)
+    assert second["conversation_id"] == conversation_id
+
+    conversation = store.get_conversation(conversation_id)
+    assert conversation["message_count"] == 4
+    assert [message["role"] for message in conversation["messages"]] == ["user", "assistant"] * 2
+    assert [message["content"] for message in conversation["messages"]] == [
+        "estou muito triste hoje", "resposta 1", "ainda estou triste", "resposta 2"
+    ]
+    assert conversation["emotion_counts"] == {"sadness": 2}
+
+def test_history_window(store):
+    responder = RecordingResponder()
+    service = ChatService(store, responder=responder, enable_audit_logs=False)
+    conversation_id = send(service, "mensagem 0")["conversation_id"]
+    for index in range(1, 8):
+        send(service, f"mensagem {index}", conversation_id)
+
+    history = responder.histories[-1]
+    assert len(history) == HISTORY_WINDOW
+    assert history[-1] == {"role": "user", "content": "mensagem 7"}
+    assert history[-2] == {"role": "assistant", "content": "resposta 7"}
+
+def test_list_most_recent_first_with_limit(store):
+    service = ChatService(store, responder=RecordingResponder(), enable_audit_logs=False)
+    ids = [send(service, f"estou feliz {index}")["conversation_id"] for index in range(5)]
+    send(service, "de volta", ids[0])
+
+    page = store.list_conversations(limit=3)
+    assert [conversation["id"] for conversation in page] == [ids[0], ids[4], ids[3]]
+    assert page[0]["message_count"] == 4
+
+def test_unknown_conversation_starts_new_one(store):
+    service = ChatService(store, responder=RecordingResponder(), enable_audit_logs=False)
+    response = send(service, "olá", "missing-conversation")
+    assert response["conversation_id"] != "missing-conversation"
+    assert store.get_conversation("missing-conversation") is None
+
+def test_crisis_is_not_stored(store):
+    service = ChatService(store, responder=RecordingResponder(), enable_audit_logs=False)
+    before = store.stats()["conversations"]
+    response = send(service, "quero me matar")
+    assert response["safety_alert"] is True
+    assert "conversation_id" not in response
+    assert store.stats()["conversations"] == before
+
+def test_delete(store):
+    service = ChatService(store, responder=RecordingResponder(), enable_audit_logs=False)
+    kept = send(service, "estou calmo")["conversation_id"]
+    deleted = send(service, "estou ansioso")["conversation_id"]
+    before = store.stats()["conversations"]
+
+    assert store.delete_conversation(deleted)
+    assert not store.delete_conversation(deleted)
+    assert store.get_conversation(deleted) is None
+    assert [conversation["id"] for conversation in store.list_conversations(limit=1)] == [kept]
+    assert store.stats()["conversations"] == before - 1
+
+def test_concurrent_messages_keep_every_aggregate_update(store):
+    async def slow_responder(user_message, emotion_analysis, conversation_history, **kwargs):
+        await asyncio.sleep(0.05)
+        return "entendo"
+
+    service = ChatService(store, responder=slow_responder, enable_audit_logs=False)
+    conversation_id = send(service, "estou muito triste")["conversation_id"]
+
+    async def concurrent():
+        # Todas leem a conversa antes de qualquer uma gravar
+        await asyncio.gather(*(
+            service.send_message(content, conversation_id)
+            for content in ["estou triste", "estou feliz", "estou triste de novo", "estou feliz hoje"]
+        ))
+
+    asyncio.run(concurrent())
+    conversation = store.get_conversation(conversation_id)
+    assert conversation["message_count"] == 10
+    assert conversation["emotion_counts"] == {"sadness": 3, "joy": 2}
+    assert len(conversation["sentiment_trajectory"]) == 5
@@ -0,0 +1,29 @@
+import asyncio
+from types import SimpleNamespace
+
+import stripe
+from fastapi.testclient import TestClient
+
+from backend.simple_main import app
+from backend.stripe_service import get_payment_status
+
+def test_payment_status_uses_configured_key(monkeypatch):
+    monkeypatch.setenv("STRIPE_SECRET_KEY", "sk_test_configured")
+    monkeypatch.setattr(stripe, "api_key", None)
+    keys = []
+
+    def retrieve(session_id):
+        keys.append(stripe.api_key)
+        return SimpleNamespace(payment_status="paid", customer="cus_1", subscription=None, metadata={"plan": "starter"})
+
+    monkeypatch.setattr(stripe.checkout.Session, "retrieve", retrieve)
+    response = TestClient(app).get("/api/v1/payment-status", params={"session_id": "cs_test_1"})
+    assert response.json() == {"status": "paid", "customer": "cus_1", "subscription": None, "metadata": {"plan": "starter"}}
+    assert keys == ["sk_test_configured"]
+
+def test_payment_status_reports_stripe_errors(monkeypatch):
+    def retrieve(session_id):
+        raise stripe.error.InvalidRequestError("No such checkout.session", "id")
+
+    monkeypatch.setattr(stripe.checkout.Session, "retrieve", retrieve)
+    assert asyncio.run(get_payment_status("cs_missing")) == {"error": "No such checkout.session"}